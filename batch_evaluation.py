@@ -0,0 +1,349 @@
+import math
+
+import numpy as np
+
+from estimation import ETA_LIMIT, MAX_ITERATIONS, TOLERANCE, fit_negative_binomial, log_factorial
+from splits import kfold_indices, part_order
+from transformations import TRANSFORM_FUNCTIONS
+
+MAX_BATCH_ELEMENTS = 4_000_000
+REFRESH_RATIO = 0.1
+CACHE_ELEMENTS = 32_768
+
+
+class DesignBank:
+    """ Every candidate column under every allowed transformation, transformed once into one matrix.
+
+    Column 0 of x is the intercept and term i is column i + 1. Rows where the
+    response or any raw candidate column is missing are dropped up front; terms
+    that are still non-finite on the remaining rows (Log of zero, say) are left
+    out and listed in invalid_terms. The cross-products X'X and X'y are kept for
+    the first Newton step of every candidate and the first Hessian of a warm
+    start. x is column-major. rows, if given, is the row-index
+    array (such as a split) to build from, in that order; self.rows maps the
+    bank's rows back to data.
+    """
+
+    def __init__(self, data, y_column, terms, rows=None):
+        raw_columns = list(dict.fromkeys(column for column, _ in terms))
+        rows = np.arange(len(data)) if rows is None else np.asarray(rows, dtype=np.int64)
+        y = data[y_column].to_numpy(dtype=float, na_value=np.nan)[rows]
+        raw = np.column_stack([data[column].to_numpy(dtype=float, na_value=np.nan)[rows] for column in raw_columns]) \
+            if raw_columns else np.empty((len(y), 0))
+        self.kept = np.isfinite(y) & np.isfinite(raw).all(axis=1)
+        raw = raw[self.kept]
+        self.y = y[self.kept]
+        self.rows = rows[self.kept]
+
+        position = {column: i for i, column in enumerate(raw_columns)}
+        blocks = [np.ones((len(self.y), 1))]
+        self.terms = []
+        self.invalid_terms = []
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for column, transformation in terms:
+                values = TRANSFORM_FUNCTIONS[transformation](raw[:, position[column]:position[column] + 1])
+                if np.isfinite(values).all():
+                    blocks.append(values)
+                    self.terms.append((column, transformation))
+                else:
+                    self.invalid_terms.append((column, transformation))
+        # Column-major, so each term is a contiguous row of x.T for the batch products.
+        self.x = np.asfortranarray(np.hstack(blocks))
+        self.term_index = {term: i for i, term in enumerate(self.terms)}
+        self.gram = self.x.T @ self.x
+        self.xty = self.x.T @ self.y
+        self.log_fact = log_factorial(self.y)
+        self.log_fact_sum = self.log_fact.sum()
+
+    @classmethod
+    def from_decisions(cls, data, y_column, decisions, rows=None):
+        """ Bank over each column that is not only Off, under each of its transformations ("No" if none). """
+        return cls(data, y_column, decision_terms(decisions), rows)
+
+    @classmethod
+    def partitioned(cls, data, y_column, terms, parts):
+        """ One bank over the parts (row-index arrays such as train and test) laid out one after another,
+        and a view of it per part. The views share the bank's arrays, so nothing is copied per part.
+        """
+        order, offsets = part_order(parts)
+        bank = cls(data, y_column, terms, order)
+        kept_offsets = np.concatenate([[0], np.cumsum(bank.kept)])[offsets]
+        return bank, [bank.block(start, stop) for start, stop in zip(kept_offsets[:-1], kept_offsets[1:])]
+
+    def block(self, start, stop):
+        """ Bank over rows start:stop of this one, holding views of its arrays. """
+        return self._derived(slice(start, stop))
+
+    def take(self, positions):
+        """ Bank over the given row positions of this one; unlike block, this copies them. """
+        return self._derived(np.asarray(positions, dtype=np.int64))
+
+    def _derived(self, index):
+        bank = object.__new__(type(self))
+        bank.__dict__.update(self.__dict__)
+        bank.x = self.x[index] if isinstance(index, slice) else np.asfortranarray(self.x[index])
+        bank.y = self.y[index]
+        bank.rows = self.rows[index]
+        bank.log_fact = self.log_fact[index]
+        bank.log_fact_sum = bank.log_fact.sum()
+        bank.kept = np.ones(len(bank.y), dtype=bool)
+        bank.gram = bank.x.T @ bank.x
+        bank.xty = bank.x.T @ bank.y
+        return bank
+
+    def __len__(self):
+        return len(self.terms)
+
+    def mask(self, selection):
+        """ Boolean term mask for a list of (column, transformation) pairs. """
+        mask = np.zeros(len(self.terms), dtype=bool)
+        mask[[self.term_index[term] for term in selection]] = True
+        return mask
+
+
+class BatchEvaluator:
+    """ Fits many Poisson specifications over one DesignBank together.
+
+    Candidates with the same number of terms are fitted as one batch: their
+    Newton steps are stacked (batch, k, k) systems solved in a single call, and
+    their linear predictors and gradients come from two matrix products over the
+    batch's terms. Without a warm start the first step comes from the stored X'X
+    and X'y, since the intercept-only model has a constant weight. With
+    warm_start, the coefficients of a parent solution seed each candidate and
+    X'X scaled by its mean weight is the first Hessian, so a parent that already
+    converged costs one gradient. A candidate's exact Hessian X'diag(mu)X is only
+    recomputed once the steps from its last one stop shrinking tenfold.
+    """
+
+    def __init__(self, bank, max_iterations=MAX_ITERATIONS, tolerance=TOLERANCE):
+        self.bank = bank
+        self.max_iterations = max_iterations
+        self.tolerance = tolerance
+
+    def evaluate(self, masks, warm_start=None, model="Poisson"):
+        """ Returns arrays of loglik, aic, bic, rmse, mae, converged and the full-width params per mask.
+
+        masks is (batch, terms) boolean; warm_start, if given, is (batch, terms + 1)
+        coefficients such as the params of the parent solutions.
+        """
+        masks = np.atleast_2d(np.asarray(masks, dtype=bool))
+        count = len(masks)
+        results = {
+            "loglik": np.full(count, np.nan),
+            "params": np.zeros((count, len(self.bank) + 1)),
+            "converged": np.zeros(count, dtype=bool),
+            "rmse": np.full(count, np.nan),
+            "mae": np.full(count, np.nan)
+        }
+        sizes = masks.sum(axis=1)
+        for size in np.unique(sizes):
+            members = np.flatnonzero(sizes == size)
+            step = max(1, MAX_BATCH_ELEMENTS // max(len(self.bank.y), 1))
+            for start in range(0, len(members), step):
+                batch = members[start:start + step]
+                index = np.column_stack([np.zeros(len(batch), dtype=np.intp),
+                                         np.nonzero(masks[batch])[1].reshape(len(batch), size) + 1])
+                beta0 = warm_start[batch][np.arange(len(batch))[:, None], index] if warm_start is not None else None
+                if model == "Poisson":
+                    loglik, beta, converged, rmse, mae = self._fit_poisson(index, beta0)
+                else:
+                    loglik, beta, converged, rmse, mae = self._fit_negative_binomial(index, beta0)
+                results["loglik"][batch] = loglik
+                results["params"][batch[:, None], index] = beta
+                results["converged"][batch] = converged
+                results["rmse"][batch] = rmse
+                results["mae"][batch] = mae
+
+        self._add_metrics(results, sizes, model)
+        return results
+
+    def _fit_poisson(self, index, beta):
+        bank = self.bank
+        count = len(index)
+        # The batch works on the union of its terms, each a contiguous row of xt, so linear predictors and
+        # gradients of the whole batch are two matrix products rather than a copy of the rows per candidate.
+        columns, local = np.unique(index, return_inverse=True)
+        local = local.reshape(index.shape)
+        xt = bank.x.T if len(columns) == bank.x.shape[1] else bank.x.T[columns]
+        candidates = np.arange(count)[:, None]
+        gram = bank.gram[index[:, :, None], index[:, None, :]]
+        if beta is None:
+            beta = np.zeros(index.shape)
+            beta[:, 0] = math.log(max(bank.y.mean(), 1e-8))
+            # Intercept-only weights are the constant mean, so the first Hessian is a slice of X'X.
+            mean = math.exp(beta[0, 0])
+            hessian = mean * gram
+            step = _solve(hessian, bank.xty[index] - mean * bank.gram[index, 0])
+            beta = beta + step
+            previous = np.max(np.abs(step), axis=1)
+        else:
+            hessian = None
+            previous = np.full(count, np.inf)
+
+        coef = np.zeros((count, len(columns)))
+        coef[candidates, local] = beta
+        linear = coef @ xt
+        mu, loglik = self._poisson_state(linear)
+        if hessian is None:
+            # X'X scaled by each candidate's mean weight; a converged warm start stops on this Hessian.
+            hessian = mu.mean(axis=1)[:, None, None] * gram
+        xty = bank.xty[columns]
+        converged = np.zeros(count, dtype=bool)
+        final_loglik = np.empty(count)
+        rmse = np.empty(count)
+        mae = np.empty(count)
+        # The arrays below hold the candidates still being fitted, `work`, and shrink as they converge.
+        work = np.arange(count)
+        for _ in range(self.max_iterations):
+            rows = np.arange(len(work))[:, None]
+            gradient = xty[local[work]] - (mu @ xt.T)[rows, local[work]]
+            step = _solve(hessian, gradient)
+            size = np.max(np.abs(step), axis=1)
+            # Hessians from an earlier point are reused while the steps they give keep shrinking quickly;
+            # the others are recomputed here, which is the only per-candidate pass over the rows.
+            stale = np.flatnonzero((size >= self.tolerance) & (size > REFRESH_RATIO * previous))
+            if len(stale):
+                for i in stale:
+                    hessian[i] = _weighted_gram(xt, local[work[i]], mu[i])
+                step[stale] = _solve(hessian[stale], gradient[stale])
+                size[stale] = np.max(np.abs(step[stale]), axis=1)
+
+            done = size < self.tolerance
+            if done.any():
+                finished = work[done]
+                beta[finished] += step[done]
+                converged[finished] = True
+                final_loglik[finished] = loglik[done]
+                rmse[finished], mae[finished] = _errors(bank.y, mu[done])
+                keep = ~done
+                work, linear, mu, loglik = work[keep], linear[keep], mu[keep], loglik[keep]
+                hessian, previous, step, size = hessian[keep], previous[keep], step[keep], size[keep]
+                if not len(work):
+                    break
+                rows = rows[:len(work)]
+
+            direction = np.zeros((len(work), len(columns)))
+            direction[rows, local[work]] = step
+            delta = direction @ xt
+            scale = np.ones(len(work))
+            trial_linear = linear + delta
+            trial_mu, trial_loglik = self._poisson_state(trial_linear)
+            # Halve the steps of candidates whose log-likelihood fell, along the same direction.
+            for _ in range(30):
+                worse = np.flatnonzero(trial_loglik < loglik - 1e-10 * np.abs(loglik))
+                if not len(worse):
+                    break
+                scale[worse] /= 2
+                trial_linear[worse] = linear[worse] + scale[worse, None] * delta[worse]
+                trial_mu[worse], trial_loglik[worse] = self._poisson_state(trial_linear[worse])
+            beta[work] += scale[:, None] * step
+            linear, mu, loglik = trial_linear, trial_mu, trial_loglik
+            # A halved step shows the Hessian was a poor guess, so it is recomputed on the next iteration.
+            previous = np.where(scale < 1, 0.0, size)
+
+        if len(work):
+            final_loglik[work] = loglik
+            rmse[work], mae[work] = _errors(bank.y, mu)
+        return final_loglik, beta, converged, rmse, mae
+
+    def _poisson_state(self, linear):
+        eta = np.clip(linear, -ETA_LIMIT, ETA_LIMIT)
+        mu = np.exp(eta)
+        loglik = eta @ self.bank.y - mu.sum(axis=1) - self.bank.log_fact_sum
+        return mu, loglik
+
+    def _fit_negative_binomial(self, index, beta):
+        # The dispersion parameter makes every candidate's Hessian different, so these are fitted one by one.
+        loglik = np.empty(len(index))
+        params = np.empty(index.shape)
+        converged = np.empty(len(index), dtype=bool)
+        rmse = np.empty(len(index))
+        mae = np.empty(len(index))
+        for i, columns in enumerate(index):
+            result = fit_negative_binomial(self.bank.x[:, columns], self.bank.y,
+                                           beta=None if beta is None else beta[i], log_fact=self.bank.log_fact)
+            loglik[i], params[i], converged[i] = result.loglik, result.params, result.converged
+            rmse[i], mae[i] = result.rmse, result.mae
+        return loglik, params, converged, rmse, mae
+
+    def _add_metrics(self, results, sizes, model):
+        n = len(self.bank.y)
+        k = sizes + 1 + (model != "Poisson")
+        results["aic"] = -2 * results["loglik"] + 2 * k
+        results["bic"] = -2 * results["loglik"] + k * math.log(n)
+
+    def out_of_sample(self, masks, test_bank, warm_start=None, model="Poisson"):
+        """ evaluate() on this bank plus test_rmse and test_mae of the fitted params on test_bank.
+
+        test_bank must have the same terms, such as another part of DesignBank.partitioned.
+        """
+        results = self.evaluate(masks, warm_start, model)
+        results["test_rmse"], results["test_mae"] = prediction_errors(test_bank, results["params"])
+        return results
+
+
+def decision_terms(decisions):
+    return [(row[0], transformation) for row in decisions if any(row[2:7]) for transformation in (row[8] or ["No"])]
+
+
+def _weighted_gram(xt, rows, weights):
+    """ xt[rows] @ diag(weights) @ xt[rows].T, summed over blocks of columns small enough to stay in cache. """
+    block = max(256, CACHE_ELEMENTS // len(rows))
+    gram = np.zeros((len(rows), len(rows)))
+    for start in range(0, xt.shape[1], block):
+        x = xt[rows, start:start + block]
+        gram += (x * weights[start:start + block]) @ x.T
+    return gram
+
+
+def _errors(y, mu):
+    """ RMSE and MAE of each row of mu against y. """
+    residuals = y - mu
+    rmse = np.sqrt(np.einsum("ij,ij->i", residuals, residuals) / len(y))
+    return rmse, np.abs(residuals, out=residuals).mean(axis=1)
+
+
+def prediction_errors(bank, params):
+    """ RMSE and MAE on bank of each row of full-width params. """
+    mu = np.exp(np.clip(bank.x @ np.atleast_2d(params).T, -ETA_LIMIT, ETA_LIMIT))
+    residuals = bank.y[:, None] - mu
+    return np.sqrt(np.mean(residuals ** 2, axis=0)), np.mean(np.abs(residuals), axis=0)
+
+
+def cross_validate(bank, folds, masks, model="Poisson"):
+    """ Mean out-of-sample RMSE and MAE of each mask over folds of (train, test) bank row positions.
+
+    Each fold's test rows should be one block of bank (see DesignBank.partitioned)
+    so they are read as a view; the training rows are gathered once per fold.
+    """
+    rmse = np.zeros(len(masks))
+    mae = np.zeros(len(masks))
+    for train, test in folds:
+        results = BatchEvaluator(bank.take(train)).out_of_sample(masks, _rows_of(bank, test), model=model)
+        rmse += results["test_rmse"] / len(folds)
+        mae += results["test_mae"] / len(folds)
+    return rmse, mae
+
+
+def kfold_banks(data, y_column, terms, k, seed=0, groups=None):
+    """ A bank laid out fold by fold, and the (train, test) row positions of each fold for cross_validate. """
+    folds = kfold_indices(len(data), k, seed, groups)
+    bank, blocks = DesignBank.partitioned(data, y_column, terms, [test for _, test in folds])
+    stops = np.cumsum([len(block.y) for block in blocks])
+    positions = np.arange(len(bank.y))
+    return bank, [(np.concatenate([positions[:stop - len(block.y)], positions[stop:]]),
+                   positions[stop - len(block.y):stop]) for block, stop in zip(blocks, stops)]
+
+
+def _rows_of(bank, positions):
+    positions = np.asarray(positions, dtype=np.int64)
+    if len(positions) and np.array_equal(positions, np.arange(positions[0], positions[0] + len(positions))):
+        return bank.block(positions[0], positions[0] + len(positions))
+    return bank.take(positions)
+
+
+def _solve(hessian, gradient):
+    try:
+        return np.linalg.solve(hessian, gradient[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        return np.stack([np.linalg.lstsq(h, g, rcond=None)[0] for h, g in zip(hessian, gradient)])
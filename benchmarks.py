@@ -0,0 +1,268 @@
+"""Times the DecisionApp data paths on synthetic count datasets and writes the results as JSON.
+
+The GUI is replaced by a stub PySimpleGUI module, so the stages run headlessly
+and measure only the work behind the widgets: sampling and profiling the
+column_info, loading (cold and from the dataset cache), collinearity detection,
+set_columns, next_column/show_column and save_decisions. Every stage is timed `repeat` times and a separate pass
+under tracemalloc records its peak traced allocation. Example:
+    python benchmarks.py --rows 10000,100000 --columns 10,100 --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_ROWS = "10000,100000,1000000"
+DEFAULT_COLUMNS = "10,100,1000"
+GENERATE_ROWS = 100_000
+PANEL_SIZE = 10
+GROUPS = 20
+
+
+class StubElement:
+    def __init__(self, value=None):
+        self.value = value
+
+    def update(self, *args, **kwargs):
+        if "value" in kwargs:
+            self.value = kwargs["value"]
+
+    def Update(self, *args, **kwargs):
+        self.update(*args, **kwargs)
+
+    def get(self):
+        return self.value
+
+    def get_indexes(self):
+        return []
+
+
+class StubValues(dict):
+    def __missing__(self, key):
+        return False
+
+
+class StubWindow:
+    """ Records posted events and hands out elements whose get() returns preset values. """
+
+    values = {}
+
+    def __init__(self, *args, **kwargs):
+        self.elements = {}
+        self.events = []
+
+    def __getitem__(self, key):
+        if key not in self.elements:
+            self.elements[key] = StubElement(self.values.get(key, True))
+        return self.elements[key]
+
+    def write_event_value(self, event, value):
+        self.events.append((event, value))
+
+    def read(self, *args, **kwargs):
+        return None, StubValues()
+
+    def close(self):
+        pass
+
+
+def stub_gui():
+    """ A stand-in PySimpleGUI module: widgets are inert and popups return at once. """
+    module = types.ModuleType("PySimpleGUI")
+    module.Window = StubWindow
+    module.WIN_CLOSED = None
+    module.__getattr__ = lambda name: (lambda *args, **kwargs: StubElement())
+    return module
+
+
+def generate_dataset(path, rows, columns, seed=0):
+    """ Count response y, a panel column (PANEL_SIZE rows each), a group column and `columns` predictors. """
+    rng = np.random.default_rng(seed)
+    kinds = np.arange(columns) % 3
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        for start in range(0, rows, GENERATE_ROWS):
+            count = min(GENERATE_ROWS, rows - start)
+            frame = {"panel": (start + np.arange(count)) // PANEL_SIZE, "group": rng.integers(0, GROUPS, count)}
+            for j, kind in enumerate(kinds):
+                if kind == 0:
+                    frame[f"x{j}"] = rng.normal(size=count)
+                elif kind == 1:
+                    frame[f"x{j}"] = rng.poisson(3.0, count)
+                else:
+                    frame[f"x{j}"] = rng.random(count) < 0.3
+            eta = 0.2 + 0.1 * (frame["x0"] if columns else 0)
+            frame["y"] = rng.poisson(np.exp(eta))
+            pd.DataFrame(frame).to_csv(handle, index=False, header=start == 0, float_format="%.6g")
+
+
+def dispatch_load(app, meta_app):
+    """ Waits for the loader and feeds its events to the app as the window.read() loop would. """
+    app.loader.join()
+    for event, value in app.window.events:
+        if event == meta_app.HEADER_EVENT:
+            app.on_load_header(value)
+        elif event == meta_app.PROGRESS_EVENT:
+            app.on_load_progress(value)
+        elif event in (meta_app.DONE_EVENT, meta_app.CANCELLED_EVENT, meta_app.ERROR_EVENT):
+            app.on_load_finished(event, value)
+            if event != meta_app.DONE_EVENT:
+                raise RuntimeError(f"Load failed: {value}")
+    app.window.events.clear()
+
+
+def run_pipeline(meta_app, data_path, cache_dir, next_columns, trace=False):
+    """ One pass over the stages; returns {stage: (seconds, calls, peak traced bytes or None)}.
+
+    With trace, tracemalloc must be running; its peak is reset before each stage.
+    """
+    from collinearity import detect
+    from profiler import profile_csv, sample_csv
+
+    timings = {}
+
+    def timed(stage, function, calls=1):
+        if trace:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - start
+        timings[stage] = (seconds, calls, tracemalloc.get_traced_memory()[1] if trace else None)
+
+    app = meta_app.DecisionApp()
+    app.dataset_cache = meta_app.DatasetCache(cache_dir)
+    # Timed as a stage of its own rather than inside the background load.
+    app.detect_collinearity = False
+    timed("sample_csv", lambda: sample_csv(data_path))
+    timed("profile_csv", lambda: profile_csv(data_path, keep_frame=False))
+
+    StubWindow.values["-PREVIEW-"] = False
+    meta_app.sg.popup_get_file = lambda *args, **kwargs: data_path
+    timed("load_csv", lambda: (app.load_csv(), dispatch_load(app, meta_app)))
+    timed("load_csv_cached", lambda: (app.load_csv(), dispatch_load(app, meta_app)))
+    timed("detect_collinearity", lambda: detect(app.data))
+
+    StubWindow.values.update({"-Y-": "y", "-PANEL-": "panel", "-GROUPED-": "group"})
+    for key in ("-Y-", "-PANEL-", "-GROUPED-"):
+        app.window.elements.pop(key, None)
+    timed("set_columns", app.set_columns)
+
+    calls = min(next_columns, len(app.columns_to_process))
+    timed("next_column", lambda: [app.next_column() for _ in range(calls)], calls)
+
+    meta_app.sg.popup_get_file = lambda *args, **kwargs: os.path.join(cache_dir, "decisions.csv")
+    timed("save_decisions", app.save_decisions)
+    if app.column_stats is not None:
+        app.column_stats.close()
+    return timings
+
+
+def peak_memory(meta_app, data_path, cache_dir, next_columns):
+    """ Peak traced allocation per stage, from one pass under tracemalloc. """
+    tracemalloc.start()
+    try:
+        timings = run_pipeline(meta_app, data_path, cache_dir, next_columns, trace=True)
+    finally:
+        tracemalloc.stop()
+    return {stage: peak for stage, (_, _, peak) in timings.items()}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_sizes(text):
+    return [int(float(value)) for value in text.split(",") if value.strip()]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the DecisionApp data paths headlessly.")
+    parser.add_argument("--rows", default=DEFAULT_ROWS, help="Comma-separated row counts, such as 10000,50000000.")
+    parser.add_argument("--columns", default=DEFAULT_COLUMNS, help="Comma-separated predictor counts.")
+    parser.add_argument("--max-cells", type=float, default=2e8, help="Skip datasets with more rows x columns.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes per dataset; the minimum is reported.")
+    parser.add_argument("--next-columns", type=int, default=200, help="next_column calls per pass.")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass.")
+    parser.add_argument("--workdir", help="Directory for datasets and caches, defaults to a temporary one.")
+    parser.add_argument("--keep-data", action="store_true", help="Keep the generated datasets.")
+    parser.add_argument("--seed", type=int, default=0, help="Dataset seed.")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON results file.")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="meta_app_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    sys.modules["PySimpleGUI"] = stub_gui()
+    import meta_app
+
+    report = {
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {"repeat": args.repeat, "next_columns": args.next_columns, "seed": args.seed},
+        "results": []
+    }
+    try:
+        for rows in parse_sizes(args.rows):
+            for columns in parse_sizes(args.columns):
+                if rows * columns > args.max_cells:
+                    print(f"skip {rows} x {columns}: over --max-cells", flush=True)
+                    continue
+                data_path = os.path.join(workdir, f"bench_{rows}x{columns}.csv")
+                start = time.perf_counter()
+                if not os.path.exists(data_path):
+                    generate_dataset(data_path, rows, columns, args.seed)
+                dataset = {"rows": rows, "columns": columns, "bytes": os.path.getsize(data_path),
+                           "generate_seconds": time.perf_counter() - start}
+
+                passes = []
+                for _ in range(args.repeat):
+                    cache_dir = tempfile.mkdtemp(dir=workdir)
+                    passes.append(run_pipeline(meta_app, data_path, cache_dir, args.next_columns))
+                    shutil.rmtree(cache_dir, ignore_errors=True)
+                peaks = {}
+                if not args.no_memory:
+                    cache_dir = tempfile.mkdtemp(dir=workdir)
+                    peaks = peak_memory(meta_app, data_path, cache_dir, args.next_columns)
+                    shutil.rmtree(cache_dir, ignore_errors=True)
+
+                for stage in passes[0]:
+                    seconds = [timings[stage][0] for timings in passes]
+                    calls = passes[0][stage][1]
+                    report["results"].append({**dataset, "stage": stage, "seconds": min(seconds), "runs": seconds,
+                                              "calls": calls, "seconds_per_call": min(seconds) / max(calls, 1),
+                                              "peak_bytes": peaks.get(stage)})
+                    print(f"{rows:>10} x {columns:<6} {stage:<20} {min(seconds):10.4f}s", flush=True)
+                if not args.keep_data:
+                    os.remove(data_path)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"Wrote {len(report['results'])} results to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""Finds constant, duplicated and near-collinear columns of a loaded frame.
+
+Exact duplicates are found in linear time by hashing every column, with the
+candidates of a shared hash compared value by value. The distinct numeric
+columns then go through one correlation matrix, accumulated from row blocks
+as a sum of Z'Z products, and the pairs with |r| at or above the threshold
+are joined into groups with a union-find. Affine copies such as a rescaled
+column have |r| = 1 and land in the same group.
+"""
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+COLLINEAR_THRESHOLD = 0.999
+MAX_CORRELATION_ROWS = 20_000
+MAX_BLOCK_ELEMENTS = 5_000_000
+REPORT_COLUMNS = ["kind", "group", "partner", "correlation"]
+
+
+def column_hash(series):
+    """ Hash of a column's values, for columns that are not numeric. """
+    values = pd.util.hash_pandas_object(series, index=False).to_numpy()
+    return hashlib.blake2b(values.tobytes(), digest_size=16).hexdigest()
+
+
+def numeric_keys(data, columns, max_elements=MAX_BLOCK_ELEMENTS):
+    """ A 64-bit key per numeric column and whether the column holds a single value (nan included).
+
+    The key is the wrapping sum of the column's float64 bit patterns times fixed
+    random odd weights, so it is exact and does not depend on summation order;
+    numbers are compared as float64, so 1 and 1.0 give the same key.
+    """
+    weights = np.random.default_rng(0).integers(1, 2 ** 63, len(data), dtype=np.uint64) | np.uint64(1)
+    positions = data.columns.get_indexer(columns)
+    block_columns = max(1, max_elements // max(len(data), 1))
+    keys = np.zeros(len(columns), dtype=np.uint64)
+    constant = np.zeros(len(columns), dtype=bool)
+    for start in range(0, len(columns), block_columns):
+        x = data.iloc[:, positions[start:start + block_columns]].to_numpy(dtype=float, na_value=np.nan)
+        # Adding 0.0 turns -0.0 into 0.0, and every nan is given the same bit pattern.
+        x = x + 0.0
+        missing = np.isnan(x)
+        nans = missing.sum(axis=0)
+        if nans.any():
+            x[missing] = np.nan
+        keys[start:start + x.shape[1]] = (x.view(np.uint64) * weights[:, None]).sum(axis=0)
+        with np.errstate(invalid="ignore"):
+            single = np.fmin.reduce(x, axis=0) == np.fmax.reduce(x, axis=0)
+        constant[start:start + x.shape[1]] = (nans == len(x)) | ((nans == 0) & single)
+    return keys, constant
+
+
+def duplicate_groups(data, columns, keys=None):
+    """ Lists of two or more columns with identical values, each in the order of columns.
+
+    keys maps a numeric column to its numeric_keys key; other columns are hashed.
+    """
+    if keys is None:
+        numeric = [column for column in columns if pd.api.types.is_numeric_dtype(data[column])]
+        keys = dict(zip(numeric, numeric_keys(data, numeric)[0]))
+    by_key = {}
+    for column in columns:
+        key = ("number", int(keys[column])) if column in keys else ("text", column_hash(data[column]))
+        by_key.setdefault(key, []).append(column)
+    groups = []
+    for candidates in by_key.values():
+        # Equal keys all but certainly mean equal values, but it is cheap to make sure.
+        while len(candidates) > 1:
+            first = data[candidates[0]]
+            same = [column for column in candidates[1:] if _same_values(first, data[column])]
+            if same:
+                groups.append([candidates[0]] + same)
+            candidates = [column for column in candidates[1:] if column not in same]
+    return groups
+
+
+def _same_values(a, b):
+    if pd.api.types.is_numeric_dtype(a) and pd.api.types.is_numeric_dtype(b):
+        return np.array_equal(a.to_numpy(dtype=float, na_value=np.nan), b.to_numpy(dtype=float, na_value=np.nan),
+                              equal_nan=True)
+    return a.equals(b)
+
+
+def correlation_matrix(data, columns, max_rows=MAX_CORRELATION_ROWS, max_elements=MAX_BLOCK_ELEMENTS):
+    """ Correlations of the numeric columns over at most max_rows evenly spaced rows.
+
+    Missing values are set to the column mean, so they add nothing to the sums.
+    Rows are read in blocks of at most max_elements values, twice: once for the
+    means and once for the sum of the centred blocks' Z'Z.
+    """
+    rows = np.arange(len(data))
+    if len(rows) > max_rows:
+        rows = np.linspace(0, len(data) - 1, max_rows).astype(np.int64)
+    positions = data.columns.get_indexer(columns)
+    block_rows = max(1, max_elements // max(len(columns), 1))
+    blocks = [rows[start:start + block_rows] for start in range(0, len(rows), block_rows)]
+
+    def values(block):
+        return data.iloc[block, positions].to_numpy(dtype=float, na_value=np.nan)
+
+    sums = np.zeros(len(columns))
+    counts = np.zeros(len(columns))
+    for block in blocks:
+        x = values(block)
+        finite = np.isfinite(x)
+        sums += np.where(finite, x, 0.0).sum(axis=0)
+        counts += finite.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.nan_to_num(sums / counts)
+    gram = np.zeros((len(columns), len(columns)))
+    for block in blocks:
+        z = values(block) - means
+        z[~np.isfinite(z)] = 0.0
+        gram += z.T @ z
+    std = np.sqrt(np.diag(gram))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return gram / np.outer(std, std)
+
+
+def collinear_pairs(correlation, threshold=COLLINEAR_THRESHOLD, block_rows=1024):
+    """ (i, j, r) index pairs with i < j and |r| >= threshold, read one block of rows at a time. """
+    found = []
+    for start in range(0, len(correlation), block_rows):
+        block = np.abs(correlation[start:start + block_rows])
+        i, j = np.nonzero(block >= threshold)
+        keep = j > i + start
+        found.append((i[keep] + start, j[keep], correlation[i[keep] + start, j[keep]]))
+    if not found:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0)
+    return tuple(np.concatenate(parts) for parts in zip(*found))
+
+
+def _union_find_groups(count, pairs):
+    """ Root of each of count nodes after joining the pairs; a root is the smallest index of its group. """
+    parent = np.arange(count)
+
+    def root(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for i, j in pairs:
+        a, b = root(i), root(j)
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+    return np.array([root(node) for node in range(count)], dtype=np.int64)
+
+
+def detect(data, columns=None, threshold=COLLINEAR_THRESHOLD, max_rows=MAX_CORRELATION_ROWS):
+    """ Frame of REPORT_COLUMNS indexed by every flagged column.
+
+    Columns that copy one another share a group number and partner is the
+    group's first column. kind is "duplicate" for exact copies of the partner
+    (and for a partner that has some), "collinear" for the rest of a group and
+    "constant", with group -1, for columns holding a single value; correlation
+    is the correlation with the partner.
+    """
+    columns = list(data.columns if columns is None else columns)
+    numeric = [column for column in columns if pd.api.types.is_numeric_dtype(data[column])]
+    keys, single = numeric_keys(data, numeric)
+    flagged = {column for column, flag in zip(numeric, single) if flag}
+    numeric_set = set(numeric)
+    flagged.update(column for column in columns
+                   if column not in numeric_set and data[column].nunique(dropna=False) <= 1)
+    constant = [column for column in columns if column in flagged]
+    keys = {column: key for column, key, flag in zip(numeric, keys, single) if not flag}
+    columns = [column for column in columns if column not in flagged]
+    position = {column: i for i, column in enumerate(columns)}
+
+    pairs = []
+    stand_in = {}
+    duplicated = set()
+    for members in duplicate_groups(data, columns, keys):
+        for column in members[1:]:
+            pairs.append((position[members[0]], position[column]))
+            stand_in[column] = members[0]
+        duplicated.update(members)
+
+    # The first column of each duplicate group stands in for the rest in the correlation pass.
+    numeric = [column for column in columns if column in keys and column not in stand_in]
+    correlation = correlation_matrix(data, numeric, max_rows)
+    pairs_i, pairs_j, _ = collinear_pairs(correlation, threshold)
+    pairs.extend((position[numeric[i]], position[numeric[j]]) for i, j in zip(pairs_i, pairs_j))
+
+    roots = _union_find_groups(len(columns), pairs)
+    sizes = np.bincount(roots, minlength=len(columns))
+    numbers = {root: number for number, root in enumerate(np.unique(roots[sizes[roots] > 1]))}
+    numeric_index = {column: i for i, column in enumerate(numeric)}
+    records = {column: ("constant", -1, None, np.nan) for column in constant}
+    for index, column in enumerate(columns):
+        root = roots[index]
+        if sizes[root] < 2:
+            continue
+        partner = columns[root]
+        a, b = stand_in.get(column, column), stand_in.get(partner, partner)
+        if a == b:
+            r = 1.0
+        elif a in numeric_index and b in numeric_index:
+            r = float(correlation[numeric_index[a], numeric_index[b]])
+        else:
+            r = np.nan
+        exact = a == b and (column != partner or column in duplicated)
+        records[column] = ("duplicate" if exact else "collinear", numbers[root], partner, r)
+
+    frame = pd.DataFrame.from_dict(records, orient="index", columns=REPORT_COLUMNS)
+    frame.index.name = "column"
+    return frame
+
+
+def redundant_columns(report, columns, keep=()):
+    """ The columns of `columns` to leave out so each flagged group keeps one member, plus every constant.
+
+    The columns in keep (such as the Y, panel and grouped columns) are never
+    left out and do not count as group members, so a predictor that merely
+    tracks Y stays; each group keeps its first other member in the order of columns.
+    """
+    if report is None or report.empty:
+        return []
+    keep = set(keep)
+    order = {column: i for i, column in enumerate(columns)}
+    redundant = set(report.index[report["kind"] == "constant"]) - keep
+    for _, members in report[report["group"] >= 0].groupby("group"):
+        names = [name for name in members.index if name not in keep]
+        kept = sorted((name for name in names if name in order), key=order.get)[:1]
+        redundant.update(name for name in names if name not in kept)
+    return [column for column in columns if column in redundant]
+
+
+def describe(report, column):
+    """ Short note for the column panel, or "" for a column that was not flagged. """
+    if report is None or column not in report.index:
+        return ""
+    kind, group, partner, correlation = report.loc[column, REPORT_COLUMNS]
+    if kind == "constant":
+        return "Flagged: constant"
+    if partner == column:
+        return f"Flagged: first of {int((report['group'] == group).sum())} duplicate or collinear columns"
+    if kind == "duplicate":
+        return f"Flagged: duplicate of {partner}"
+    return f"Flagged: collinear with {partner} (r = {correlation:.4f})"
+
+
+def format_report(report):
+    counts = report["kind"].value_counts() if report is not None else {}
+    return ", ".join(f"{counts.get(kind, 0)} {kind}" for kind in ("constant", "duplicate", "collinear"))
@@ -0,0 +1,82 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from lru import LRUCache
+
+PREFETCH_COLUMNS = 3
+
+
+def compute_stats(values):
+    """ Extended statistics of one column used when choosing its levels and distributions. """
+    values = values.dropna()
+    stats = {"unique": int(values.nunique())}
+    if not pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+        stats["binary"] = stats["unique"] == 2
+        return stats
+
+    x = values.to_numpy(dtype=float)
+    mean = x.mean() if len(x) else np.nan
+    variance = x.var() if len(x) else np.nan
+    centered = x - mean
+    skewness = (centered ** 3).mean() / variance ** 1.5 if variance > 0 else 0.0
+    stats.update({
+        "mean": float(mean),
+        "variance": float(variance),
+        "zero_share": float((x == 0).mean()) if len(x) else np.nan,
+        "skewness": float(skewness),
+        "count": bool(len(x)) and bool((x >= 0).all() and (x == np.floor(x)).all()),
+        "binary": stats["unique"] == 2 and bool(np.isin(x, (0, 1)).all())
+    })
+    return stats
+
+
+def format_stats(stats):
+    text = f"Unique: {stats['unique']}"
+    if "mean" in stats:
+        text += (f", Mean: {stats['mean']:.4g}, Var: {stats['variance']:.4g}, Zeros: {stats['zero_share']:.1%}, "
+                 f"Skew: {stats['skewness']:.3g}")
+        if stats["count"]:
+            text += ", looks like counts"
+    if stats["binary"]:
+        text += ", binary"
+    return text
+
+
+class ColumnStats:
+    """ Lazily computed, LRU-memoized column statistics with background prefetching. """
+
+    def __init__(self, data, maxsize=256):
+        self.data = data
+        self.cache = LRUCache(maxsize)
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def get(self, column):
+        with self._lock:
+            stats = self.cache.get(column)
+            future = self._pending.get(column)
+        if stats is not None:
+            return stats
+        if future is not None:
+            return future.result()
+        return self._compute(column)
+
+    def prefetch(self, columns):
+        with self._lock:
+            columns = [col for col in columns if col not in self.cache and col not in self._pending]
+            for col in columns:
+                self._pending[col] = self._executor.submit(self._compute, col)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _compute(self, column):
+        stats = compute_stats(self.data[column])
+        with self._lock:
+            self.cache.put(column, stats)
+            self._pending.pop(column, None)
+        return stats
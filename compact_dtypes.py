@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_THRESHOLD = 0.5
+# Floats parsed from CSV are short decimals; a column whose values need more places than this stays float64.
+MAX_DECIMALS = 9
+LISTED_COLUMNS = 6
+
+
+def downcast_series(series, categorical_threshold=CATEGORICAL_THRESHOLD, float_rtol=0.0):
+    """ Narrowest dtype that holds the same values.
+
+    Integers go to the smallest signed int type and text with few distinct
+    values to a categorical. Floats go to float32 when float32 gives back every
+    value at the column's decimal precision (the fewest places, up to
+    MAX_DECIMALS, that hold all its values), so 12.34 fits while epoch seconds
+    near 1.6e9, which float32 holds only to 128, do not. A non-zero float_rtol
+    instead accepts errors within float_rtol of each value and of the column's
+    range.
+    """
+    if pd.api.types.is_bool_dtype(series):
+        return series
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast="integer")
+    if pd.api.types.is_float_dtype(series):
+        values = series.to_numpy()
+        if values.dtype == np.float32:
+            return series
+        with np.errstate(over="ignore", invalid="ignore"):
+            narrow = values.astype(np.float32)
+            back = narrow.astype(values.dtype)
+            if float_rtol:
+                finite = values[np.isfinite(values)]
+                spread = finite.max() - finite.min() if len(finite) else 0.0
+                same = np.allclose(back, values, rtol=float_rtol, atol=0.0, equal_nan=True) and \
+                    np.allclose(back, values, rtol=0.0, atol=float_rtol * spread, equal_nan=True)
+            else:
+                decimals = _decimals(values)
+                same = decimals is not None and np.array_equal(np.round(back, decimals), values, equal_nan=True)
+        return pd.Series(narrow, index=series.index, name=series.name) if same else series
+    if pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+        if len(series) and series.nunique(dropna=True) <= categorical_threshold * len(series):
+            return series.astype("category")
+    return series
+
+
+def _decimals(values):
+    """ Fewest decimal places, at most MAX_DECIMALS, that round every value to itself, or None. """
+    for decimals in range(MAX_DECIMALS + 1):
+        if np.array_equal(np.round(values, decimals), values, equal_nan=True):
+            return decimals
+    return None
+
+
+def memory_bytes(frame):
+    return int(frame.memory_usage(deep=True, index=False).sum())
+
+
+def downcast_frame(frame, categorical_threshold=CATEGORICAL_THRESHOLD, float_rtol=0.0):
+    """ Returns (compact frame, bytes before, bytes after, {column: new dtype} for the columns that changed). """
+    before = memory_bytes(frame)
+    compact = pd.DataFrame({
+        col: downcast_series(frame[col], categorical_threshold, float_rtol) for col in frame.columns
+    }, index=frame.index)
+    downcast = {col: str(compact[col].dtype) for col in frame.columns if compact[col].dtype != frame[col].dtype}
+    return compact, before, memory_bytes(compact), downcast
+
+
+def format_memory(before, after, downcast=None):
+    if before is None:
+        return f"Memory: {after / 1024 ** 2:.1f} MB"
+    saved = 1 - after / before if before else 0.0
+    text = f"Memory: {before / 1024 ** 2:.1f} MB -> {after / 1024 ** 2:.1f} MB ({saved:.0%} saved)"
+    if downcast:
+        by_dtype = {}
+        for col, dtype in downcast.items():
+            by_dtype.setdefault(dtype, []).append(str(col))
+        listed = []
+        for dtype, columns in sorted(by_dtype.items()):
+            more = f" and {len(columns) - LISTED_COLUMNS} more" if len(columns) > LISTED_COLUMNS else ""
+            listed.append(f"{dtype}: {', '.join(columns[:LISTED_COLUMNS])}{more}")
+        text = f"{text}; {len(downcast)} columns downcast ({'; '.join(listed)})"
+    return text
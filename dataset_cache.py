@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "meta_app")
+DEFAULT_MAX_BYTES = 10 * 1024 ** 3
+HASH_BLOCK = 1024 ** 2
+META_FILE = "meta.json"
+
+
+def fingerprint(file_path):
+    """ Key for a dataset: absolute path, size, mtime and a hash of its first, middle and last blocks.
+
+    Hashing sampled blocks rather than the whole file keeps the lookup constant-time
+    on multi-GB files; together with size and mtime it catches in-place edits.
+    """
+    stat = os.stat(file_path)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(os.path.abspath(file_path).encode("utf-8"))
+    digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+    with open(file_path, "rb") as handle:
+        for offset in sorted({0, max(stat.st_size // 2 - HASH_BLOCK // 2, 0), max(stat.st_size - HASH_BLOCK, 0)}):
+            handle.seek(offset)
+            digest.update(handle.read(HASH_BLOCK))
+    return digest.hexdigest()
+
+
+class DatasetCache:
+    """ On-disk cache of parsed frames and their column_info, keyed by fingerprint().
+
+    Each entry is a directory with one .npy file per column, so numeric columns
+    are memory-mapped on load, plus a meta.json holding the column names and
+    column_info. Text columns are stored as integer codes next to their
+    distinct values, so every file loads with allow_pickle=False and a cache on
+    a shared disk cannot run code. Least recently used entries are evicted once
+    the cache grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def key(self, file_path, variant=""):
+        key = fingerprint(file_path)
+        return f"{key}-{variant}" if variant else key
+
+    def entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, file_path, variant=""):
+        """ Returns (frame or None, column_info) for an unchanged file, or None on a miss.
+
+        variant separates entries of the same file loaded in different modes.
+        """
+        key = self.key(file_path, variant)
+        entry = self.entry_dir(key)
+        meta_path = os.path.join(entry, META_FILE)
+        try:
+            with open(meta_path, encoding="utf-8") as handle:
+                meta = json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+        frame = None
+        if meta["has_frame"]:
+            # Entries written before text columns were stored as codes held pickled arrays and are misses.
+            if not set(meta["kinds"]) <= {"numeric", "text"}:
+                return None
+            columns = {}
+            for i, name in enumerate(meta["columns"]):
+                path = os.path.join(entry, f"{i}.npy")
+                if meta["kinds"][i] == "text":
+                    codes = np.load(path, allow_pickle=False)
+                    categories = meta["categories"].get(str(i))
+                    if categories is None:
+                        categories = np.load(os.path.join(entry, f"{i}-categories.npy"), allow_pickle=False)
+                    values = pd.Categorical.from_codes(codes, pd.Index(categories, dtype=object))
+                    columns[name] = pd.Series(values).astype(meta["dtypes"][i])
+                else:
+                    columns[name] = np.load(path, mmap_mode="r", allow_pickle=False)
+            frame = pd.DataFrame(columns, copy=False)
+
+        os.utime(meta_path)
+        return frame, {name: meta["column_info"][name] for name in meta["columns"]}
+
+    def store(self, file_path, frame, column_info, variant=""):
+        key = self.key(file_path, variant)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        staging = os.path.join(self.cache_dir, f".{key}.{uuid.uuid4().hex}")
+        os.makedirs(staging)
+        try:
+            columns = list(column_info)
+            kinds = []
+            dtypes = []
+            categories = {}
+            if frame is not None:
+                dtypes = [str(frame[name].dtype) for name in columns]
+                for i, name in enumerate(columns):
+                    values = frame[name].to_numpy()
+                    if values.dtype.kind in "iufb":
+                        kinds.append("numeric")
+                        np.save(os.path.join(staging, f"{i}.npy"), np.ascontiguousarray(values), allow_pickle=False)
+                        continue
+                    kinds.append("text")
+                    codes, uniques = pd.factorize(frame[name], use_na_sentinel=True)
+                    uniques = list(np.asarray(uniques, dtype=object))
+                    np.save(os.path.join(staging, f"{i}.npy"), codes.astype(_code_dtype(len(uniques))),
+                            allow_pickle=False)
+                    if all(isinstance(value, str) for value in uniques):
+                        np.save(os.path.join(staging, f"{i}-categories.npy"), np.array(uniques, dtype=np.str_),
+                                allow_pickle=False)
+                    else:
+                        # Columns mixing text with numbers keep their values' types through JSON.
+                        categories[str(i)] = [value.item() if isinstance(value, np.generic) else value
+                                              for value in uniques]
+            meta = {
+                "source": os.path.abspath(file_path),
+                "columns": columns,
+                "kinds": kinds,
+                "dtypes": dtypes,
+                "categories": categories,
+                "has_frame": frame is not None,
+                "column_info": {name: _jsonable(info) for name, info in column_info.items()}
+            }
+            with open(os.path.join(staging, META_FILE), "w", encoding="utf-8") as handle:
+                json.dump(meta, handle)
+
+            entry = self.entry_dir(key)
+            shutil.rmtree(entry, ignore_errors=True)
+            os.replace(staging, entry)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        self.evict()
+
+    def load_arrays(self, file_path, name, variant=""):
+        """ Arrays stored next to the entry of file_path under name, or None. """
+        try:
+            with np.load(self._arrays_path(file_path, name, variant)) as stored:
+                return {key: stored[key] for key in stored.files}
+        except (OSError, ValueError):
+            return None
+
+    def store_arrays(self, file_path, name, arrays, variant=""):
+        """ Keeps derived arrays (such as a group index) with the cached entry; returns False without one. """
+        path = self._arrays_path(file_path, name, variant)
+        if not os.path.isdir(os.path.dirname(path)):
+            return False
+        staging = f"{path}.{uuid.uuid4().hex}.npz"
+        np.savez(staging, **arrays)
+        os.replace(staging, path)
+        return True
+
+    def _arrays_path(self, file_path, name, variant):
+        digest = hashlib.blake2b(name.encode("utf-8"), digest_size=8).hexdigest()
+        return os.path.join(self.entry_dir(self.key(file_path, variant)), f"arrays-{digest}.npz")
+
+    def evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            meta_path = os.path.join(path, META_FILE)
+            if name.startswith(".") or not os.path.isfile(meta_path):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+            entries.append((os.path.getmtime(meta_path), size, path))
+            total += size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+
+def _code_dtype(count):
+    return np.int32 if count < np.iinfo(np.int32).max else np.int64
+
+
+def _jsonable(info):
+    return {key: value.item() if isinstance(value, np.generic) else value for key, value in info.items()}
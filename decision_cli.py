@@ -0,0 +1,94 @@
+"""Writes the decisions and hyperparameter files from a dataset and a rules file, without the GUI.
+
+Example:
+    python decision_cli.py data.csv --y why --rules rules.json --output setup_data.csv
+"""
+import argparse
+import json
+import sys
+
+import pandas as pd
+
+from dataset_cache import DatasetCache
+from decisions import apply_rules, default_rules, save_decisions_csv, save_hyperparameters_csv
+from profiler import ColumnProfiler, profile_csv
+
+
+def load_column_info(file_path, sample_rows=0, use_cache=True):
+    if sample_rows:
+        sample = pd.read_csv(file_path, encoding="utf-8", on_bad_lines="warn", nrows=sample_rows)
+        profiler = ColumnProfiler(sample.columns)
+        profiler.update(sample)
+        return profiler.column_info()
+
+    cache = DatasetCache() if use_cache else None
+    cached = cache.load(file_path) if cache is not None else None
+    if cached is not None:
+        return cached[1]
+    frame, column_info = profile_csv(file_path, keep_frame=False)
+    if cache is not None:
+        cache.store(file_path, frame, column_info)
+    return column_info
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Create setup_data.csv and setup_hyper.csv without the GUI.")
+    parser.add_argument("dataset", help="CSV dataset to build decisions for.")
+    parser.add_argument("--y", required=True, help="Y column.")
+    parser.add_argument("--grouped", default="None", help="Grouped column.")
+    parser.add_argument("--panel", default="None", help="Panel column.")
+    parser.add_argument("--rules", help="JSON rules file with defaults and per dtype/name pattern overrides.")
+    parser.add_argument("--output", default="setup_data.csv", help="Decisions file to write.")
+    parser.add_argument("--hyper-output", default="setup_hyper.csv", help="Hyperparameter file to write.")
+    parser.add_argument("--sample-rows", type=int, default=0,
+                        help="Infer dtypes from the first N rows instead of profiling the whole file.")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the dataset cache.")
+    parser.add_argument("--model-types", nargs="+", default=["Poisson"], choices=["Poisson", "Negative Binomial"])
+    parser.add_argument("--objective", default="Single", choices=["Single", "Multi"])
+    parser.add_argument("--metric", default="BIC", choices=["BIC", "AIC", "RMSE"])
+    parser.add_argument("--second-metric", default=None, choices=["BIC", "AIC", "RMSE"])
+    parser.add_argument("--maxtime", default="240000", help="MAXTIME in seconds.")
+    parser.add_argument("--iterations", type=float, default=100.0, help="Iterations without improvement.")
+    parser.add_argument("--train-split", default="80")
+    parser.add_argument("--validation-split", default="0")
+    parser.add_argument("--test-split", default="100")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    rules = default_rules()
+    if args.rules:
+        with open(args.rules, encoding="utf-8") as handle:
+            rules = json.load(handle)
+
+    column_info = load_column_info(args.dataset, args.sample_rows, not args.no_cache)
+    if args.y not in column_info:
+        print(f"Y column {args.y!r} is not in {args.dataset}", file=sys.stderr)
+        return 1
+
+    decisions = apply_rules(column_info, rules, exclude=(args.y, args.grouped, args.panel))
+    if not decisions:
+        print("No columns to process. Please select valid columns.", file=sys.stderr)
+        return 1
+    save_decisions_csv(decisions, args.output)
+
+    save_hyperparameters_csv({
+        "Model Types": args.model_types,
+        "Objective Type": args.objective,
+        "Primary Objective Metric": args.metric,
+        "Secondary Objective Metric": args.second_metric if args.objective == "Multi" else None,
+        "MAXTIME": args.maxtime,
+        "Iterations": args.iterations,
+        "Train Split": args.train_split,
+        "Validation Split": args.validation_split,
+        "Test Split": args.test_split
+    }, args.hyper_output)
+
+    print(f"Wrote {len(decisions)} column decisions to {args.output} and hyperparameters to {args.hyper_output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+import numpy as np
+
+from decisions import DISTRIBUTIONS, LEVEL_COLUMNS
+
+PAGE_SIZE = 25
+
+
+class DecisionTableModel:
+    """ Decisions for every column held as arrays, with paging for a table that shows only visible rows.
+
+    Edits take absolute row indexes so a range or multi-row selection is applied
+    in one call, and the view asks for a single page of display rows afterwards.
+    """
+
+    def __init__(self, columns, levels=None, distributions=None, transformations=None):
+        self.columns = list(columns)
+        count = len(self.columns)
+        self.levels = np.ones((count, len(LEVEL_COLUMNS)), dtype=bool) if levels is None else np.array(levels, dtype=bool)
+        self.distributions = [list(DISTRIBUTIONS) for _ in range(count)] if distributions is None else [
+            list(values) for values in distributions]
+        self.transformations = [[] for _ in range(count)] if transformations is None else [
+            list(values) for values in transformations]
+        self.selected = set()
+
+    @classmethod
+    def from_app_state(cls, columns, decisions, column_distributions, column_transformations):
+        decided = {row[0]: row for row in decisions}
+        levels = np.ones((len(columns), len(LEVEL_COLUMNS)), dtype=bool)
+        distributions = []
+        transformations = []
+        for i, col in enumerate(columns):
+            if col in decided:
+                levels[i] = decided[col][1:1 + len(LEVEL_COLUMNS)]
+            distributions.append(column_distributions.get(col, DISTRIBUTIONS))
+            transformations.append(column_transformations.get(col, []))
+        return cls(columns, levels, distributions, transformations)
+
+    def __len__(self):
+        return len(self.columns)
+
+    def clamp_offset(self, offset, page_size=PAGE_SIZE):
+        return int(min(max(offset, 0), max(len(self) - page_size, 0)))
+
+    def page(self, offset, page_size=PAGE_SIZE):
+        stop = min(offset + page_size, len(self))
+        marks = np.where(self.levels[offset:stop], "x", "").tolist()
+        return [
+            [self.columns[i], *marks[i - offset], ", ".join(self.distributions[i]), ", ".join(self.transformations[i])]
+            for i in range(offset, stop)
+        ]
+
+    def visible_selection(self, offset, page_size=PAGE_SIZE):
+        return sorted(i - offset for i in self.selected if offset <= i < offset + page_size)
+
+    def select_visible(self, offset, visible_rows, page_size=PAGE_SIZE):
+        """ Replaces the selection inside the visible page, keeping rows selected on other pages. """
+        self.selected = {i for i in self.selected if not offset <= i < offset + page_size}
+        self.selected.update(offset + row for row in visible_rows)
+
+    def select_range(self, start, stop):
+        self.selected = set(range(max(start, 0), min(stop, len(self))))
+
+    def selected_indexes(self):
+        return np.fromiter(sorted(self.selected), dtype=np.intp, count=len(self.selected))
+
+    def set_levels(self, indexes, levels):
+        self.levels[indexes] = np.asarray(levels, dtype=bool)
+
+    def set_distributions(self, indexes, distributions):
+        for i in indexes:
+            self.distributions[i] = list(distributions)
+
+    def set_transformations(self, indexes, transformations):
+        for i in indexes:
+            self.transformations[i] = list(transformations)
+
+    def decisions(self):
+        return [
+            (col, *(bool(flag) for flag in levels), list(dists), list(trans))
+            for col, levels, dists, trans in zip(self.columns, self.levels, self.distributions, self.transformations)
+        ]
@@ -0,0 +1,264 @@
+import ast
+import fnmatch
+
+import numpy as np
+import pandas as pd
+
+LEVEL_COLUMNS = [f"Level {i}" for i in range(1, 7)]
+DECISION_COLUMNS = ["Column"] + LEVEL_COLUMNS + ["Distributions", "Transformations"]
+DISTRIBUTIONS = ["Normal", "Triangular", "Uniform"]
+TRANSFORMATIONS = ["No", "Sqrt", "Normalize", "Log", "Arcsinh"]
+HYPERPARAMETER_COLUMNS = ["Model Types", "Objective Type", "Primary Objective Metric", "Secondary Objective Metric",
+                          "MAXTIME", "Iterations", "Train Split", "Validation Split", "Test Split"]
+ALGORITHM_COLUMNS = ["Algorithm", "Initial Solutions", "Temperature", "Cooling Rate", "Crossover Rate", "Mutation Rate",
+                     "Population Size", "Harmony Memory Size", "HMCR", "Pitch Adjustment Rate", "Pitch Adjustment"]
+
+
+def decisions_frame(decisions):
+    return pd.DataFrame(decisions, columns=DECISION_COLUMNS)
+
+
+def save_decisions_csv(decisions, file_path):
+    decisions_frame(decisions).to_csv(file_path, index=False)
+
+
+def save_hyperparameters_csv(hyperparameters, file_path="setup_hyper.csv"):
+    pd.DataFrame([hyperparameters], columns=HYPERPARAMETER_COLUMNS).to_csv(file_path, index=False)
+
+
+def load_hyperparameters(file_path="setup_hyper.csv"):
+    """ The saved hyperparameters as a dict, with Model Types parsed back into a list. """
+    hyperparameters = pd.read_csv(file_path).iloc[0].to_dict()
+    model_types = hyperparameters.get("Model Types")
+    if isinstance(model_types, str):
+        hyperparameters["Model Types"] = ast.literal_eval(model_types)
+    return hyperparameters
+
+
+def save_algorithm_csv(parameters, file_path="setup_algorithm.csv"):
+    pd.DataFrame([parameters], columns=ALGORITHM_COLUMNS).to_csv(file_path, index=False)
+
+
+def load_algorithm_parameters(file_path="setup_algorithm.csv"):
+    """ The saved algorithm parameters as a dict, leaving out the ones the algorithm does not use. """
+    parameters = pd.read_csv(file_path).iloc[0].to_dict()
+    return {name: value for name, value in parameters.items() if not pd.isna(value)}
+
+
+def default_rules():
+    return {
+        "defaults": {
+            "levels": [1, 2, 3, 4, 5, 6],
+            "distributions": list(DISTRIBUTIONS),
+            "transformations": []
+        },
+        "rules": []
+    }
+
+
+def apply_rules(column_info, rules, exclude=()):
+    """ Builds one decision row per column from a rules dict.
+
+    rules["defaults"] gives the levels, distributions and transformations of every
+    column. Each entry of rules["rules"] may select columns by "dtype" (a glob such
+    as "float*"), "pattern" (a regex matched against the name) or both, and then
+    overrides any of "levels", "distributions" and "transformations", or drops the
+    columns with "exclude": true. Later rules win.
+    """
+    names = pd.Index([col for col in column_info if col not in exclude], dtype=object)
+    types = pd.Series([column_info[col]["type"] for col in names], index=names, dtype=object)
+
+    defaults = {**default_rules()["defaults"], **rules.get("defaults", {})}
+    levels = np.zeros((len(names), len(LEVEL_COLUMNS)), dtype=bool)
+    levels[:, _level_indexes(defaults["levels"])] = True
+    # Option lists are held as codes into a small table so every rule is a masked assignment.
+    distribution_options = [_option_list(defaults["distributions"], DISTRIBUTIONS)]
+    transformation_options = [_option_list(defaults["transformations"], TRANSFORMATIONS)]
+    distributions = np.zeros(len(names), dtype=np.intp)
+    transformations = np.zeros(len(names), dtype=np.intp)
+    keep = np.ones(len(names), dtype=bool)
+
+    for rule in rules.get("rules", []):
+        mask = np.ones(len(names), dtype=bool)
+        if "dtype" in rule:
+            matched = {dtype: fnmatch.fnmatchcase(dtype, rule["dtype"]) for dtype in types.unique()}
+            mask &= types.map(matched).to_numpy(dtype=bool)
+        if "pattern" in rule:
+            mask &= np.asarray(names.str.match(rule["pattern"]), dtype=bool)
+        if "levels" in rule:
+            levels[mask] = False
+            levels[np.ix_(mask, _level_indexes(rule["levels"]))] = True
+        if "distributions" in rule:
+            distribution_options.append(_option_list(rule["distributions"], DISTRIBUTIONS))
+            distributions[mask] = len(distribution_options) - 1
+        if "transformations" in rule:
+            transformation_options.append(_option_list(rule["transformations"], TRANSFORMATIONS))
+            transformations[mask] = len(transformation_options) - 1
+        if rule.get("exclude"):
+            keep &= ~mask
+
+    return [
+        (name, *(bool(flag) for flag in row), list(distribution_options[dist]), list(transformation_options[trans]))
+        for name, row, dist, trans in zip(names[keep], levels[keep], distributions[keep], transformations[keep])
+    ]
+
+
+def _level_indexes(enabled):
+    for level in enabled:
+        if not 1 <= int(level) <= len(LEVEL_COLUMNS):
+            raise ValueError(f"Unknown level: {level}")
+    return [int(level) - 1 for level in enabled]
+
+
+def _option_list(values, allowed):
+    unknown = [value for value in values if value not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown options {unknown}, expected some of {allowed}")
+    return list(values)
+
+
+DISTRIBUTION_SHIFT = len(LEVEL_COLUMNS)
+TRANSFORMATION_SHIFT = DISTRIBUTION_SHIFT + len(DISTRIBUTIONS)
+LEVEL_MASK = (1 << len(LEVEL_COLUMNS)) - 1
+DISTRIBUTION_MASK = (1 << len(DISTRIBUTIONS)) - 1
+TRANSFORMATION_MASK = (1 << len(TRANSFORMATIONS)) - 1
+
+
+def encode_options(values, allowed):
+    bits = 0
+    for value in values:
+        if value not in allowed:
+            raise ValueError(f"Unknown option {value!r}, expected one of {allowed}")
+        bits |= 1 << allowed.index(value)
+    return bits
+
+
+def decode_options(bits, allowed):
+    return [value for i, value in enumerate(allowed) if bits >> i & 1]
+
+
+def encode_decision(levels, distributions, transformations):
+    mask = 0
+    for i, flag in enumerate(levels):
+        mask |= bool(flag) << i
+    mask |= encode_options(distributions, DISTRIBUTIONS) << DISTRIBUTION_SHIFT
+    mask |= encode_options(transformations, TRANSFORMATIONS) << TRANSFORMATION_SHIFT
+    return mask
+
+
+class DecisionStore:
+    """ One uint16 bitmask per column in a NumPy structured array.
+
+    Bits 0-5 are Levels 1-6, bits 6-8 the distributions and bits 9-13 the
+    transformations, in the order of LEVEL_COLUMNS, DISTRIBUTIONS and
+    TRANSFORMATIONS. Option lists therefore come back in that canonical order.
+    Rows start undecided and only decided rows are written out.
+    """
+
+    def __init__(self, columns):
+        columns = list(columns)
+        width = max((len(col) for col in columns), default=1)
+        self.records = np.zeros(len(columns), dtype=[("column", f"U{width}"), ("mask", "<u2"), ("decided", "?")])
+        self.records["column"] = columns
+
+    @classmethod
+    def from_records(cls, records):
+        store = cls([])
+        store.records = records
+        return store
+
+    @classmethod
+    def from_decisions(cls, decisions):
+        store = cls([row[0] for row in decisions])
+        store.records["mask"] = [encode_decision(row[1:7], row[7], row[8]) for row in decisions]
+        store.records["decided"] = True
+        return store
+
+    @property
+    def columns(self):
+        return self.records["column"].tolist()
+
+    def __len__(self):
+        return int(self.records["decided"].sum())
+
+    def set(self, index, levels, distributions, transformations):
+        self.records[index] = (self.records["column"][index], encode_decision(levels, distributions, transformations),
+                               True)
+
+    def is_decided(self, index):
+        return bool(self.records["decided"][index])
+
+    def row(self, index):
+        mask = int(self.records["mask"][index])
+        levels = [bool(mask >> i & 1) for i in range(len(LEVEL_COLUMNS))]
+        return (str(self.records["column"][index]), *levels,
+                decode_options(mask >> DISTRIBUTION_SHIFT & DISTRIBUTION_MASK, DISTRIBUTIONS),
+                decode_options(mask >> TRANSFORMATION_SHIFT & TRANSFORMATION_MASK, TRANSFORMATIONS))
+
+    def decisions(self):
+        return [self.row(i) for i in np.flatnonzero(self.records["decided"])]
+
+    def levels(self):
+        return (self.records["mask"][:, None] >> np.arange(len(LEVEL_COLUMNS), dtype=np.uint16)) & 1 == 1
+
+    def merge(self, other):
+        """ Copies decided rows of other into the rows with the same column name. """
+        positions = pd.Index(self.records["column"]).get_indexer(other.records["column"])
+        found = (positions >= 0) & other.records["decided"]
+        self.records["mask"][positions[found]] = other.records["mask"][found]
+        self.records["decided"][positions[found]] = True
+        return int(found.sum())
+
+    def to_frame(self):
+        records = self.records[self.records["decided"]]
+        masks = records["mask"].astype(np.intp)
+        frame = pd.DataFrame({"Column": records["column"]})
+        for i, name in enumerate(LEVEL_COLUMNS):
+            frame[name] = (masks >> i & 1).astype(bool)
+        frame["Distributions"] = _option_strings(DISTRIBUTIONS)[masks >> DISTRIBUTION_SHIFT & DISTRIBUTION_MASK]
+        frame["Transformations"] = _option_strings(TRANSFORMATIONS)[masks >> TRANSFORMATION_SHIFT & TRANSFORMATION_MASK]
+        return frame
+
+    def save_csv(self, file_path):
+        self.to_frame().to_csv(file_path, index=False)
+
+    def save_binary(self, file_path):
+        np.save(file_path, self.records, allow_pickle=False)
+
+    @classmethod
+    def load_binary(cls, file_path):
+        return cls.from_records(np.load(file_path, allow_pickle=False))
+
+    @classmethod
+    def load_csv(cls, file_path):
+        frame = pd.read_csv(file_path, dtype={"Column": str})
+        store = cls(frame["Column"])
+        masks = np.zeros(len(frame), dtype=np.intp)
+        for i, name in enumerate(LEVEL_COLUMNS):
+            masks |= frame[name].astype(str).str.lower().eq("true").to_numpy().astype(np.intp) << i
+        masks |= _parse_options(frame["Distributions"], DISTRIBUTIONS) << DISTRIBUTION_SHIFT
+        masks |= _parse_options(frame["Transformations"], TRANSFORMATIONS) << TRANSFORMATION_SHIFT
+        store.records["mask"] = masks
+        store.records["decided"] = True
+        return store
+
+    @classmethod
+    def load(cls, file_path):
+        return cls.load_binary(file_path) if file_path.endswith(".npy") else cls.load_csv(file_path)
+
+    def save(self, file_path):
+        if file_path.endswith(".npy"):
+            self.save_binary(file_path)
+        else:
+            self.save_csv(file_path)
+
+
+def _option_strings(allowed):
+    return np.array([str(decode_options(bits, allowed)) for bits in range(1 << len(allowed))], dtype=object)
+
+
+def _parse_options(values, allowed):
+    # Only a handful of distinct lists appear in a file, so each is parsed once.
+    codes, uniques = pd.factorize(values.fillna("[]"))
+    lookup = np.array([encode_options(ast.literal_eval(text), allowed) for text in uniques], dtype=np.intp)
+    return lookup[codes]
@@ -0,0 +1,164 @@
+import os
+
+import numpy as np
+
+from dataset_cache import DEFAULT_CACHE_DIR
+
+DRAWS_DIR = os.path.join(DEFAULT_CACHE_DIR, "draws")
+DISTRIBUTION_KINDS = ["Uniform", "Normal", "Triangular"]
+SKIP = 10
+CHUNK_POINTS = 1_000_000
+
+# Acklam's rational approximation of the standard normal quantile, relative error below 1.2e-9.
+_A = [-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02, 1.383577518672690e+02,
+      -3.066479806614716e+01, 2.506628277459239e+00]
+_B = [-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02, 6.680131188771972e+01,
+      -1.328068155288572e+01]
+_C = [-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00, -2.549732539343734e+00,
+      4.374664141464968e+00, 2.938163982698783e+00]
+_D = [7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00, 3.754408661907416e+00]
+_LOW = 0.02425
+
+
+def primes(count):
+    found = []
+    candidate = 2
+    while len(found) < count:
+        if all(candidate % p for p in found if p * p <= candidate):
+            found.append(candidate)
+        candidate += 1
+    return found
+
+
+def scrambled_radical_inverse(index, base, permutations):
+    """ Radical inverse of index in base with the digit at position j mapped through permutations[j].
+
+    Every permutation keeps 0 in place, so the infinite tail of zero digits stays
+    zero and indexes from 1 up never give 0.
+    """
+    index = np.asarray(index, dtype=np.int64).copy()
+    result = np.zeros(index.shape)
+    scale = 1.0 / base
+    for permutation in permutations:
+        if not index.any():
+            break
+        index, digit = np.divmod(index, base)
+        result += permutation[digit] * scale
+        scale /= base
+    return result
+
+
+def halton_permutations(bases, seed):
+    """ One random digit permutation per base and digit position, for every position of a 63-bit index.
+
+    The tables do not depend on the number of points, so a longer sequence
+    starts with the points of a shorter one.
+    """
+    rng = np.random.default_rng(seed)
+    tables = []
+    for base in bases:
+        depth = int(np.ceil(63 * np.log(2) / np.log(base)))
+        tables.append([np.concatenate([[0], 1 + rng.permutation(base - 1)]) for _ in range(depth)])
+    return tables
+
+
+def halton(count, dimensions, seed=0, skip=SKIP):
+    """ (count, dimensions) scrambled Halton points in (0, 1), starting at index skip + 1. """
+    bases = primes(dimensions)
+    tables = halton_permutations(bases, seed)
+    index = np.arange(skip + 1, skip + count + 1, dtype=np.int64)
+    return np.column_stack([scrambled_radical_inverse(index, base, table) for base, table in zip(bases, tables)])
+
+
+def normal_quantile(u):
+    u = np.asarray(u, dtype=float)
+    x = np.empty(u.shape)
+    low = u < _LOW
+    high = u > 1 - _LOW
+    middle = ~(low | high)
+
+    q = u[middle] - 0.5
+    r = q * q
+    x[middle] = ((((((_A[0] * r + _A[1]) * r + _A[2]) * r + _A[3]) * r + _A[4]) * r + _A[5]) * q /
+                 (((((_B[0] * r + _B[1]) * r + _B[2]) * r + _B[3]) * r + _B[4]) * r + 1))
+    for tail, sign, values in ((low, 1, u[low]), (high, -1, 1 - u[high])):
+        q = np.sqrt(-2 * np.log(values))
+        x[tail] = sign * (((((_C[0] * q + _C[1]) * q + _C[2]) * q + _C[3]) * q + _C[4]) * q + _C[5]) / \
+            ((((_D[0] * q + _D[1]) * q + _D[2]) * q + _D[3]) * q + 1)
+    return x
+
+
+def triangular_quantile(u):
+    """ Symmetric triangular distribution on [-1, 1]. """
+    u = np.asarray(u, dtype=float)
+    return np.where(u < 0.5, np.sqrt(2 * u) - 1, 1 - np.sqrt(2 * (1 - u)))
+
+
+def uniform_quantile(u):
+    """ Uniform distribution on [-1, 1]. """
+    return 2 * np.asarray(u, dtype=float) - 1
+
+
+QUANTILES = {"Uniform": uniform_quantile, "Normal": normal_quantile, "Triangular": triangular_quantile}
+
+
+class DrawBank:
+    """ Scrambled Halton draws for simulated likelihoods, one memory-mapped .npy file per distribution.
+
+    Each file is a (dimensions, units, draws) float64 array: dimension j uses the
+    j-th prime base, and unit i takes points i * draws .. (i + 1) * draws - 1 of
+    that sequence, so the draws of one random parameter are contiguous per unit.
+    Units are observations or panels. The files are named by size and seed and
+    written once; every process that opens the same bank maps the same pages, so
+    workers read it without copying.
+    """
+
+    def __init__(self, units, draws, dimensions, seed=0, directory=DRAWS_DIR):
+        self.units = int(units)
+        self.draws = int(draws)
+        self.dimensions = int(dimensions)
+        self.seed = int(seed)
+        self.directory = directory
+
+    @classmethod
+    def for_row(cls, params, units, draws, dimensions, directory=DRAWS_DIR):
+        """ Bank seeded by the _random_seed of a run-table row. """
+        return cls(units, draws, dimensions, int(params.get("_random_seed", 0) or 0), directory)
+
+    def path(self, distribution):
+        return os.path.join(self.directory, f"halton-{distribution.lower()}-{self.dimensions}x{self.units}x"
+                                            f"{self.draws}-seed{self.seed}.npy")
+
+    def get(self, distribution):
+        """ Read-only memory map of the draws of distribution, generating the file on first use. """
+        if distribution not in QUANTILES:
+            raise ValueError(f"Unknown distribution {distribution!r}, expected one of {DISTRIBUTION_KINDS}")
+        path = self.path(distribution)
+        if not os.path.exists(path):
+            self._generate(distribution, path)
+        return np.load(path, mmap_mode="r")
+
+    def column(self, distribution, dimension):
+        """ (units, draws) view of one random parameter. """
+        return self.get(distribution)[dimension]
+
+    def _generate(self, distribution, path):
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        shape = (self.dimensions, self.units, self.draws)
+        bank = np.lib.format.open_memmap(temporary, mode="w+", dtype=np.float64, shape=shape)
+        bases = primes(self.dimensions)
+        count = self.units * self.draws
+        # The scrambling depends on the seed only, so every distribution of a bank uses the same points.
+        tables = halton_permutations(bases, self.seed)
+        quantile = QUANTILES[distribution]
+        for j, (base, table) in enumerate(zip(bases, tables)):
+            flat = bank[j].reshape(-1)
+            for start in range(0, count, CHUNK_POINTS):
+                stop = min(start + CHUNK_POINTS, count)
+                index = np.arange(SKIP + 1 + start, SKIP + 1 + stop, dtype=np.int64)
+                flat[start:stop] = quantile(scrambled_radical_inverse(index, base, table))
+        bank.flush()
+        del bank
+        # Concurrent first uses each write their own file; the rename makes whichever finishes first visible whole.
+        os.replace(temporary, path)
@@ -0,0 +1,188 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from transformations import TRANSFORM_FUNCTIONS
+
+MODEL_TYPES = ["Poisson", "Negative Binomial"]
+MAX_ITERATIONS = 100
+TOLERANCE = 1e-8
+ETA_LIMIT = 30.0
+
+
+class FitResult:
+    """ Outcome of one fit: coefficients, log-likelihood and the information criteria and errors. """
+
+    def __init__(self, model, params, loglik, n, k, mu, y, iterations, converged, alpha=None):
+        self.model = model
+        self.params = params
+        self.alpha = alpha
+        self.loglik = float(loglik)
+        self.n = n
+        self.k = k
+        self.aic = -2 * self.loglik + 2 * k
+        self.bic = -2 * self.loglik + k * math.log(n)
+        residuals = y - mu
+        self.rmse = float(np.sqrt(np.mean(residuals ** 2)))
+        self.mae = float(np.mean(np.abs(residuals)))
+        self.iterations = iterations
+        self.converged = converged
+
+    def metrics(self):
+        return {"loglik": self.loglik, "aic": self.aic, "bic": self.bic, "rmse": self.rmse, "mae": self.mae}
+
+
+def design_matrix(data, selection):
+    """ Intercept plus one column per (column, transformation) pair, as a float array. """
+    columns = [np.ones(len(data))]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for column, transformation in selection:
+            values = data[column].to_numpy(dtype=float, na_value=np.nan)[:, None]
+            columns.append(TRANSFORM_FUNCTIONS[transformation or "No"](values)[:, 0])
+    return np.column_stack(columns)
+
+
+def log_factorial(y):
+    if np.all(y == np.floor(y)) and (len(y) == 0 or y.min() >= 0):
+        table = np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, int(y.max(initial=0)) + 1)))])
+        return table[y.astype(np.int64)]
+    return np.frompyfunc(lambda value: math.lgamma(value + 1), 1, 1)(y).astype(float)
+
+
+def _solve(hessian, gradient):
+    try:
+        return np.linalg.solve(hessian, gradient)
+    except np.linalg.LinAlgError:
+        return np.linalg.lstsq(hessian, gradient, rcond=None)[0]
+
+
+def _poisson_loglik(eta, mu, y, log_fact):
+    return np.sum(y * eta - mu - log_fact)
+
+
+def fit_poisson(x, y, beta=None, max_iterations=MAX_ITERATIONS, tolerance=TOLERANCE, log_fact=None):
+    """ Poisson regression by Newton-Raphson with the analytic gradient X'(y - mu) and Hessian X'diag(mu)X. """
+    if log_fact is None:
+        log_fact = log_factorial(y)
+    if beta is None:
+        beta = np.zeros(x.shape[1])
+        beta[0] = np.log(max(y.mean(), 1e-8))
+    eta = np.clip(x @ beta, -ETA_LIMIT, ETA_LIMIT)
+    mu = np.exp(eta)
+    loglik = _poisson_loglik(eta, mu, y, log_fact)
+    converged = False
+    iteration = 0
+    for iteration in range(1, max_iterations + 1):
+        step = _solve(x.T @ (x * mu[:, None]), x.T @ (y - mu))
+        # Halve the step until the log-likelihood stops falling.
+        for _ in range(30):
+            trial = beta + step
+            eta = np.clip(x @ trial, -ETA_LIMIT, ETA_LIMIT)
+            mu = np.exp(eta)
+            trial_loglik = _poisson_loglik(eta, mu, y, log_fact)
+            if trial_loglik >= loglik - 1e-10 * abs(loglik):
+                break
+            step = step / 2
+        beta, loglik = trial, trial_loglik
+        if np.max(np.abs(step)) < tolerance:
+            converged = True
+            break
+    return FitResult("Poisson", beta, loglik, len(y), x.shape[1], mu, y, iteration, converged)
+
+
+def _count_sums(y_int, r):
+    """ sum_{j<y} log(r+j), 1/(r+j) and 1/(r+j)^2 per observation, from cumulative tables up to max(y). """
+    j = r + np.arange(int(y_int.max(initial=0)))
+    tables = [np.concatenate([[0.0], np.cumsum(values)]) for values in (np.log(j), 1 / j, 1 / j ** 2)]
+    return [table[y_int] for table in tables]
+
+
+def _nb_loglik(y, y_int, mu, r, log_fact):
+    log_gamma_ratio = _count_sums(y_int, r)[0]
+    return np.sum(log_gamma_ratio - log_fact + r * np.log(r / (r + mu)) + y * np.log(mu / (r + mu)))
+
+
+def fit_negative_binomial(x, y, beta=None, alpha=None, max_iterations=MAX_ITERATIONS, tolerance=TOLERANCE,
+                          log_fact=None):
+    """ NB2 regression (variance mu + alpha mu^2) by joint Newton-Raphson on (beta, log(1/alpha)).
+
+    The gamma-function terms of the likelihood and its derivatives are finite sums
+    over 0..y-1 for integer counts, so no special functions are needed.
+    """
+    if not np.all(y == np.floor(y)) or y.min(initial=0) < 0:
+        raise ValueError("The Negative Binomial model needs non-negative integer counts.")
+    y_int = y.astype(np.int64)
+    if log_fact is None:
+        log_fact = log_factorial(y)
+    if beta is None:
+        beta = fit_poisson(x, y, log_fact=log_fact).params
+    mu = np.exp(np.clip(x @ beta, -ETA_LIMIT, ETA_LIMIT))
+    if alpha is None:
+        alpha = max(np.mean((y - mu) ** 2 - mu) / max(np.mean(mu ** 2), 1e-12), 1e-2)
+    theta = np.append(beta, -np.log(alpha))
+    loglik = _nb_loglik(y, y_int, mu, np.exp(theta[-1]), log_fact)
+
+    converged = False
+    iteration = 0
+    for iteration in range(1, max_iterations + 1):
+        r = np.exp(theta[-1])
+        _, digamma_diff, trigamma_diff = _count_sums(y_int, r)
+        denominator = r + mu
+        score_r = digamma_diff + np.log(r / denominator) + (mu - y) / denominator
+        hess_r = -trigamma_diff + 1 / r - 1 / denominator - (mu - y) / denominator ** 2
+
+        gradient = np.append(x.T @ ((y - mu) * r / denominator), r * score_r.sum())
+        hessian = np.empty((len(theta), len(theta)))
+        hessian[:-1, :-1] = -(x.T @ (x * (mu * r * (r + y) / denominator ** 2)[:, None]))
+        hessian[:-1, -1] = hessian[-1, :-1] = x.T @ (r * (y - mu) * mu / denominator ** 2)
+        hessian[-1, -1] = r ** 2 * hess_r.sum() + r * score_r.sum()
+
+        step = -_solve(hessian, gradient)
+        for _ in range(30):
+            trial = theta + step
+            trial_mu = np.exp(np.clip(x @ trial[:-1], -ETA_LIMIT, ETA_LIMIT))
+            trial_loglik = _nb_loglik(y, y_int, trial_mu, np.exp(np.clip(trial[-1], -20, 20)), log_fact)
+            if np.isfinite(trial_loglik) and trial_loglik >= loglik - 1e-10 * abs(loglik):
+                break
+            step = step / 2
+        theta, mu, loglik = trial, trial_mu, trial_loglik
+        theta[-1] = np.clip(theta[-1], -20, 20)
+        if np.max(np.abs(step)) < tolerance:
+            converged = True
+            break
+
+    return FitResult("Negative Binomial", theta[:-1], loglik, len(y), len(theta), mu, y, iteration, converged,
+                     alpha=float(np.exp(-theta[-1])))
+
+
+def fit(x, y, model="Poisson", **kwargs):
+    if model == "Poisson":
+        return fit_poisson(x, y, **kwargs)
+    if model == "Negative Binomial":
+        return fit_negative_binomial(x, y, **kwargs)
+    raise ValueError(f"Unknown model type {model!r}, expected one of {MODEL_TYPES}")
+
+
+def estimate(data, y_column, selection, model="Poisson"):
+    """ Fits a fixed-effects (Level 2) count model of y_column on the (column, transformation) selection.
+
+    Rows where the response or any selected, transformed column is missing or
+    non-finite are dropped. Returns the FitResult.
+    """
+    x = design_matrix(data, selection)
+    y = data[y_column].to_numpy(dtype=float, na_value=np.nan)
+    keep = np.isfinite(y) & np.isfinite(x).all(axis=1)
+    return fit(x[keep], y[keep], model)
+
+
+def selection_from_decisions(decisions):
+    """ Level 2 (fixed effects) columns of the decision rows, each under its first transformation. """
+    return [(row[0], row[8][0] if row[8] else "No") for row in decisions if row[2]]
+
+
+def summary_frame(result, names):
+    frame = pd.DataFrame({"Parameter": ["Intercept"] + list(names), "Estimate": result.params})
+    if result.alpha is not None:
+        frame.loc[len(frame)] = ["alpha", result.alpha]
+    return frame
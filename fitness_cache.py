@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from dataset_cache import DEFAULT_CACHE_DIR
+from lru import LRUCache
+
+FITNESS_CACHE_PATH = os.path.join(DEFAULT_CACHE_DIR, "fitness.sqlite")
+DEFAULT_MAX_ROWS = 5_000_000
+MEMORY_ENTRIES = 100_000
+QUERY_BATCH = 500
+EVICT_EVERY = 1000
+
+
+def frame_fingerprint(frame):
+    """ Key for an in-memory dataset: a hash of its column names and values. """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([str(column) for column in frame.columns]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def canonical_specification(selection, y_column, model, levels=None, distributions=None):
+    """ Sorted (column, level, distribution, transformation) entries plus the response and model type.
+
+    levels and distributions map a column to its level and distribution; a
+    column not in them is a fixed effect (Level 2) with no distribution.
+    """
+    levels = levels or {}
+    distributions = distributions or {}
+    terms = sorted((str(column), int(levels.get(column, 2)), distributions.get(column) or "", transformation or "No")
+                   for column, transformation in selection)
+    return {"y": str(y_column), "model": model, "terms": terms}
+
+
+def specification_hash(selection, y_column, model, levels=None, distributions=None):
+    text = json.dumps(canonical_specification(selection, y_column, model, levels, distributions), separators=(",", ":"))
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class FitnessCache:
+    """ Objective values of evaluated specifications, shared by every run on the machine.
+
+    Entries live in a SQLite database in WAL mode, so parallel workers read
+    while one writes, and are keyed by dataset fingerprint plus
+    specification_hash(). An in-memory LRU in front serves repeated hits without
+    a query. Each entry holds a metrics dict and the coefficients in canonical
+    term order; once the table passes max_rows the least recently used entries
+    are deleted.
+    """
+
+    def __init__(self, path=FITNESS_CACHE_PATH, max_rows=DEFAULT_MAX_ROWS, memory_entries=MEMORY_ENTRIES,
+                 timeout=30.0):
+        self.path = path
+        self.max_rows = max_rows
+        self.memory = LRUCache(memory_entries)
+        self.touched = set()
+        self.writes = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS fitness (dataset TEXT NOT NULL, specification TEXT NOT NULL, "
+                                "metrics TEXT NOT NULL, params BLOB, used REAL NOT NULL, "
+                                "PRIMARY KEY (dataset, specification)) WITHOUT ROWID")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS fitness_used ON fitness (used)")
+
+    def get(self, dataset, specification):
+        return self.get_many(dataset, [specification]).get(specification)
+
+    def get_many(self, dataset, specifications):
+        """ Dict from each cached specification hash to {"metrics": ..., "params": array or None}. """
+        found = {}
+        missing = []
+        for specification in specifications:
+            entry = self.memory.get((dataset, specification))
+            if entry is None:
+                missing.append(specification)
+            else:
+                found[specification] = entry
+        for start in range(0, len(missing), QUERY_BATCH):
+            chunk = missing[start:start + QUERY_BATCH]
+            rows = self.connection.execute(
+                f"SELECT specification, metrics, params FROM fitness WHERE dataset = ? AND specification IN "
+                f"({','.join('?' * len(chunk))})", [dataset] + chunk).fetchall()
+            for specification, metrics, params in rows:
+                entry = {"metrics": json.loads(metrics),
+                         "params": None if params is None else np.frombuffer(params, dtype=np.float64)}
+                self.memory.put((dataset, specification), entry)
+                found[specification] = entry
+        self.touched.update((dataset, specification) for specification in found)
+        return found
+
+    def put_many(self, dataset, entries):
+        """ Stores {specification hash: (metrics dict, params array or None)} in one transaction. """
+        now = time.time()
+        rows = []
+        for specification, (metrics, params) in entries.items():
+            params = None if params is None else np.ascontiguousarray(params, dtype=np.float64)
+            self.memory.put((dataset, specification), {"metrics": metrics, "params": params})
+            self.touched.discard((dataset, specification))
+            rows.append((dataset, specification, json.dumps(metrics), None if params is None else params.tobytes(), now))
+        with self._transaction():
+            self.connection.executemany("INSERT OR REPLACE INTO fitness VALUES (?, ?, ?, ?, ?)", rows)
+            self._flush_touched(now)
+        self.writes += len(rows)
+        if self.writes >= EVICT_EVERY:
+            self.writes = 0
+            self.evict()
+
+    def flush(self):
+        """ Writes the access times of hits since the last write, which is what eviction orders by. """
+        if self.touched:
+            with self._transaction():
+                self._flush_touched(time.time())
+
+    def evict(self):
+        count = self.connection.execute("SELECT COUNT(*) FROM fitness").fetchone()[0]
+        if count > self.max_rows:
+            with self._transaction():
+                self.connection.execute("DELETE FROM fitness WHERE (dataset, specification) IN (SELECT dataset, "
+                                        "specification FROM fitness ORDER BY used LIMIT ?)", (count - self.max_rows,))
+            self.memory.clear()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM fitness").fetchone()[0]
+
+    def clear(self):
+        self.connection.execute("DELETE FROM fitness")
+        self.memory.clear()
+        self.touched.clear()
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def _flush_touched(self, now):
+        self.connection.executemany("UPDATE fitness SET used = ? WHERE dataset = ? AND specification = ?",
+                                    [(now, dataset, specification) for dataset, specification in self.touched])
+        self.touched.clear()
+
+    def _transaction(self):
+        return _Transaction(self.connection)
+
+
+class _Transaction:
+    # BEGIN IMMEDIATE takes the write lock up front, so concurrent writers wait on the busy timeout
+    # instead of failing when they upgrade a read lock.
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.connection.execute("COMMIT" if exc_type is None else "ROLLBACK")
+        return False
@@ -0,0 +1,220 @@
+"""Optional timing of the GUI event handlers, exported as a Chrome trace and a latency summary.
+
+Tracing is off unless META_APP_TRACE names the trace file to write when the
+app closes; META_APP_TRACE_MEMORY=1 adds tracemalloc peaks per span. While it
+is off, wrap() hands back the function it was given and span() a shared no-op
+context, so the event loops run the same code as without instrumentation.
+Open the trace in chrome://tracing or ui.perfetto.dev, or summarise it with
+    python instrumentation.py trace.json
+"""
+import argparse
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import nullcontext
+
+import numpy as np
+
+TRACE_ENV = "META_APP_TRACE"
+MEMORY_ENV = "META_APP_TRACE_MEMORY"
+NULL_SPAN = nullcontext()
+
+
+class _Span:
+    def __init__(self, tracer, name, category):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.children = 0
+        self.child_peak = 0
+
+    def __enter__(self):
+        self.tracer.stack.append(self)
+        self.blocks = sys.getallocatedblocks()
+        if self.tracer.memory:
+            self.base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter_ns()
+        tracer = self.tracer
+        tracer.stack.pop()
+        args = {"blocks": sys.getallocatedblocks() - self.blocks}
+        if tracer.memory:
+            # A nested span resets the peak, so the largest peak seen by the children is carried up.
+            peak = max(tracemalloc.get_traced_memory()[1], self.child_peak)
+            args["peak_bytes"] = peak - self.base
+            if tracer.stack:
+                tracer.stack[-1].child_peak = max(tracer.stack[-1].child_peak, peak)
+        duration = end - self.start
+        if tracer.stack:
+            tracer.stack[-1].children += duration
+        tracer.record(self.name, self.category, self.start, duration, duration - self.children, args)
+        return False
+
+
+class Tracer:
+    """ Collects complete ("X") trace events for named spans and their durations per (category, name).
+
+    Spans nest: the summary reports each span's total time and its self time,
+    the part not spent in traced children such as dialogs or widget updates.
+    Spans are meant for the GUI thread, which runs all handlers.
+    """
+
+    def __init__(self, path=None, enabled=None, memory=False):
+        self.path = path
+        self.enabled = bool(path) if enabled is None else enabled
+        self.memory = self.enabled and memory
+        self.events = []
+        self.durations = {}
+        self.stack = []
+        self.origin = time.perf_counter_ns()
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @classmethod
+    def from_environment(cls):
+        return cls(os.environ.get(TRACE_ENV) or None, memory=os.environ.get(MEMORY_ENV, "") not in ("", "0"))
+
+    def span(self, name, category="handler"):
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, str(name), category)
+
+    def wrap(self, name, function, category="handler"):
+        if not self.enabled or getattr(function, "traced", False):
+            return function
+
+        @functools.wraps(function)
+        def traced(*args, **kwargs):
+            with _Span(self, name, category):
+                return function(*args, **kwargs)
+
+        traced.traced = True
+        return traced
+
+    def wrap_all(self, handlers, category="handler"):
+        """ The same event -> handler mapping with every handler wrapped in a span named after its event. """
+        if not self.enabled:
+            return handlers
+        return {event: self.wrap(str(event), handler, category) for event, handler in handlers.items()}
+
+    def record(self, name, category, start, duration, self_duration, args):
+        self.events.append({"name": name, "cat": category, "ph": "X", "ts": (start - self.origin) / 1000,
+                            "dur": duration / 1000, "pid": os.getpid(), "tid": threading.get_ident(), "args": args})
+        self.durations.setdefault((category, name), []).append((duration, self_duration))
+
+    def summary(self):
+        return summarize(self.durations)
+
+    def write(self, path=None):
+        path = path or self.path
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms", "otherData": {"summary": self.summary()}},
+                      handle)
+        return path
+
+    def finish(self):
+        """ Writes the trace and prints the summary, when tracing is on. """
+        if not self.enabled or not self.events:
+            return None
+        path = self.write()
+        print(format_summary(self.summary()))
+        print(f"Trace written to {path}")
+        return path
+
+
+def instrument_gui(tracer, sg):
+    """ Traces the PySimpleGUI popups as "dialog" spans and element updates as "tk" spans, so the time of a
+    handler splits into dialogs, widget updates and its own work (mostly pandas).
+    """
+    if not tracer.enabled:
+        return
+    for name in dir(sg):
+        if name.startswith("popup") and callable(getattr(sg, name)):
+            setattr(sg, name, tracer.wrap(f"sg.{name}", getattr(sg, name), "dialog"))
+    element = getattr(sg, "Element", None)
+    for value in list(vars(sg).values()):
+        if isinstance(value, type) and element is not None and issubclass(value, element) \
+                and "update" in vars(value):
+            update = vars(value)["update"]
+            traced = tracer.wrap(f"{value.__name__}.update", update, "tk")
+            value.update = traced
+            if vars(value).get("Update") is update:
+                value.Update = traced
+
+
+def summarize(durations):
+    """ Rows of calls, total/self milliseconds and p50/p95/max latency per (category, name), slowest total first. """
+    rows = []
+    for (category, name), values in durations.items():
+        values = np.asarray(values, dtype=float) / 1e6
+        total = values[:, 0]
+        rows.append({"category": category, "name": name, "calls": len(total), "total_ms": total.sum(),
+                     "self_ms": values[:, 1].sum(), "p50_ms": float(np.percentile(total, 50)),
+                     "p95_ms": float(np.percentile(total, 95)), "max_ms": total.max()})
+    rows.sort(key=lambda row: row["total_ms"], reverse=True)
+    return [{key: float(value) if isinstance(value, np.floating) else value for key, value in row.items()}
+            for row in rows]
+
+
+def summary_from_trace(path):
+    with open(path, encoding="utf-8") as handle:
+        trace = json.load(handle)
+    events = trace["traceEvents"] if isinstance(trace, dict) else trace
+    # Self time is recomputed from the nesting of the complete events on each thread.
+    durations = {}
+    for thread in sorted({event["tid"] for event in events if event.get("ph") == "X"}):
+        stack = []
+        spans = sorted((event for event in events if event.get("ph") == "X" and event["tid"] == thread),
+                       key=lambda event: (event["ts"], -event["dur"]))
+        for event in spans:
+            while stack and stack[-1][0]["ts"] + stack[-1][0]["dur"] <= event["ts"]:
+                _close(stack.pop(), durations)
+            if stack:
+                stack[-1][1] += event["dur"]
+            stack.append([event, 0.0])
+        while stack:
+            _close(stack.pop(), durations)
+    return summarize(durations)
+
+
+def _close(entry, durations):
+    event, children = entry
+    key = (event.get("cat", ""), event["name"])
+    durations.setdefault(key, []).append((event["dur"] * 1000, (event["dur"] - children) * 1000))
+
+
+def format_summary(rows):
+    lines = [f"{'category':<10} {'name':<36} {'calls':>6} {'total ms':>10} {'self ms':>10} {'p50 ms':>9} "
+             f"{'p95 ms':>9} {'max ms':>9}"]
+    for row in rows:
+        lines.append(f"{row['category']:<10} {row['name'][:36]:<36} {row['calls']:>6} {row['total_ms']:>10.1f} "
+                     f"{row['self_ms']:>10.1f} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['max_ms']:>9.2f}")
+    return "\n".join(lines)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Print the per-handler latency summary of a META_APP_TRACE file.")
+    parser.add_argument("trace", help="Trace JSON written by the Decision Maker.")
+    parser.add_argument("--category", help="Only show spans of this category, such as handler, dialog or tk.")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    rows = summary_from_trace(args.trace)
+    if args.category:
+        rows = [row for row in rows if row["category"] == args.category]
+    print(format_summary(rows))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+
+from collinearity import detect
+from compact_dtypes import downcast_frame, memory_bytes
+from profiler import DEFAULT_CHUNKSIZE, LoadCancelled, profile_csv, read_header, refine_column_info, sample_csv
+
+HEADER_EVENT = "-LOAD-HEADER-"
+PROGRESS_EVENT = "-LOAD-PROGRESS-"
+DONE_EVENT = "-LOAD-DONE-"
+CANCELLED_EVENT = "-LOAD-CANCELLED-"
+ERROR_EVENT = "-LOAD-ERROR-"
+MEMORY_EVENT = "-LOAD-MEMORY-"
+PREVIEW_EVENT = "-LOAD-PREVIEW-"
+REFINE_EVENT = "-LOAD-REFINE-"
+COLLINEARITY_EVENT = "-LOAD-COLLINEARITY-"
+REFINE_SECONDS = 1.0
+
+
+class CSVLoader(threading.Thread):
+    """ Loads and profiles a CSV off the GUI thread.
+
+    Results are reported through post(event, value), which for a PySimpleGUI
+    window is window.write_event_value, so they arrive in the window.read() loop.
+    With preview, a sampled column_info is posted as PREVIEW_EVENT before the
+    full pass, and refined versions follow as REFINE_EVENT at most every
+    REFINE_SECONDS while it runs; DONE_EVENT still carries the exact one.
+    With collinearity, a loaded frame is then checked for constant, duplicate
+    and near-collinear columns and the report follows as COLLINEARITY_EVENT,
+    paired with the loader that made it as (loader, report).
+    """
+
+    def __init__(self, file_path, post, keep_frame=True, chunksize=DEFAULT_CHUNKSIZE, encoding="utf-8", cache=None,
+                 compact=False, preview=False, collinearity=True):
+        super().__init__(daemon=True)
+        self.file_path = file_path
+        self.post = post
+        self.keep_frame = keep_frame
+        self.chunksize = chunksize
+        self.encoding = encoding
+        self.cache = cache
+        self.compact = compact
+        # Compact entries are keyed on the float rule that shaped them.
+        self.cache_variant = "compact-decimals" if compact else ""
+        self.preview = preview
+        self.collinearity = collinearity
+        self.sample_info = None
+        self.refined_at = 0.0
+        self.total_bytes = os.path.getsize(file_path)
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def run(self):
+        try:
+            result = self._load_cached()
+            if result is not None:
+                self.post(HEADER_EVENT, list(result[1]))
+                if result[0] is not None:
+                    self.post(MEMORY_EVENT, (None, memory_bytes(result[0])))
+            else:
+                result = self._load()
+        except LoadCancelled:
+            self.post(CANCELLED_EVENT, self.file_path)
+        except Exception as e:
+            self.post(ERROR_EVENT, str(e))
+        else:
+            self.post(DONE_EVENT, result)
+            self._detect(result[0])
+
+    def _load(self):
+        self.post(HEADER_EVENT, read_header(self.file_path, self.encoding))
+        if self.preview:
+            self.sample_info = sample_csv(self.file_path, encoding=self.encoding)[1]
+            self.refined_at = time.monotonic()
+            self.post(PREVIEW_EVENT, self.sample_info)
+        result = profile_csv(self.file_path, chunksize=self.chunksize, keep_frame=self.keep_frame,
+                             encoding=self.encoding, progress=self._progress, cancel=self.cancelled)
+        if result[0] is not None:
+            result = self._compact(*result)
+        if self.cache is not None:
+            self.cache.store(self.file_path, *result, variant=self.cache_variant)
+        return result
+
+    def _load_cached(self):
+        if self.cache is None:
+            return None
+        result = self.cache.load(self.file_path, variant=self.cache_variant)
+        # An entry stored without its frame cannot serve a load that wants one.
+        if result is None or (self.keep_frame and result[0] is None):
+            return None
+        return result
+
+    def _compact(self, frame, column_info):
+        if not self.compact:
+            self.post(MEMORY_EVENT, (None, memory_bytes(frame)))
+            return frame, column_info
+        frame, before, after, downcast = downcast_frame(frame)
+        for col in column_info:
+            column_info[col]["type"] = str(frame[col].dtype)
+        self.post(MEMORY_EVENT, (before, after, downcast))
+        return frame, column_info
+
+    def _detect(self, frame):
+        # Runs after DONE_EVENT, so the columns can already be set while the check goes on.
+        if self.collinearity and frame is not None and not self.cancelled():
+            self.post(COLLINEARITY_EVENT, (self, detect(frame)))
+
+    def _progress(self, profiler, bytes_read):
+        self.post(PROGRESS_EVENT, {
+            "bytes_read": bytes_read,
+            "total_bytes": self.total_bytes,
+            "rows": profiler.rows,
+            "columns": len(profiler.column_names)
+        })
+        if self.sample_info is not None and bytes_read and time.monotonic() - self.refined_at >= REFINE_SECONDS:
+            estimated_rows = max(profiler.rows, int(profiler.rows * self.total_bytes / bytes_read))
+            self.post(REFINE_EVENT, refine_column_info(self.sample_info, profiler.column_info(), estimated_rows))
+            self.refined_at = time.monotonic()
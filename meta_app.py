@@ -1,14 +1,33 @@
+import os
 from pickle import FALSE
 
-import pandas as pd
+import numpy as np
 import PySimpleGUI as sg
 
+from collinearity import describe, format_report, redundant_columns
+from column_stats import PREFETCH_COLUMNS, ColumnStats, format_stats
+from compact_dtypes import format_memory
+from dataset_cache import DatasetCache
+from decision_table import PAGE_SIZE, DecisionTableModel
+from decisions import (DECISION_COLUMNS, DISTRIBUTIONS, LEVEL_COLUMNS, TRANSFORMATIONS, DecisionStore,
+                       load_hyperparameters, save_algorithm_csv, save_hyperparameters_csv)
+from estimation import MODEL_TYPES, estimate, selection_from_decisions, summary_frame
+from instrumentation import Tracer, instrument_gui
+from loader import (CANCELLED_EVENT, COLLINEARITY_EVENT, DONE_EVENT, ERROR_EVENT, HEADER_EVENT, MEMORY_EVENT,
+                    PREVIEW_EVENT, PROGRESS_EVENT, REFINE_EVENT, CSVLoader)
+from panel_index import build_indexes
+from run_grid import ALGORITHM_FIELDS, DEFAULT_SPECS, RUN_COLUMNS, grid_size, write_grid
+from screening import SCREEN_ALPHA, format_ranking, rank_columns, screen, screened_rows
+from search_space import estimate_run, format_estimate, read_maxtime
+from transformations import TransformationEngine, format_summary
+
 
 class DecisionApp:
     def __init__(self):
         self.data = None
         self.current_index = 0
-        self.decisions = []
+        self.decisions = DecisionStore([])
+        self.columns_to_process = []
         self.grouped_column = None
         self.panel_column = None
         self.y_column = None
@@ -16,18 +35,42 @@ class DecisionApp:
         self.column_info = {}
         self.column_distributions = {}
         self.column_transformations = {}
+        self.max_in_memory_bytes = 2 * 1024 ** 3
+        self.loader = None
+        self.dataset_cache = DatasetCache()
+        self.transformation_engine = None
+        self.column_stats = None
+        self.file_path = None
+        self.cache_variant = ""
+        self.group_indexes = {}
+        self.columns_loader = None
+        self.data_loader = None
+        self.detect_collinearity = True
+        self.collinearity = None
+        self.excluded_columns = set()
+        self.tracer = Tracer.from_environment()
+        instrument_gui(self.tracer, sg)
 
         layout = [
             [sg.Text("Load a CSV file to continue.")],
-            [sg.Button("Load CSV")],
+            [sg.Button("Load CSV"), sg.Button("Cancel Load", disabled=True),
+             sg.ProgressBar(1000, orientation='h', size=(20, 10), key="-PROGRESS-"),
+             sg.Checkbox("Compact dtypes", key="-COMPACT-", default=False),
+             sg.Checkbox("Preview", key="-PREVIEW-", default=False,
+                         tooltip="Show sampled, approximate column statistics while the full pass runs.")],
+            [sg.Text("", size=(90, 2), key="-MEMORY-")],
             [sg.Text("", size=(40, 1), key="-MESSAGE-")],
             [sg.Text("Grouped Column: "), sg.Combo(["None"], key="-GROUPED-")],
             [sg.Text("Panel Column: "), sg.Combo(["None"], key="-PANEL-")],
             [sg.Text("Y Column: "), sg.Combo([], key="-Y-")],
-            [sg.Button("Set Columns"), sg.Button("Next"), sg.Button("Save Decisions", disabled=True)],
+            [sg.Button("Set Columns"), sg.Button("Next"), sg.Button("Edit All Columns"),
+             sg.Button("Load Decisions"), sg.Button("Save Decisions", disabled=True),
+             sg.Button("Exclude Flagged", disabled=True)],
             [sg.Text("Current Column: ", size=(20, 1)), sg.Text("", key="-CURRENT-COLUMN-")],
             [sg.Text("", size=(20, 1), key="-DISPLAY-COLUMN-")],
-            [sg.Text("", size=(40, 1), key="-COLUMN-INFO-")],
+            [sg.Text("", size=(90, 2), key="-COLUMN-INFO-")],
+            [sg.Text("", size=(90, 1), key="-COLUMN-STATS-")],
+            [sg.Text("", size=(90, 5), key="-TRANSFORM-INFO-")],
             [
                 sg.Listbox(values=[], select_mode=sg.LISTBOX_SELECT_MODE_MULTIPLE, key="-DISTRIBUTIONS-", size=(30, 6)),
                 sg.Button("Remove Selected Distribution", disabled=True),
@@ -37,7 +80,8 @@ class DecisionApp:
                 sg.Listbox(values=[], select_mode=sg.LISTBOX_SELECT_MODE_MULTIPLE, key="-TRANSFORMATIONS-",
                            size=(30, 6)),
                 sg.Button("Remove Selected Transformation", disabled=True),
-                sg.Button("Add Transformation", disabled=True)
+                sg.Button("Add Transformation", disabled=True),
+                sg.Button("Remove Invalid Transformations")
             ],
             [sg.Checkbox("Level 1", key="-LEVEL1-", default=True), sg.Text("Off")],
             [sg.Checkbox("Level 2", key="-LEVEL2-", default=True), sg.Text("Fixed Effects")],
@@ -45,38 +89,156 @@ class DecisionApp:
             [sg.Checkbox("Level 4", key="-LEVEL4-", default=True), sg.Text("Correlated Random Parameters in Means")],
             [sg.Checkbox("Level 5", key="-LEVEL5-", disabled=True), sg.Text("Grouped Random Parameters")],
             [sg.Checkbox("Level 6", key="-LEVEL6-", default=True), sg.Text("Heterogeneity in Means")],
-            [sg.Button('Setup Hyper-Pararameters')]
+            [sg.Button('Setup Hyper-Pararameters'), sg.Button("Screen Columns"), sg.Button("Estimate Search Space"),
+             sg.Button("Fit Specification")]
         ]
 
         self.window = sg.Window("Decision Maker", layout)
 
     def load_csv(self):
+        if self.loader is not None and self.loader.is_alive():
+            sg.popup_warning("A file is already loading. Cancel it first.")
+            return
         file_path = sg.popup_get_file("Select a CSV file", file_types=(("CSV Files", "*.csv"),))
         if file_path:
             try:
-                self.data = pd.read_csv(file_path, encoding='utf-8', on_bad_lines='warn')
-                self.current_index = 0
-                self.decisions = []
-
-                self.column_names = self.data.columns.tolist()
-
-                self.window["-Y-"].update(values=self.column_names)
-                self.window["-GROUPED-"].update(values=["None"] + self.column_names)
-                self.window["-PANEL-"].update(values=["None"] + self.column_names)
+                # Files larger than the in-memory limit are only profiled, never held as a frame.
+                keep_frame = os.path.getsize(file_path) <= self.max_in_memory_bytes
+                self.loader = CSVLoader(file_path, self.window.write_event_value, keep_frame=keep_frame,
+                                        cache=self.dataset_cache, compact=self.window["-COMPACT-"].get(),
+                                        preview=self.window["-PREVIEW-"].get(),
+                                        collinearity=self.detect_collinearity)
+            except Exception as e:
+                sg.popup_error(f"Failed to load CSV: {e}")
+                return
+            self.data = None
+            self.column_info = {}
+            self.collinearity = None
+            self.excluded_columns = set()
+            self.window["Exclude Flagged"].update(disabled=True)
+            # The selections and decisions belong to the previous file, so they go together.
+            self.columns_to_process = []
+            self.y_column = None
+            self.panel_column = None
+            self.grouped_column = None
+            self.group_indexes = {}
+            self.columns_loader = None
+            self.data_loader = None
+            self.current_index = 0
+            self.decisions = DecisionStore([])
+            self.window["-PROGRESS-"].update(current_count=0)
+            self.window["Cancel Load"].update(disabled=False)
+            self.window["-MESSAGE-"].update(f"Loading {os.path.basename(file_path)}...")
+            self.loader.start()
+
+    def cancel_load(self):
+        if self.loader is not None and self.loader.is_alive():
+            self.loader.cancel()
+            self.window["-MESSAGE-"].update("Cancelling...")
+
+    def on_load_header(self, column_names):
+        self.column_names = column_names
+        self.window["-Y-"].update(values=self.column_names)
+        self.window["-GROUPED-"].update(values=["None"] + self.column_names)
+        self.window["-PANEL-"].update(values=["None"] + self.column_names)
+
+    def on_load_preview(self, column_info):
+        self.column_info = column_info
+        self.column_names = list(column_info)
+        if any(info.get("approximate") for info in column_info.values()):
+            sampled = max((info["sampled_rows"] for info in column_info.values()), default=0)
+            self.window["-MESSAGE-"].update(f"Preview of {sampled} sampled rows, statistics are approximate.")
+        else:
+            # A file shorter than the preview is read whole, so its statistics are already exact.
+            self.window["-MESSAGE-"].update("Preview read the whole file.")
+
+    def on_load_refine(self, column_info):
+        # Replaces the provisional statistics in place; the levels and distributions already chosen stay as they are.
+        self.column_info = column_info
+        self.show_column_info()
+
+    def on_collinearity(self, value):
+        loader, report = value
+        # The check finishes after DONE_EVENT, so a report can arrive once another file has started loading.
+        if loader is not self.data_loader:
+            return
+        self.collinearity = report
+        self.window["Exclude Flagged"].update(disabled=report.empty)
+        if not report.empty:
+            self.window["-MESSAGE-"].update(f"Flagged columns: {format_report(report)}.")
+        self.show_column_info()
+
+    def exclude_flagged(self):
+        """ Leaves the redundant flagged columns out of columns_to_process, keeping one column of each group. """
+        if not self.columns_to_process:
+            sg.popup_warning("Please set the column selections first.")
+            return
+        redundant = redundant_columns(self.collinearity, self.columns_to_process,
+                                      keep=[self.y_column, self.panel_column, self.grouped_column])
+        if not redundant:
+            sg.popup("No flagged columns left to exclude.")
+            return
+        if len(redundant) == len(self.columns_to_process):
+            sg.popup_warning("Every column to process is flagged; excluding them would leave none.")
+            return
+        listed = ", ".join(redundant[:30]) + (f" and {len(redundant) - 30} more" if len(redundant) > 30 else "")
+        if sg.popup_yes_no(f"Exclude {len(redundant)} flagged columns?\n{listed}", title="Exclude Flagged") != "Yes":
+            return
 
-                self.column_info = {}
-                for col in self.column_names:
-                    self.column_info[col] = {
-                        "type": str(self.data[col].dtype),
-                        "min": self.data[col].min(),
-                        "max": self.data[col].max()
-                    }
+        current = self.columns_to_process[min(self.current_index, len(self.columns_to_process) - 1)]
+        self.excluded_columns.update(redundant)
+        self.columns_to_process = [col for col in self.columns_to_process if col not in self.excluded_columns]
+        decisions = DecisionStore(self.columns_to_process)
+        decisions.merge(self.decisions)
+        self.decisions = decisions
+        # Stay on the same column, or on the next one kept when it was excluded.
+        position = {col: i for i, col in enumerate(self.columns_to_process)}
+        self.current_index = position.get(current, min(self.current_index, len(self.columns_to_process) - 1))
+        self.show_column()
 
+    def on_load_progress(self, progress):
+        total = max(progress["total_bytes"], 1)
+        self.window["-PROGRESS-"].update(current_count=int(1000 * progress["bytes_read"] / total))
+        self.window["-MESSAGE-"].update(
+            f"Read {progress['bytes_read'] / 1024 ** 2:.1f}/{total / 1024 ** 2:.1f} MB, "
+            f"{progress['rows']} rows, {progress['columns']} columns profiled"
+        )
+
+    def on_load_finished(self, event, value):
+        self.window["Cancel Load"].update(disabled=True)
+        loader = self.loader
+        self.loader = None
+        if event == DONE_EVENT:
+            self.data, self.column_info = value
+            self.data_loader = loader
+            self.file_path = loader.file_path
+            self.cache_variant = loader.cache_variant
+            self.group_indexes = {}
+            self.column_names = list(self.column_info)
+            self.transformation_engine = TransformationEngine(self.data) if self.data is not None else None
+            if self.column_stats is not None:
+                self.column_stats.close()
+            self.column_stats = ColumnStats(self.data) if self.data is not None else None
+            self.window["-PROGRESS-"].update(current_count=1000)
+            self.window["-MESSAGE-"].update("CSV loaded successfully.")
+            if loader.preview and self.columns_to_process and self.columns_loader is loader:
+                # Columns were set on the preview: finish their setup without interrupting the user.
+                self.build_group_indexes()
+                self.show_column_info()
+            else:
                 sg.popup("CSV loaded successfully.")
-            except Exception as e:
-                sg.popup_error(f"Failed to load CSV: {e}")
+        elif event == CANCELLED_EVENT:
+            self.window["-PROGRESS-"].update(current_count=0)
+            self.window["-MESSAGE-"].update("Loading cancelled.")
+        else:
+            self.window["-MESSAGE-"].update("")
+            sg.popup_error(f"Failed to load CSV: {value}")
 
     def set_columns(self):
+        if self.loader is not None and not self.column_info:
+            sg.popup_warning("Please wait for the CSV preview or load to finish.")
+            return
+
         self.grouped_column = self.window["-GROUPED-"].get()
         self.panel_column = self.window["-PANEL-"].get()
         self.y_column = self.window["-Y-"].get()
@@ -87,27 +249,43 @@ class DecisionApp:
 
         self.columns_to_process = [
             col for col in self.column_names
-            if col not in [self.y_column, self.grouped_column, self.panel_column]
+            if col not in [self.y_column, self.grouped_column, self.panel_column] and col not in self.excluded_columns
         ]
 
         if not self.columns_to_process:
             sg.popup_warning("No columns to process. Please select valid columns.")
             return
 
+        # Keep decisions already made for columns that are still being processed.
+        decisions = DecisionStore(self.columns_to_process)
+        decisions.merge(self.decisions)
+        self.decisions = decisions
+
+        # Columns set on a preview are finished off when this loader's full pass is done.
+        self.columns_loader = self.loader
+        self.build_group_indexes()
         self.current_index = 0
         self.show_column()
 
+    def build_group_indexes(self):
+        if self.data is None:
+            return
+        self.group_indexes = build_indexes(self.data, [self.panel_column, self.grouped_column], self.dataset_cache,
+                                           self.file_path, self.cache_variant)
+        if self.group_indexes:
+            self.window["-MESSAGE-"].update(", ".join(f"{column}: {len(index)} groups"
+                                                      for column, index in self.group_indexes.items()))
+
     def show_column(self):
         if self.current_index < len(self.columns_to_process):
             current_column = self.columns_to_process[self.current_index]
             self.window["-CURRENT-COLUMN-"].update(current_column)
             self.window["-DISPLAY-COLUMN-"].update(current_column)
 
-            info = self.column_info[current_column]
-            self.window["-COLUMN-INFO-"].update(f"Type: {info['type']}, Min: {info['min']}, Max: {info['max']}")
+            self.show_column_info()
 
             if current_column not in self.column_distributions:
-                self.column_distributions[current_column] = ["Normal", "Triangular", "Uniform"]
+                self.column_distributions[current_column] = list(DISTRIBUTIONS)
 
             self.window["-DISTRIBUTIONS-"].update(values=self.column_distributions[current_column])
 
@@ -121,8 +299,12 @@ class DecisionApp:
             self.window["Remove Selected Transformation"].update(disabled=False)
             self.window["Add Transformation"].update(disabled=False)
 
-            for i in range(1, 7):
-                self.window[f"-LEVEL{i}-"].update(True)
+            if self.decisions.is_decided(self.current_index):
+                levels = self.decisions.row(self.current_index)[1:7]
+            else:
+                levels = [True] * 6
+            for i, level in enumerate(levels, start=1):
+                self.window[f"-LEVEL{i}-"].update(level)
 
             if self.grouped_column == "None":
                 self.window["-LEVEL5-"].update(disabled=True)
@@ -136,80 +318,308 @@ class DecisionApp:
         else:
             sg.popup("End", "No more columns to process!")
 
+    def show_column_info(self):
+        """ Statistics of the current column, marked approximate while they come from a preview. """
+        if self.current_index >= len(self.columns_to_process):
+            return
+        current_column = self.columns_to_process[self.current_index]
+        info = self.column_info.get(current_column)
+        if info is not None:
+            text = (f"Type: {info['type']}, Min: {info['min']}, Max: {info['max']}, "
+                    f"Nulls: {info['nulls']}/{info['rows']}")
+            if info.get("approximate"):
+                text = f"~ {text} (approximate, {info['sampled_rows']} rows read)"
+            note = describe(self.collinearity, current_column)
+            if note:
+                text = f"{text}. {note}"
+            self.window["-COLUMN-INFO-"].update(text)
+
+        if self.column_stats is not None:
+            self.window["-COLUMN-STATS-"].update(format_stats(self.column_stats.get(current_column)))
+            upcoming = self.current_index + 1
+            self.column_stats.prefetch(self.columns_to_process[upcoming:upcoming + PREFETCH_COLUMNS])
+
+        if self.transformation_engine is not None:
+            summary = self.transformation_engine.summary(current_column)
+            self.window["-TRANSFORM-INFO-"].update(format_summary(summary))
+
     def next_column(self):
         if self.current_index < len(self.columns_to_process):
             decisions = [self.window[f"-LEVEL{i}-"].get() for i in range(1, 7)]
             current_column = self.columns_to_process[self.current_index]
             distributions = self.column_distributions[current_column]
             transformations = self.column_transformations[current_column]
-            self.decisions.append((current_column, *decisions, distributions, transformations))
+            self.decisions.set(self.current_index, decisions, distributions, transformations)
             self.current_index += 1
             self.show_column()
         else:
             sg.popup("End", "No more columns to process!")
 
+    def open_decision_table(self):
+        if not self.columns_to_process:
+            sg.popup_warning("Please set the column selections first.")
+            return
+
+        model = DecisionTableModel.from_app_state(self.columns_to_process, self.decisions.decisions(),
+                                                  self.column_distributions, self.column_transformations)
+        max_offset = model.clamp_offset(len(model))
+        layout = [
+            [sg.Table(values=model.page(0), headings=DECISION_COLUMNS, num_rows=PAGE_SIZE, key="-TABLE-",
+                      select_mode=sg.TABLE_SELECT_MODE_EXTENDED, enable_events=True, auto_size_columns=False,
+                      col_widths=[20] + [7] * len(LEVEL_COLUMNS) + [24, 30], justification="left"),
+             sg.Slider(range=(0, max_offset), default_value=0, orientation='v', size=(20, 15), disable_number_display=True,
+                       enable_events=True, key="-OFFSET-")],
+            [sg.Text(f"{len(model)} columns"), sg.Text("", size=(30, 1), key="-SELECTION-")],
+            [sg.Text("Rows"), sg.InputText("1", size=(6, 1), key="-FROM-"), sg.Text("to"),
+             sg.InputText(str(len(model)), size=(6, 1), key="-TO-"), sg.Button("Select Range"),
+             sg.Button("Select All"), sg.Button("Clear Selection")],
+            [sg.Checkbox(f"Level {i}", key=f"-TABLE-LEVEL{i}-", default=True) for i in range(1, 7)]
+            + [sg.Button("Apply Levels")],
+            [sg.Listbox(values=DISTRIBUTIONS, select_mode=sg.LISTBOX_SELECT_MODE_MULTIPLE, key="-TABLE-DISTRIBUTIONS-",
+                        size=(20, 3)), sg.Button("Apply Distributions"),
+             sg.Listbox(values=TRANSFORMATIONS, select_mode=sg.LISTBOX_SELECT_MODE_MULTIPLE,
+                        key="-TABLE-TRANSFORMATIONS-", size=(20, 5)), sg.Button("Apply Transformations")],
+            [sg.Button("Done"), sg.Button("Cancel")]
+        ]
+        table_window = sg.Window("Decision Table", layout, finalize=True)
+        offset = 0
+
+        def refresh():
+            # One update per widget for the visible page only, however many rows were edited.
+            table_window["-TABLE-"].update(values=model.page(offset), select_rows=model.visible_selection(offset))
+            table_window["-SELECTION-"].update(f"{len(model.selected)} selected")
+
+        while True:
+            event, values = table_window.read()
+            if event in (sg.WIN_CLOSED, "Cancel"):
+                break
+
+            if event == "-TABLE-":
+                model.select_visible(offset, values["-TABLE-"])
+                table_window["-SELECTION-"].update(f"{len(model.selected)} selected")
+                continue
+            if event == "-OFFSET-":
+                offset = model.clamp_offset(max_offset - int(values["-OFFSET-"]))
+            elif event == "Select Range":
+                try:
+                    model.select_range(int(values["-FROM-"]) - 1, int(values["-TO-"]))
+                except ValueError:
+                    sg.popup_warning("Row range must be two whole numbers.")
+                    continue
+            elif event == "Select All":
+                model.select_range(0, len(model))
+            elif event == "Clear Selection":
+                model.selected.clear()
+            elif event == "Apply Levels":
+                model.set_levels(model.selected_indexes(), [values[f"-TABLE-LEVEL{i}-"] for i in range(1, 7)])
+            elif event == "Apply Distributions":
+                model.set_distributions(model.selected_indexes(), values["-TABLE-DISTRIBUTIONS-"])
+            elif event == "Apply Transformations":
+                model.set_transformations(model.selected_indexes(), values["-TABLE-TRANSFORMATIONS-"])
+            elif event == "Done":
+                self.apply_decision_table(model)
+                break
+            refresh()
+
+        table_window.close()
+
+    def apply_decision_table(self, model):
+        self.decisions = DecisionStore.from_decisions(model.decisions())
+        for col, dists, trans in zip(model.columns, model.distributions, model.transformations):
+            self.column_distributions[col] = dists
+            self.column_transformations[col] = trans
+        self.current_index = len(self.columns_to_process)
+        self.window["Save Decisions"].update(disabled=False)
+        self.window["-MESSAGE-"].update(f"Decisions set for {len(self.decisions)} columns.")
+
     def save_decisions(self):
         if self.decisions:
-            output_df = pd.DataFrame(self.decisions,
-                                     columns=["Column"] + [f"Level {i}" for i in range(1, 7)] + ["Distributions",
-                                                                                                 "Transformations"])
             output_file_path = sg.popup_get_file("Save decisions as", save_as=True,
-                                                 file_types=(("CSV Files", "*.csv"),))
+                                                 file_types=(("CSV Files", "*.csv"), ("Binary Decisions", "*.npy")))
             if output_file_path:
-                output_df.to_csv(output_file_path, index=False)
+                self.decisions.save(output_file_path)
                 sg.popup("Success", "Decisions saved successfully!")
                 self.open_hyperparameter_window()
         else:
             sg.popup_warning("Warning", "No decisions to save!")
 
+    def current_decisions(self):
+        """ Decision rows for every column to process, using the defaults for columns not yet decided. """
+        rows = []
+        for i, col in enumerate(self.columns_to_process):
+            if self.decisions.is_decided(i):
+                rows.append(self.decisions.row(i))
+            else:
+                rows.append((col, *[True] * 6, self.column_distributions.get(col, list(DISTRIBUTIONS)),
+                             self.column_transformations.get(col, [])))
+        return rows
+
+    def screen_columns(self):
+        """ Ranks the columns by a score test against Y and turns off Levels 2-6 of those above the threshold. """
+        if self.data is None or not self.columns_to_process:
+            sg.popup_warning("Please load the data and set the column selections first.")
+            return
+        alpha = sg.popup_get_text("Turn off Levels 2-6 for columns with a p-value above:",
+                                  default_text=str(SCREEN_ALPHA))
+        if alpha is None:
+            return
+        try:
+            alpha = float(alpha)
+        except ValueError:
+            sg.popup_warning("The threshold must be a number.")
+            return
+
+        rows = self.current_decisions()
+        try:
+            ranking = rank_columns(screen(self.data, self.y_column, self.columns_to_process,
+                                          {row[0]: row[8] for row in rows}))
+        except ValueError as e:
+            sg.popup_error(f"Screening failed: {e}")
+            return
+        rows, pruned = screened_rows(rows, ranking, alpha)
+        pruned = set(pruned)
+        for i, row in enumerate(rows):
+            if row[0] in pruned:
+                self.decisions.set(i, row[1:7], row[7], row[8])
+        self.show_column()
+        sg.popup_scrolled(f"{len(pruned)} of {len(ranking)} numeric columns have p > {alpha:g}; "
+                          f"their Levels 2-6 are now off.\n\n{format_ranking(ranking, top=50)}",
+                          title="Column Screening", size=(100, 30))
+
+    def estimate_search_space(self):
+        if not self.columns_to_process:
+            sg.popup_warning("Please set the column selections first.")
+            return
+        estimate = estimate_run(self.current_decisions(), self.data, self.y_column, read_maxtime(),
+                                grouped=self.grouped_column not in (None, "None"), model=self.model_type())
+        sg.popup_scrolled(format_estimate(estimate), title="Search Space Estimate", size=(70, 25))
+
+    def model_type(self):
+        try:
+            model_types = load_hyperparameters("setup_hyper.csv")["Model Types"]
+        except (OSError, KeyError, ValueError, SyntaxError):
+            return MODEL_TYPES[0]
+        return model_types[0] if model_types else MODEL_TYPES[0]
+
+    def fit_specification(self):
+        if self.data is None or not self.columns_to_process:
+            sg.popup_warning("Load a dataset that fits in memory and set the columns first.")
+            return
+        selection = selection_from_decisions(self.current_decisions())
+        model = self.model_type()
+        try:
+            result = estimate(self.data, self.y_column, selection, model)
+        except Exception as e:
+            sg.popup_error(f"Fit failed: {e}")
+            return
+        metrics = ", ".join(f"{name.upper()}: {value:.4g}" for name, value in result.metrics().items())
+        table = summary_frame(result, [f"{col} ({transformation})" for col, transformation in selection])
+        sg.popup_scrolled(f"{model} fixed-effects model of {self.y_column} on {len(selection)} columns, "
+                          f"{result.n} rows\n{metrics}\nConverged: {result.converged} "
+                          f"in {result.iterations} iterations\n\n{table.to_string(index=False)}",
+                          title="Specification Fit", size=(80, 25))
+
+    def load_decisions(self):
+        if not self.columns_to_process:
+            sg.popup_warning("Please set the column selections first.")
+            return
+        file_path = sg.popup_get_file("Select a decisions file",
+                                      file_types=(("CSV Files", "*.csv"), ("Binary Decisions", "*.npy")))
+        if file_path:
+            try:
+                loaded = DecisionStore.load(file_path)
+            except Exception as e:
+                sg.popup_error(f"Failed to load decisions: {e}")
+                return
+
+            matched = self.decisions.merge(loaded)
+            for col, *_, distributions, transformations in loaded.decisions():
+                self.column_distributions[col] = distributions
+                self.column_transformations[col] = transformations
+
+            undecided = np.flatnonzero(~self.decisions.records["decided"])
+            self.current_index = int(undecided[0]) if len(undecided) else len(self.columns_to_process)
+            if len(self.decisions):
+                self.window["Save Decisions"].update(disabled=False)
+            sg.popup(f"Loaded decisions for {matched} of {len(self.columns_to_process)} columns.")
+            self.show_column()
+
     def open_algorithm_hyperparameter_window(self):
         # Initial layout with default parameters for Simulated Annealing (SA)
         layout = [
             [sg.Text("Select Algorithm:")],
             [sg.Radio("Simulated Annealing (SA)", "ALGORITHM", enable_events=True,key="-SA-", default=True)],
             [sg.Radio("Differential Evolution (DE)", "ALGORITHM", enable_events=True,key="-DE-")],
-            [sg.Radio("Hill Climbing (HS)", "ALGORITHM", enable_events=True,key="-HS-")],
+            [sg.Radio("Harmony Search (HS)", "ALGORITHM", enable_events=True,key="-HS-")],
             [sg.Text("Set Hyperparameters:", key  = "-BLAH-")],
             [sg.Column(self.get_algorithm_hyperparameters("SA"), key="-PARAMS-"), sg.Column(self.get_algorithm_hyperparameters("DE"), key="-PARAMSDE-", visible = False)
              ,sg.Column(self.get_algorithm_hyperparameters("HS"), key="-PARAMSHS-", visible = False)],  # Default to SA parameters
 
-            [sg.Button("Save Algorithm Parameters"), sg.Button("Cancel")]
+            [sg.Frame("Run Table Grid", self.get_run_grid_layout())],
+            [sg.Button("Save Algorithm Parameters"), sg.Button("Generate Run Table"), sg.Button("Cancel")]
         ]
 
         algorithm_window = sg.Window("Algorithm Hyperparameters", layout, finalize=True)
 
+        handlers = {
+            "Save Algorithm Parameters": self.save_algorithm_parameters,
+            "Generate Run Table": self.generate_run_table
+        }
+        for key in ("-SA-", "-DE-", "-HS-"):
+            handlers[key] = lambda values, key=key: self.show_algorithm_parameters(algorithm_window, key)
+        handlers = self.tracer.wrap_all(handlers, "algorithm")
+
         while True:
             event, values = algorithm_window.read()
-
-            # Check if a radio button was clicked
-            if event in ("-SA-", "-DE-", "-HS-"):
-                if event == '-DE-':
-                    algorithm_window["-PARAMS-"].Update(visible=False)
-                    algorithm_window["-PARAMSDE-"].Update(visible = True)
-                    algorithm_window["-PARAMSHS-"].Update(visible=False)
-                elif event == '-SA-':
-                    algorithm_window["-PARAMS-"].Update(visible=True)
-                    algorithm_window["-PARAMSDE-"].Update(visible=False)
-                    algorithm_window["-PARAMSHS-"].Update(visible=False)
-                elif event == '-HS-':
-                    algorithm_window["-PARAMS-"].Update(visible=False)
-                    algorithm_window["-PARAMSDE-"].Update(visible=False)
-                    algorithm_window["-PARAMSHS-"].Update(visible=True)
-
-
-
-
-
-
-
             if event in (sg.WIN_CLOSED, "Cancel"):
                 break
-
-            if event == "Save Algorithm Parameters":
-                self.save_algorithm_parameters(values)
+            handler = handlers.get(event)
+            if handler is not None:
+                handler(values)
 
         algorithm_window.close()
 
+    def show_algorithm_parameters(self, algorithm_window, key):
+        algorithm_window["-PARAMS-"].Update(visible=key == "-SA-")
+        algorithm_window["-PARAMSDE-"].Update(visible=key == "-DE-")
+        algorithm_window["-PARAMSHS-"].Update(visible=key == "-HS-")
+
+    def get_run_grid_layout(self):
+        """ Returns the layout for the run table grid: one value, list or start:stop:steps range per column. """
+        fields = [column for column in RUN_COLUMNS if column != "algorithm"]
+        rows = [[sg.Text("Values as a single value, a list (3,4,7) or a range with steps (0.05:0.2:3).")]]
+        for i in range(0, len(fields), 3):
+            rows.append([element for field in fields[i:i + 3] for element in (
+                sg.Text(f"{field}:", size=(14, 1)), sg.InputText(DEFAULT_SPECS[field], size=(14, 1), key=f"-GRID-{field}-"))])
+        rows.append([sg.Text("Algorithms:")] + [sg.Checkbox(name.upper(), key=f"-GRID-ALG-{name}-", default=True)
+                                                for name in ALGORITHM_FIELDS])
+        rows.append([sg.Radio("Cartesian", "GRID_MODE", key="-GRID-CARTESIAN-", default=True),
+                     sg.Radio("Latin Hypercube", "GRID_MODE", key="-GRID-LHS-"),
+                     sg.Text("Samples per algorithm:"), sg.InputText("1000", size=(10, 1), key="-GRID-SAMPLES-"),
+                     sg.Text("Seed:"), sg.InputText("0", size=(6, 1), key="-GRID-SEED-")])
+        return rows
+
+    def generate_run_table(self, values):
+        specs = {field: values[f"-GRID-{field}-"] for field in RUN_COLUMNS if field != "algorithm"}
+        algorithms = [name for name in ALGORITHM_FIELDS if values[f"-GRID-ALG-{name}-"]]
+        mode = "lhs" if values["-GRID-LHS-"] else "cartesian"
+        try:
+            samples = int(values["-GRID-SAMPLES-"])
+            seed = int(values["-GRID-SEED-"])
+            size = grid_size(specs, algorithms, mode, samples)
+        except ValueError as e:
+            sg.popup_error(f"Invalid grid values: {e}")
+            return
+        if not algorithms or size == 0:
+            sg.popup_warning("The grid is empty. Select an algorithm and at least one value per column.")
+            return
+
+        output_file_path = sg.popup_get_file(f"Save run table ({size} rows)", save_as=True,
+                                             default_path="set_data.csv", file_types=(("CSV Files", "*.csv"),))
+        if output_file_path:
+            rows = write_grid(output_file_path, specs, algorithms, mode, samples, seed)
+            sg.popup(f"Wrote {rows} runs to {output_file_path}")
+
     def get_algorithm_hyperparameters(self, algorithm):
         """ Returns the layout for the hyperparameters based on the selected algorithm. """
 
@@ -217,22 +627,20 @@ class DecisionApp:
         if algorithm == "SA":
             return [
                 [sg.Text("Initial Number of Solutions for Probability Acceptance:"),
-                 sg.Slider(range=(1, 100), default_value=50, orientation='h', key="-SLNS-")]
+                 sg.Slider(range=(1, 100), default_value=50, orientation='h', key="-SLNS-")],
                 [sg.Text("Initial Acceptance Probability:"), sg.Slider(range=(1, 100), default_value=50, orientation='h', key="-TEMP-")],
                 [sg.Text("Crossover Rate:"), sg.Slider(range=(0.01, 1), default_value=0.3, orientation='h', key="-CROSSOVER-")],
                 [sg.Text("Cooling Rate:"),
                  sg.Slider(range=(0.01, 1), resolution=0.01, default_value=0.95, orientation='h', key="-COOLING_RATE-")],
                 [sg.Text("Mutation Rate:"),
-                sg.Slider(range=(0.01, 1), resolution=0.01, default_value=0.2, orientation='h', key="-COOLING_RATE-")]
+                sg.Slider(range=(0.01, 1), resolution=0.01, default_value=0.2, orientation='h', key="-MUTATION-")]
             ]
         elif algorithm == "DE":
             return [
                 [sg.Text("Crossover Rate:"),
-                 sg.Slider(range=(0.0, 1.0), resolution=0.01, default_value=0.8, orientation='h', key="-CROSSOVER-")],
+                 sg.Slider(range=(0.0, 1.0), resolution=0.01, default_value=0.8, orientation='h', key="-DE-CROSSOVER-")],
                 [sg.Text("Mutation Rate:"),
-                 sg.Slider(range=(0.01, 1), resolution=0.01, default_value=0.2, orientation='h', key="-COOLING_RATE-")],
-                [sg.Text("Pitch Adjustment Range:"),
-                 sg.Slider(range=(1, 5), default_value=1, orientation='h', key="-PITCH-")],
+                 sg.Slider(range=(0.01, 1), resolution=0.01, default_value=0.5, orientation='h', key="-DE-MUTATION-")],
                 [sg.Text("Population Size:"),
                  sg.Slider(range=(5, 100), default_value=20, orientation='h', key="-POP_SIZE-")]
             ]
@@ -244,26 +652,36 @@ class DecisionApp:
                 [sg.Text("HMCR:"),
                  sg.Slider(range=(0.0, 1.0), resolution=0.01, default_value=0.9, orientation='h', key="-HMCR-")],
                 [sg.Text("Pitch Adjustment Rate:"),
-                 sg.Slider(range=(0.0, 1.0), resolution=0.01, default_value=0.5, orientation='h', key="-PAI-")]
+                 sg.Slider(range=(0.0, 1.0), resolution=0.01, default_value=0.5, orientation='h', key="-PAI-")],
                 [sg.Text("Pitch Adjustment Range:"),
                 sg.Slider(range=(1, 5), default_value=1, orientation='h', key="-PITCH-")]
             ]
 
     def save_algorithm_parameters(self, values):
-        algorithm_params = {
-            "Algorithm": "SA" if values["-SA-"] else "DE" if values["-DE-"] else "HS",
-            "Temperature": values.get("-TEMP-", None),
-            "Cooling Rate": values.get("-COOLING_RATE-", None),
-            "Crossover Rate": values.get("-CROSSOVER-", None),
-            "Pitch Adjustment": values.get("-PITCH-", None),
-            "Population Size": values.get("-POP_SIZE-", None),
-            "Harmony Memory Size": values.get("-HMS-", None),
-            "HMCR": values.get("-HMCR-", None),
-            "Pitch Adjustment Rate": values.get("-PAI-", None)
-        }
-        # Save or process the algorithm parameters as needed
-        print("Algorithm Parameters:", algorithm_params)
-        sg.popup("Algorithm parameters saved successfully!")
+        algorithm = "SA" if values["-SA-"] else "DE" if values["-DE-"] else "HS"
+        if algorithm == "SA":
+            algorithm_params = {
+                "Initial Solutions": values["-SLNS-"],
+                "Temperature": values["-TEMP-"],
+                "Cooling Rate": values["-COOLING_RATE-"],
+                "Crossover Rate": values["-CROSSOVER-"],
+                "Mutation Rate": values["-MUTATION-"]
+            }
+        elif algorithm == "DE":
+            algorithm_params = {
+                "Crossover Rate": values["-DE-CROSSOVER-"],
+                "Mutation Rate": values["-DE-MUTATION-"],
+                "Population Size": values["-POP_SIZE-"]
+            }
+        else:
+            algorithm_params = {
+                "Harmony Memory Size": values["-HMS-"],
+                "HMCR": values["-HMCR-"],
+                "Pitch Adjustment Rate": values["-PAI-"],
+                "Pitch Adjustment": values["-PITCH-"]
+            }
+        save_algorithm_csv({"Algorithm": algorithm, **algorithm_params}, "setup_algorithm.csv")
+        sg.popup("Algorithm parameters saved as setup_algorithm.csv")
 
     # Call this method from the appropriate place in your existing code
     # For example, after saving hyperparameters or wherever logical
@@ -304,35 +722,34 @@ class DecisionApp:
 
         while True:
             event, values = hyper_window.read()
-            print(event)
-            # Check for radio button changes
-            if event in ("-SINGLE-OBJECTIVE-", "-MULTI-OBJECTIVE-"):
-                # Enable/disable secondary objective metric dropdown
-                hyper_window["-SECOND_OBJECTIVE_METRIC-"].update(disabled=not values["-MULTI-OBJECTIVE-"])
-
-                # Enable/disable train, validation, and test split inputs
-                if values["-MULTI-OBJECTIVE-"]:
-                    hyper_window["-TRAIN_SPLIT-"].update(disabled=False)
+            if event in (sg.WIN_CLOSED, "Cancel"):
+                break
+            with self.tracer.span(event, "hyper"):
+                # Check for radio button changes
+                if event in ("-SINGLE-OBJECTIVE-", "-MULTI-OBJECTIVE-"):
+                    # Enable/disable secondary objective metric dropdown
+                    hyper_window["-SECOND_OBJECTIVE_METRIC-"].update(disabled=not values["-MULTI-OBJECTIVE-"])
+
+                    # Enable/disable train, validation, and test split inputs
+                    if values["-MULTI-OBJECTIVE-"]:
+                        hyper_window["-TRAIN_SPLIT-"].update(disabled=False)
+                        hyper_window["-VALIDATION_SPLIT-"].update(disabled=False)
+                        hyper_window["-TEST_SPLIT-"].update(disabled=False)
+                    else:
+                        hyper_window["-TRAIN_SPLIT-"].update(disabled=True, value="80")
+                        hyper_window["-VALIDATION_SPLIT-"].update(disabled=True, value="10")
+                        hyper_window["-TEST_SPLIT-"].update(disabled=True, value="10")
+
+                # Enable/disable validation split inputs based on selection
+                if values["-VALIDATION-YES-"]:
                     hyper_window["-VALIDATION_SPLIT-"].update(disabled=False)
                     hyper_window["-TEST_SPLIT-"].update(disabled=False)
                 else:
-                    hyper_window["-TRAIN_SPLIT-"].update(disabled=True, value="80")
-                    hyper_window["-VALIDATION_SPLIT-"].update(disabled=True, value="10")
-                    hyper_window["-TEST_SPLIT-"].update(disabled=True, value="10")
-
-            # Enable/disable validation split inputs based on selection
-            if values["-VALIDATION-YES-"]:
-                hyper_window["-VALIDATION_SPLIT-"].update(disabled=False)
-                hyper_window["-TEST_SPLIT-"].update(disabled=False)
-            else:
-                hyper_window["-VALIDATION_SPLIT-"].update(disabled=True, value="0")
-                hyper_window["-TEST_SPLIT-"].update(disabled=True, value="100")
-
-            if event in (sg.WIN_CLOSED, "Cancel"):
-                break
+                    hyper_window["-VALIDATION_SPLIT-"].update(disabled=True, value="0")
+                    hyper_window["-TEST_SPLIT-"].update(disabled=True, value="100")
 
-            if event == "Save Hyperparameters":
-                self.save_hyperparameters(values)
+                if event == "Save Hyperparameters":
+                    self.save_hyperparameters(values)
 
         hyper_window.close()
 
@@ -348,8 +765,7 @@ class DecisionApp:
             "Validation Split": values["-VALIDATION_SPLIT-"] if values["-VALIDATION-YES-"] else "0",
             "Test Split": values["-TEST_SPLIT-"] if values["-VALIDATION-YES-"] else "100"
         }
-        df = pd.DataFrame([hyperparameters])
-        df.to_csv("setup_hyper.csv", index=False)
+        save_hyperparameters_csv(hyperparameters, "setup_hyper.csv")
         sg.popup("Hyperparameters saved as setup_hyper.csv")
 
     def remove_distribution(self):
@@ -363,7 +779,7 @@ class DecisionApp:
     def add_distribution(self):
         current_column = self.columns_to_process[self.current_index]
         new_distribution = sg.popup_get_text("Enter distribution name (Normal, Triangular, Uniform):")
-        if new_distribution in ["Normal", "Triangular", "Uniform"]:
+        if new_distribution in DISTRIBUTIONS:
             if new_distribution not in self.column_distributions[current_column]:
                 self.column_distributions[current_column].append(new_distribution)
                 self.window["-DISTRIBUTIONS-"].update(values=self.column_distributions[current_column])
@@ -381,41 +797,99 @@ class DecisionApp:
     def add_transformation(self):
         current_column = self.columns_to_process[self.current_index]
         new_transformation = sg.popup_get_text("Enter transformation name (No, Sqrt, Normalize, Log, Arcsinh):")
-        if new_transformation in ["No", "Sqrt", "Normalize", "Log", "Arcsinh"]:
+        if new_transformation in TRANSFORMATIONS:
+            if self.transformation_engine is not None:
+                summary = self.transformation_engine.summary(current_column)
+                if summary is not None and not summary.loc[new_transformation, "valid"]:
+                    row = summary.loc[new_transformation]
+                    answer = sg.popup_yes_no(f"{new_transformation} is invalid for {current_column}: "
+                                             f"{int(row['invalid'])} invalid, {int(row['nan'])} NaN, "
+                                             f"{int(row['inf'])} inf values. Add it anyway?")
+                    if answer != "Yes":
+                        return
             if new_transformation not in self.column_transformations[current_column]:
                 self.column_transformations[current_column].append(new_transformation)
                 self.window["-TRANSFORMATIONS-"].update(values=self.column_transformations[current_column])
             else:
                 sg.popup_warning("Transformation already exists.")
 
+    def remove_invalid_transformations(self):
+        if self.transformation_engine is None or not self.columns_to_process:
+            sg.popup_warning("Load a dataset that fits in memory and set the columns first.")
+            return
+
+        invalid = self.transformation_engine.invalid_transformations(self.columns_to_process)
+        removed = 0
+        for i, col in enumerate(self.columns_to_process):
+            bad = invalid.get(col)
+            if not bad:
+                continue
+            kept = [name for name in self.column_transformations.get(col, []) if name not in bad]
+            removed += len(self.column_transformations.get(col, [])) - len(kept)
+            self.column_transformations[col] = kept
+            if self.decisions.is_decided(i):
+                row = self.decisions.row(i)
+                decided = [name for name in row[8] if name not in bad]
+                self.decisions.set(i, row[1:7], row[7], decided)
+
+        if self.current_index < len(self.columns_to_process):
+            current_column = self.columns_to_process[self.current_index]
+            self.window["-TRANSFORMATIONS-"].update(values=self.column_transformations[current_column])
+        sg.popup(f"Removed {removed} invalid transformation options.")
+
+    def on_next(self):
+        if self.y_column:
+            self.next_column()
+        else:
+            sg.popup_warning("Please set the column selections first.")
+
+    def event_handlers(self):
+        """ Main window event -> handler(values), each traced under its event name when tracing is on. """
+        handlers = {
+            "Load CSV": lambda values: self.load_csv(),
+            "Cancel Load": lambda values: self.cancel_load(),
+            HEADER_EVENT: lambda values: self.on_load_header(values[HEADER_EVENT]),
+            PROGRESS_EVENT: lambda values: self.on_load_progress(values[PROGRESS_EVENT]),
+            PREVIEW_EVENT: lambda values: self.on_load_preview(values[PREVIEW_EVENT]),
+            COLLINEARITY_EVENT: lambda values: self.on_collinearity(values[COLLINEARITY_EVENT]),
+            REFINE_EVENT: lambda values: self.on_load_refine(values[REFINE_EVENT]),
+            MEMORY_EVENT: lambda values: self.window["-MEMORY-"].update(format_memory(*values[MEMORY_EVENT])),
+            "Set Columns": lambda values: self.set_columns(),
+            "Next": lambda values: self.on_next(),
+            "Edit All Columns": lambda values: self.open_decision_table(),
+            "Load Decisions": lambda values: self.load_decisions(),
+            "Save Decisions": lambda values: self.save_decisions(),
+            "Exclude Flagged": lambda values: self.exclude_flagged(),
+            "Remove Selected Distribution": lambda values: self.remove_distribution(),
+            "Add Distribution": lambda values: self.add_distribution(),
+            "Remove Selected Transformation": lambda values: self.remove_transformation(),
+            "Add Transformation": lambda values: self.add_transformation(),
+            "Remove Invalid Transformations": lambda values: self.remove_invalid_transformations(),
+            "Setup Hyper-Pararameters": lambda values: self.open_algorithm_hyperparameter_window(),
+            "Screen Columns": lambda values: self.screen_columns(),
+            "Estimate Search Space": lambda values: self.estimate_search_space(),
+            "Fit Specification": lambda values: self.fit_specification()
+        }
+        for event in (DONE_EVENT, CANCELLED_EVENT, ERROR_EVENT):
+            handlers[event] = lambda values, event=event: self.on_load_finished(event, values[event])
+        return self.tracer.wrap_all(handlers, "main")
+
     def run(self):
+        handlers = self.event_handlers()
         while True:
             event, values = self.window.read()
             if event in (sg.WIN_CLOSED, "Exit"):
                 break
-            elif event == "Load CSV":
-                self.load_csv()
-            elif event == "Set Columns":
-                self.set_columns()
-            elif event == "Next":
-                if self.y_column:
-                    self.next_column()
-                else:
-                    sg.popup_warning("Please set the column selections first.")
-            elif event == "Save Decisions":
-                self.save_decisions()
-            elif event == "Remove Selected Distribution":
-                self.remove_distribution()
-            elif event == "Add Distribution":
-                self.add_distribution()
-            elif event == "Remove Selected Transformation":
-                self.remove_transformation()
-            elif event == "Add Transformation":
-                self.add_transformation()
-            elif event == 'Setup Hyper-Pararameters':
-                self.open_algorithm_hyperparameter_window()
-
+            handler = handlers.get(event)
+            if handler is not None:
+                handler(values)
+
+        if self.loader is not None:
+            self.loader.cancel()
+        if self.column_stats is not None:
+            self.column_stats.close()
         self.window.close()
+        self.tracer.finish()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+
+def segment_sum(values, offsets):
+    """ Sums of consecutive row segments: segment g is values[offsets[g]:offsets[g + 1]] along axis 0. """
+    return _segment_reduce(np.add, values, offsets, 0)
+
+
+def segment_prod(values, offsets):
+    return _segment_reduce(np.multiply, values, offsets, 1)
+
+
+def segment_log_sum(values, offsets):
+    """ Sums of logs per segment, the underflow-safe form of segment_prod for panel likelihoods. """
+    with np.errstate(divide="ignore"):
+        return segment_sum(np.log(values), offsets)
+
+
+def _segment_reduce(ufunc, values, offsets, empty):
+    values = np.asarray(values)
+    sizes = np.diff(offsets)
+    result = np.full((len(sizes),) + values.shape[1:], empty, dtype=np.result_type(values, float))
+    # reduceat returns the element at the start index for empty segments, so those are left at the identity.
+    filled = sizes > 0
+    if filled.any():
+        result[filled] = ufunc.reduceat(values, offsets[:-1][filled], axis=0)
+    return result
+
+
+class GroupIndex:
+    """ CSR layout of the rows of each panel or group.
+
+    order lists the row numbers sorted by group (stable, so rows keep their file
+    order within a group) and the rows of group g are order[offsets[g]:offsets[g + 1]].
+    keys holds the sorted group values and codes the group number of each row;
+    rows with a missing group value get code -1 and are left out of order.
+    """
+
+    def __init__(self, column, keys, codes, order, offsets):
+        self.column = column
+        self.keys = keys
+        self.codes = codes
+        self.order = order
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, data, column):
+        codes, keys = pd.factorize(data[column], sort=True)
+        codes = codes.astype(np.int64)
+        present = np.flatnonzero(codes >= 0)
+        order = present[np.argsort(codes[present], kind="stable")]
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(codes[present], minlength=len(keys)))]).astype(np.int64)
+        return cls(column, np.asarray(keys), codes, order, offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def sizes(self):
+        return np.diff(self.offsets)
+
+    def take(self, values):
+        """ values (rows first) in group order, the layout the segment helpers expect. """
+        return np.asarray(values)[self.order]
+
+    def sum(self, values):
+        return segment_sum(self.take(values), self.offsets)
+
+    def prod(self, values):
+        return segment_prod(self.take(values), self.offsets)
+
+    def log_sum(self, values):
+        return segment_log_sum(self.take(values), self.offsets)
+
+    def mean(self, values):
+        sizes = self.sizes.reshape((-1,) + (1,) * (np.ndim(values) - 1))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.sum(values) / sizes
+
+    def expand(self, group_values):
+        """ Per-row values from per-group ones, in the original row order; rows without a group get nan. """
+        group_values = np.asarray(group_values, dtype=float)
+        rows = np.full((len(self.codes),) + group_values.shape[1:], np.nan)
+        present = self.codes >= 0
+        rows[present] = group_values[self.codes[present]]
+        return rows
+
+    def arrays(self):
+        keys = self.keys if self.keys.dtype.kind in "iufbmM" else self.keys.astype(str)
+        return {"keys": keys, "codes": self.codes, "order": self.order, "offsets": self.offsets}
+
+    @classmethod
+    def from_arrays(cls, column, arrays):
+        return cls(column, arrays["keys"], arrays["codes"], arrays["order"], arrays["offsets"])
+
+
+def build_indexes(data, columns, cache=None, file_path=None, variant=""):
+    """ GroupIndex per named column ("None" and empty names are skipped), read from or added to the
+    dataset cache entry of file_path when one is given.
+    """
+    indexes = {}
+    for column in columns:
+        if column in (None, "", "None") or column in indexes:
+            continue
+        name = f"index-{column}"
+        arrays = cache.load_arrays(file_path, name, variant) if cache is not None and file_path else None
+        if arrays is not None and len(arrays["codes"]) == len(data):
+            indexes[column] = GroupIndex.from_arrays(column, arrays)
+            continue
+        indexes[column] = GroupIndex.build(data, column)
+        if cache is not None and file_path:
+            cache.store_arrays(file_path, name, indexes[column].arrays(), variant)
+    return indexes
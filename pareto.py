@@ -0,0 +1,155 @@
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+BLOCK_ROWS = 2048
+
+
+class ParetoArchive:
+    """ Non-dominated set for two minimised objectives, kept sorted by the first.
+
+    Along the sorted front the second objective strictly decreases, so a new
+    point is dominated exactly when its left neighbour has a second objective no
+    larger, and the points it dominates are one contiguous run to its right.
+    Both are found by bisection, so an insertion costs O(log n) comparisons plus
+    the removals. With max_size, the point with the smallest crowding distance
+    is pruned whenever the archive grows past it; the two extremes are kept.
+    """
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size
+        self.first = []
+        self.negated_second = []
+        self.items = []
+
+    def __len__(self):
+        return len(self.first)
+
+    def __iter__(self):
+        return iter(zip(self.first, (-value for value in self.negated_second), self.items))
+
+    def insert(self, first, second, item=None):
+        """ Adds the point unless it is dominated or already present; returns whether it was added. """
+        first, second = float(first), float(second)
+        if not (np.isfinite(first) and np.isfinite(second)):
+            return False
+        right = bisect_right(self.first, first)
+        if right and -self.negated_second[right - 1] <= second:
+            return False
+        left = bisect_left(self.first, first)
+        stop = bisect_right(self.negated_second, -second, lo=left)
+        self.first[left:stop] = [first]
+        self.negated_second[left:stop] = [-second]
+        self.items[left:stop] = [item]
+        if self.max_size is not None and len(self) > self.max_size:
+            self.prune(self.max_size)
+        return True
+
+    def insert_many(self, firsts, seconds, items=None):
+        items = [None] * len(firsts) if items is None else items
+        # Offering the points best-first means most dominated ones are rejected without touching the lists.
+        order = np.lexsort((seconds, firsts))
+        return sum(self.insert(firsts[i], seconds[i], items[i]) for i in order)
+
+    def merge(self, other):
+        """ Adds the points of another archive, such as one from a parallel worker. """
+        for first, second, item in other:
+            self.insert(first, second, item)
+        return self
+
+    def objectives(self):
+        return np.column_stack([self.first, np.negative(self.negated_second)]).reshape(-1, 2)
+
+    def prune(self, size):
+        while len(self) > size:
+            distance = crowding_distance(self.objectives())
+            index = int(np.argmin(distance))
+            del self.first[index], self.negated_second[index], self.items[index]
+
+    def to_records(self):
+        return [{"obj_1": first, "obj_2": second, "item": item} for first, second, item in self]
+
+    @classmethod
+    def from_records(cls, records, max_size=None):
+        archive = cls(max_size)
+        for record in records:
+            archive.insert(record["obj_1"], record["obj_2"], record.get("item"))
+        return archive
+
+
+def dominates(a, b):
+    """ Boolean matrix: a[i] dominates b[j] (no worse in every objective, better in one). """
+    a = np.asarray(a, dtype=float)[:, None, :]
+    b = np.asarray(b, dtype=float)[None, :, :]
+    return (a <= b).all(axis=2) & (a < b).any(axis=2)
+
+
+def non_dominated_sort(objectives):
+    """ Front number of each row of an (n, objectives) array, 0 for the non-dominated front.
+
+    Two objectives are ranked in one sorted sweep, O(n log n). More objectives use
+    the fast non-dominated sort, with the domination counts built blockwise so the
+    full n x n matrix never has to be held as one temporary.
+    """
+    objectives = np.asarray(objectives, dtype=float)
+    if objectives.shape[1] == 2:
+        return _sort_two(objectives)
+    n = len(objectives)
+    counts = np.zeros(n, dtype=np.int64)
+    dominated = []
+    for start in range(0, n, BLOCK_ROWS):
+        block = dominates(objectives[start:start + BLOCK_ROWS], objectives)
+        counts += block.sum(axis=0)
+        dominated.extend(np.flatnonzero(row) for row in block)
+
+    ranks = np.full(n, -1, dtype=np.int64)
+    front = np.flatnonzero(counts == 0)
+    rank = 0
+    while len(front):
+        ranks[front] = rank
+        if any(len(dominated[i]) for i in front):
+            np.subtract.at(counts, np.concatenate([dominated[i] for i in front]), 1)
+        counts[front] = -1
+        front = np.flatnonzero(counts == 0)
+        rank += 1
+    return ranks
+
+
+def _sort_two(objectives):
+    # Sweep in (first, second) order. Every earlier point is no worse on the first objective, so a point is
+    # dominated by front k exactly when the last (lowest second) point of front k is no worse on the second;
+    # those last values rise with k, so the point's front is found by bisection. Exact duplicates share a rank.
+    order = np.lexsort((objectives[:, 1], objectives[:, 0]))
+    ranks = np.empty(len(objectives), dtype=np.int64)
+    last = []
+    previous = None
+    for i in order:
+        point = (objectives[i, 0], objectives[i, 1])
+        if point == previous:
+            ranks[i] = rank
+            continue
+        rank = bisect_right(last, point[1])
+        if rank == len(last):
+            last.append(point[1])
+        else:
+            last[rank] = point[1]
+        ranks[i] = rank
+        previous = point
+    return ranks
+
+
+def crowding_distance(objectives):
+    """ Crowding distance of each row; the extremes of each objective get inf. """
+    objectives = np.asarray(objectives, dtype=float)
+    n, m = objectives.shape
+    distance = np.zeros(n)
+    if n <= 2:
+        return np.full(n, np.inf)
+    for j in range(m):
+        order = np.argsort(objectives[:, j], kind="stable")
+        values = objectives[order, j]
+        span = values[-1] - values[0]
+        distance[order[[0, -1]]] = np.inf
+        if span > 0:
+            distance[order[1:-1]] += (values[2:] - values[:-2]) / span
+    return distance
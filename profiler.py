@@ -0,0 +1,250 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNKSIZE = 100_000
+PREVIEW_ROWS = 20_000
+PREVIEW_BLOCKS = 64
+
+
+class ColumnProfiler:
+    """ Accumulates dtype, min, max, null count and row count per column, one chunk at a time. """
+
+    def __init__(self, column_names):
+        self.column_names = list(column_names)
+        self.rows = 0
+        self.dtypes = {col: None for col in self.column_names}
+        self.nulls = {col: 0 for col in self.column_names}
+        self.num_min = {}
+        self.num_max = {}
+        self.obj_min = {}
+        self.obj_max = {}
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+
+        for col, count in chunk.isna().sum().items():
+            self.nulls[col] += int(count)
+
+        for col, dtype in chunk.dtypes.items():
+            self.dtypes[col] = _merge_dtype(self.dtypes[col], dtype)
+
+        numeric = chunk.select_dtypes(include=["number", "bool"])
+        if not numeric.empty:
+            _fold(self.num_min, numeric.min(), min)
+            _fold(self.num_max, numeric.max(), max)
+
+        for col in chunk.columns.difference(numeric.columns, sort=False):
+            values = chunk[col].dropna()
+            if values.empty:
+                continue
+            try:
+                low, high = values.min(), values.max()
+            except TypeError:
+                # Mixed objects within the chunk, compare them as text instead.
+                values = values.astype(str)
+                low, high = values.min(), values.max()
+            _fold(self.obj_min, {col: low}, min)
+            _fold(self.obj_max, {col: high}, max)
+
+    def column_info(self):
+        info = {}
+        for col in self.column_names:
+            dtype = self.dtypes[col]
+            low, high = self._extremes(col, dtype)
+            info[col] = {
+                "type": str(dtype) if dtype is not None else "object",
+                "min": low,
+                "max": high,
+                "nulls": self.nulls[col],
+                "rows": self.rows
+            }
+        return info
+
+    def mixed_columns(self):
+        return [col for col in self.column_names if col in self.obj_min and col in self.num_min]
+
+    def _extremes(self, col, dtype):
+        if col in self.obj_min and col in self.num_min:
+            # Some chunks parsed as numbers and others as text; the full column is text.
+            low = min(str(self.num_min[col]), str(self.obj_min[col]))
+            high = max(str(self.num_max[col]), str(self.obj_max[col]))
+            return low, high
+        if col in self.obj_min:
+            return self.obj_min[col], self.obj_max[col]
+        if col in self.num_min:
+            low, high = self.num_min[col], self.num_max[col]
+            if dtype is not None and dtype.kind in "iub":
+                return dtype.type(low), dtype.type(high)
+            return low, high
+        return np.nan, np.nan
+
+
+def _merge_dtype(current, new):
+    if current is None:
+        return new
+    if current == new:
+        return current
+    if _is_numeric(current) and _is_numeric(new):
+        return np.result_type(current, new)
+    return np.dtype(object)
+
+
+def _is_numeric(dtype):
+    return isinstance(dtype, np.dtype) and dtype.kind in "iufb"
+
+
+def _fold(target, values, pick):
+    for col, value in values.items():
+        if pd.isna(value):
+            continue
+        target[col] = pick(target[col], value) if col in target else value
+
+
+def read_header(file_path, encoding="utf-8"):
+    return pd.read_csv(file_path, encoding=encoding, nrows=0).columns.tolist()
+
+
+class LoadCancelled(Exception):
+    pass
+
+
+def profile_csv(file_path, chunksize=DEFAULT_CHUNKSIZE, keep_frame=True, encoding="utf-8", progress=None,
+                cancel=None):
+    """ Reads the CSV once in chunks and returns (frame or None, column_info).
+
+    With keep_frame=False only the running profile is held in memory, so the
+    memory use is bounded by the chunk size regardless of the file size.
+    progress(profiler, bytes_read) is called after every chunk, and a truthy
+    cancel() stops the scan with LoadCancelled.
+    """
+    profiler = None
+    chunks = []
+    with open(file_path, "rb") as handle:
+        reader = pd.read_csv(handle, encoding=encoding, on_bad_lines="warn", chunksize=chunksize)
+        with reader:
+            for chunk in reader:
+                if cancel is not None and cancel():
+                    raise LoadCancelled(file_path)
+                if profiler is None:
+                    profiler = ColumnProfiler(chunk.columns)
+                profiler.update(chunk)
+                if keep_frame:
+                    chunks.append(chunk)
+                if progress is not None:
+                    progress(profiler, handle.tell())
+
+    if profiler is None:
+        profiler = ColumnProfiler(read_header(file_path, encoding))
+
+    frame = None
+    if keep_frame:
+        frame = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=profiler.column_names)
+        for col in profiler.mixed_columns():
+            frame[col] = frame[col].where(frame[col].isna(), frame[col].astype(str))
+    return frame, profiler.column_info()
+
+
+def sample_csv(file_path, rows=PREVIEW_ROWS, blocks=PREVIEW_BLOCKS, encoding="utf-8", seed=0):
+    """ Reads about `rows` rows without scanning the file and returns (sample frame, provisional column_info).
+
+    The rows come in `blocks` runs of whole lines: the first run from the top of
+    the file and the others from sorted random byte offsets, each starting after
+    the line break that follows its offset. The column_info marks every column
+    "approximate", with rows estimated from the mean sampled line length and
+    nulls scaled to it. A file shorter than the first run is read whole and its
+    column_info is exact.
+    """
+    size = os.path.getsize(file_path)
+    per_block = max(1, -(-rows // blocks))
+    lines = []
+    with open(file_path, "rb") as handle:
+        header = handle.readline()
+        start = handle.tell()
+        exact = _read_lines(handle, per_block, lines) or handle.tell() >= size
+        if not exact:
+            position = handle.tell()
+            rng = np.random.default_rng(seed)
+            # The sample stays exact while no run skipped any lines and the reads reach the end of the file.
+            contiguous = True
+            for offset in np.sort(rng.integers(position, size, blocks - 1)):
+                if offset > position:
+                    handle.seek(offset)
+                    handle.readline()
+                    contiguous = False
+                if _read_lines(handle, per_block, lines) or handle.tell() >= size:
+                    exact = contiguous
+                    break
+                position = handle.tell()
+
+    text = header + b"".join(line if line.endswith(b"\n") else line + b"\n" for line in lines)
+    frame = pd.read_csv(io.BytesIO(text), encoding=encoding, on_bad_lines="skip")
+    profiler = ColumnProfiler(frame.columns)
+    profiler.update(frame)
+    column_info = profiler.column_info()
+    if exact:
+        return frame, column_info
+    line_bytes = sum(map(len, lines)) / max(len(lines), 1)
+    estimated = max(len(frame), int(round((size - start) / line_bytes))) if lines else 0
+    return frame, {col: _approximate(info, estimated) for col, info in column_info.items()}
+
+
+def _read_lines(handle, count, lines):
+    """ Appends up to count non-empty lines; returns True at the end of the file. """
+    for _ in range(count):
+        line = handle.readline()
+        if not line:
+            return True
+        if line.strip():
+            lines.append(line)
+    return False
+
+
+def _approximate(info, estimated_rows):
+    sampled = info["rows"]
+    nulls = int(round(info["nulls"] * estimated_rows / sampled)) if sampled else 0
+    return {**info, "nulls": nulls, "rows": estimated_rows, "approximate": True, "sampled_rows": sampled}
+
+
+def refine_column_info(sample_info, scan_info, estimated_rows):
+    """ Provisional column_info part way through a full pass.
+
+    Both the sample and the rows scanned so far hold real values of the file, so
+    the wider of their extremes is kept and only ever widens towards the exact
+    range. Null counts are scaled from whichever has seen more rows. The type is
+    the scan's once it has seen rows, since it follows the parser of the full load.
+    """
+    info = {}
+    for col, sample in sample_info.items():
+        scan = scan_info.get(col)
+        if scan is None or not scan["rows"]:
+            info[col] = dict(sample)
+            continue
+        if scan["rows"] >= sample["sampled_rows"]:
+            null_share = scan["nulls"] / scan["rows"]
+        else:
+            null_share = sample["nulls"] / max(sample["rows"], 1)
+        info[col] = {
+            "type": scan["type"],
+            "min": _wider(sample["min"], scan["min"], min),
+            "max": _wider(sample["max"], scan["max"], max),
+            "nulls": int(round(null_share * estimated_rows)),
+            "rows": estimated_rows,
+            "approximate": True,
+            "sampled_rows": max(scan["rows"], sample["sampled_rows"])
+        }
+    return info
+
+
+def _wider(sample, scan, pick):
+    if pd.isna(sample):
+        return scan
+    if pd.isna(scan):
+        return sample
+    try:
+        return pick(sample, scan)
+    except TypeError:
+        # The sample parsed the column as numbers and the scan as text or the other way round.
+        return scan
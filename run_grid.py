@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+
+RUN_COLUMNS = ["algorithm", "_max_time", "_random_seed", "_hms", "crossover", "temp_scale", "steps", "_hmcr", "_par",
+               "_max_imp", "problem_number", "is_multi", "test_percentage", "_obj_1", "_obj_2", "hurdle"]
+SHARED_FIELDS = ["_max_time", "_random_seed", "_max_imp", "problem_number", "is_multi", "test_percentage", "_obj_1",
+                 "_obj_2", "hurdle"]
+ALGORITHM_FIELDS = {
+    "sa": ["crossover", "temp_scale", "steps"],
+    "de": ["_hms", "crossover"],
+    "hs": ["_hms", "_hmcr", "_par"]
+}
+DEFAULT_SPECS = {
+    "_max_time": "72000",
+    "_random_seed": "13",
+    "_hms": "20",
+    "crossover": "0.05:0.2:3",
+    "temp_scale": "0.95",
+    "steps": "2",
+    "_hmcr": "0.5",
+    "_par": "0.3",
+    "_max_imp": "72000",
+    "problem_number": "3,4,7",
+    "is_multi": "1",
+    "test_percentage": "0.2",
+    "_obj_1": "bic",
+    "_obj_2": "MAE",
+    "hurdle": "0"
+}
+BLOCK_ROWS = 100_000
+
+
+def parse_spec(text):
+    """ Values of one run-table parameter.
+
+    "start:stop:steps" gives steps evenly spaced values, "a,b,c" a list and
+    anything else a single value. Numbers stay integers when they all are, and
+    repeated values, such as those of a range like 1:1:3, are kept once.
+    """
+    text = str(text).strip()
+    if text.count(":") == 2:
+        start, stop, steps = (part.strip() for part in text.split(":"))
+        values = np.linspace(float(start), float(stop), int(steps))
+        if _is_int(start) and _is_int(stop) and np.all(values == np.round(values)):
+            return pd.unique(values.astype(np.int64))
+        return pd.unique(np.round(values, 10))
+    items = [item.strip() for item in text.split(",") if item.strip()]
+    if items and all(_is_number(item) for item in items):
+        if all(_is_int(item) for item in items):
+            return pd.unique(np.array([int(item) for item in items], dtype=np.int64))
+        return pd.unique(np.array([float(item) for item in items]))
+    return pd.unique(np.array(items, dtype=object))
+
+
+def _is_number(text):
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+
+def _is_int(text):
+    try:
+        int(text)
+    except ValueError:
+        return False
+    return True
+
+
+def grid_size(specs, algorithms, mode="cartesian", samples=0):
+    if mode == "lhs":
+        return samples * len(algorithms)
+    values = {field: parse_spec(text) for field, text in specs.items()}
+    return sum(int(np.prod([len(values[field]) for field in _fields(algorithm)])) for algorithm in algorithms)
+
+
+def _fields(algorithm):
+    return SHARED_FIELDS + ALGORITHM_FIELDS[algorithm]
+
+
+def iter_grid(specs, algorithms, mode="cartesian", samples=0, seed=0, block_rows=BLOCK_ROWS):
+    """ Yields the run table in blocks of at most block_rows rows.
+
+    Only the fields an algorithm uses vary in its rows; the others are 0, as in
+    set_data.csv, so rows that would differ only in unused fields never appear.
+    "cartesian" enumerates every combination by unravelling a flat row counter,
+    "lhs" draws samples rows per algorithm by Latin hypercube over each field's
+    values and drops repeated rows.
+    """
+    values = {field: parse_spec(specs[field]) for field in SHARED_FIELDS + sorted(
+        {field for algorithm in algorithms for field in ALGORITHM_FIELDS[algorithm]})}
+    rng = np.random.default_rng(seed)
+    for algorithm in algorithms:
+        fields = _fields(algorithm)
+        sizes = [len(values[field]) for field in fields]
+        if mode == "lhs":
+            blocks = _lhs_indexes(sizes, samples, rng, block_rows)
+        else:
+            blocks = _cartesian_indexes(sizes, block_rows)
+        for indexes in blocks:
+            rows = len(indexes[0])
+            block = {column: np.zeros(rows, dtype=np.int64) for column in RUN_COLUMNS}
+            block["algorithm"] = np.full(rows, algorithm, dtype=object)
+            for field, index in zip(fields, indexes):
+                block[field] = values[field][index]
+            yield pd.DataFrame(block, columns=RUN_COLUMNS)
+
+
+def _cartesian_indexes(sizes, block_rows):
+    total = int(np.prod(sizes))
+    for start in range(0, total, block_rows):
+        yield np.unravel_index(np.arange(start, min(start + block_rows, total)), sizes)
+
+
+def _lhs_indexes(sizes, samples, rng, block_rows):
+    # One stratified permutation per field, then each stratum is mapped onto the field's values.
+    strata = [(rng.permutation(samples) + rng.random(samples)) / samples for _ in sizes]
+    seen = set()
+    for start in range(0, samples, block_rows):
+        stop = min(start + block_rows, samples)
+        indexes = [np.minimum((column[start:stop] * size).astype(np.int64), size - 1)
+                   for column, size in zip(strata, sizes)]
+        flat = np.ravel_multi_index(indexes, sizes)
+        _, first = np.unique(flat, return_index=True)
+        keep = np.array([i for i in np.sort(first) if flat[i] not in seen], dtype=np.int64)
+        seen.update(flat[keep].tolist())
+        if len(keep):
+            yield [index[keep] for index in indexes]
+
+
+def write_grid(file_path, specs, algorithms, mode="cartesian", samples=0, seed=0, block_rows=BLOCK_ROWS):
+    """ Streams the run table to file_path and returns the number of rows written. """
+    rows = 0
+    with open(file_path, "w", newline="", encoding="utf-8") as handle:
+        for block in iter_grid(specs, algorithms, mode, samples, seed, block_rows):
+            block.to_csv(handle, index=False, header=rows == 0)
+            rows += len(block)
+        if rows == 0:
+            pd.DataFrame(columns=RUN_COLUMNS).to_csv(handle, index=False)
+    return rows
@@ -0,0 +1,205 @@
+"""Runs every row of a set_data.csv-style run table on a local process pool.
+
+Results are appended to a JSON-lines file as rows finish, and a restarted run
+skips rows that already finished. Example:
+    python runner.py set_data.csv --results results.jsonl --backend local
+    python runner.py set_data.csv --backend search --data data.csv --y why --problem 3
+    python runner.py set_data.csv --backend search --data data_{problem_number}.csv \
+        --decisions setup_data_{problem_number}.csv --y why
+"""
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from dataset_cache import DEFAULT_CACHE_DIR
+from fitness_cache import FITNESS_CACHE_PATH
+from pareto import ParetoArchive
+from search import search_backend
+
+LOCAL_BUDGET_SECONDS = 0.05
+TIMEOUT_GRACE_SECONDS = 5.0
+
+
+def local_estimator(params, context):
+    """ Stand-in backend for offline runs: a seeded random search over synthetic objective values.
+
+    It stops at the row's _max_time or LOCAL_BUDGET_SECONDS, whichever comes first.
+    """
+    seed = int(params.get("_random_seed", 0)) * 1000 + int(params.get("problem_number", 0))
+    rng = np.random.default_rng(seed)
+    deadline = time.perf_counter() + min(float(params.get("_max_time", 0)), LOCAL_BUDGET_SECONDS)
+    best = np.inf
+    second = np.inf
+    evaluations = 0
+    while evaluations == 0 or time.perf_counter() < deadline:
+        scores = rng.gamma(2.0, 500.0, size=(256, 2))
+        index = int(np.argmin(scores[:, 0]))
+        if scores[index, 0] < best:
+            best, second = scores[index]
+        evaluations += len(scores)
+    return {"obj_1": float(best), "obj_2": float(second), "evaluations": evaluations}
+
+
+BACKENDS = {"local": local_estimator, "search": search_backend}
+
+
+def resolve_backend(name):
+    """ A registered backend name, or "module:function" for any importable callable. """
+    if name in BACKENDS:
+        return BACKENDS[name]
+    module_name, _, function_name = name.partition(":")
+    if not function_name:
+        raise ValueError(f"Unknown backend {name!r}; use one of {sorted(BACKENDS)} or module:function")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def row_key(index, params):
+    digest = hashlib.blake2b(json.dumps(params, sort_keys=True, default=str).encode("utf-8"), digest_size=8)
+    return f"{index}:{digest.hexdigest()}"
+
+
+def finished_keys(results_path):
+    """ Keys of rows with a successful result; a line cut short by a crash is ignored. """
+    keys = set()
+    if not os.path.exists(results_path):
+        return keys
+    with open(results_path, encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "ok":
+                keys.add(record["key"])
+    return keys
+
+
+def pareto_front(results_path, problem_number=None, max_size=None):
+    """ Merges the Pareto fronts of the finished multi-objective rows, optionally of one problem_number. """
+    archive = ParetoArchive(max_size)
+    with open(results_path, encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "ok" and problem_number in (None, record["params"].get("problem_number")):
+                archive.merge(ParetoArchive.from_records(
+                    [{"obj_1": point["obj_1"], "obj_2": point["obj_2"], "item": (record["key"], point["selection"])}
+                     for point in record["result"].get("pareto", [])]))
+    return archive
+
+
+class RowTimeout(BaseException):
+    """ Raised into a backend that runs past its row's deadline; a BaseException so `except Exception` lets it by. """
+
+
+def _raise_timeout(signum, frame):
+    raise RowTimeout()
+
+
+def run_row(backend_name, key, params, context):
+    """ Runs one row and returns its result record.
+
+    A row finishing after its _max_time is marked "timeout". Where SIGALRM is
+    available and this is the main thread, as in a pool worker, a backend still
+    running TIMEOUT_GRACE_SECONDS past _max_time is interrupted as well; the
+    interrupt lands at the next Python bytecode, so a long native call ends first.
+    Elsewhere backends must honour _max_time themselves.
+    """
+    max_time = float(params.get("_max_time", 0) or 0)
+    alarm = bool(max_time) and hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+    if alarm:
+        previous = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, max_time + TIMEOUT_GRACE_SECONDS)
+    start = time.perf_counter()
+    try:
+        result = resolve_backend(backend_name)(params, context)
+        status = "ok"
+    except RowTimeout:
+        result = {"error": f"Interrupted after _max_time of {max_time:g} s"}
+        status = "timeout"
+    except Exception as e:
+        result = {"error": f"{type(e).__name__}: {e}"}
+        status = "error"
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+    seconds = time.perf_counter() - start
+    if status == "ok" and max_time and seconds > max_time:
+        status = "timeout"
+    return {"key": key, "status": status, "seconds": seconds, "params": params, "result": result}
+
+
+def run_table(table_path, results_path, backend="local", workers=None, context=None, progress=None):
+    """ Runs the pending rows of table_path and returns the number of rows run now. """
+    table = pd.read_csv(table_path)
+    done = finished_keys(results_path)
+    pending = []
+    for index, params in enumerate(table.to_dict(orient="records")):
+        params = {name: value.item() if isinstance(value, np.generic) else value for name, value in params.items()}
+        key = row_key(index, params)
+        if key not in done:
+            pending.append((key, params))
+
+    resolve_backend(backend)
+    workers = workers or os.cpu_count() or 1
+    with open(results_path, "a", encoding="utf-8") as results, ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_row, backend, key, params, context or {}) for key, params in pending]
+        for count, future in enumerate(as_completed(futures), start=1):
+            record = future.result()
+            results.write(json.dumps(record, default=str) + "\n")
+            results.flush()
+            os.fsync(results.fileno())
+            if progress is not None:
+                progress(count, len(pending), record)
+    return len(pending)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run a set_data.csv run table on a local process pool.")
+    parser.add_argument("table", help="Run table such as set_data.csv.")
+    parser.add_argument("--results", default="results.jsonl", help="Append-only results file.")
+    parser.add_argument("--backend", default="local", help="Backend name or module:function.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, defaults to the CPU count.")
+    parser.add_argument("--data", help="Dataset passed to the backend; may hold a {problem_number} template.")
+    parser.add_argument("--decisions", default="setup_data.csv",
+                        help="Decisions file passed to the backend; may hold a {problem_number} template.")
+    parser.add_argument("--problem", type=int, help="The problem_number that an untemplated --data belongs to.")
+    parser.add_argument("--hyper", default="setup_hyper.csv", help="Hyperparameter file passed to the backend.")
+    parser.add_argument("--y", help="Y column passed to the backend.")
+    parser.add_argument("--panel", help="Panel column passed to the backend.")
+    parser.add_argument("--fitness-cache", default=FITNESS_CACHE_PATH,
+                        help="Fitness cache shared by the workers; an empty value turns it off.")
+    parser.add_argument("--dataset-cache", default=DEFAULT_CACHE_DIR,
+                        help="Parsed-dataset cache the workers load from; an empty value turns it off.")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    context = {"data": args.data, "decisions": args.decisions, "hyper": args.hyper, "y_column": args.y,
+               "fitness_cache": args.fitness_cache, "panel": args.panel, "problem": args.problem,
+               "dataset_cache": args.dataset_cache}
+
+    def report(count, total, record):
+        print(f"[{count}/{total}] {record['key']} {record['status']} in {record['seconds']:.2f}s", flush=True)
+
+    ran = run_table(args.table, args.results, args.backend, args.workers, context, report)
+    print(f"Ran {ran} rows, results in {args.results}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""Ranks the candidate columns by a univariate Poisson score test against the Y column.
+
+For each column under each allowed transformation the score test of adding it
+to an intercept-only Poisson model is computed from nine sums over the rows
+where both are finite. The sums for a block of columns come from three
+matrix products, so thousands of columns cost a few passes over the data
+rather than one fit each. Columns whose best p-value is above the threshold
+get Levels 2-6 turned off, leaving only Level 1 (Off). Example:
+    python screening.py data.csv --y why --decisions setup_data.csv --output setup_screened.csv
+"""
+import argparse
+import math
+import sys
+
+import numpy as np
+import pandas as pd
+
+from dataset_cache import DatasetCache
+from decisions import LEVEL_COLUMNS, TRANSFORMATIONS, DecisionStore
+from transformations import TRANSFORM_FUNCTIONS
+
+SCREEN_ALPHA = 0.05
+MAX_BLOCK_ELEMENTS = 5_000_000
+STATISTICS = ["rows", "score", "robust_score", "correlation", "p_value"]
+
+
+def score_statistics(x, y):
+    """ Score statistics of each column of x (rows, k) against the counts y.
+
+    score is U^2 / (mean(y) * Sxx) with U = sum((x - mean(x)) * y) over the rows
+    where x and y are finite; robust_score replaces the Poisson variance with the
+    sandwich sum((x - mean(x))^2 * (y - mean(y))^2), so over-dispersed counts do
+    not inflate it. Both are chi-squared with one degree of freedom under the
+    null. Returns a dict of length-k arrays named as in STATISTICS, bar p_value.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    y_finite = np.isfinite(y)
+    finite = np.isfinite(x)
+    complete = finite.all()
+    # Centring x per column and y overall first keeps the expanded sums below free of cancellation; any shift
+    # will do, so x is shifted by its mean over all finite rows, whether or not y is finite there.
+    y_shift = y[y_finite].mean() if y_finite.any() else 0.0
+    yc = np.where(y_finite, y - y_shift, 0.0)
+    response = np.column_stack([y_finite.astype(float), yc, yc * yc])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if complete:
+            xc = x - x.mean(axis=0)
+            n, sy, syy = (np.broadcast_to(total, x.shape[1]) for total in response.sum(axis=0))
+        else:
+            finite &= y_finite[:, None]
+            xc = np.where(finite, x - np.nan_to_num(np.where(finite, x, 0.0).sum(axis=0) / finite.sum(axis=0)), 0.0)
+            n, sy, syy = (finite.T.astype(float) @ response).T
+        if not y_finite.all():
+            xc[~y_finite] = 0.0
+        sx, sxy, sxyy = (xc.T @ response).T
+        np.square(xc, out=xc)
+        sxx, sxxy, sxxyy = (xc.T @ response).T
+
+        y_mean = sy / n
+        x_mean = sx / n
+        u = sxy - x_mean * sy
+        x_var = sxx - n * x_mean ** 2
+        y_var = syy - n * y_mean ** 2
+        sandwich = (sxxyy - 2 * y_mean * sxxy + y_mean ** 2 * sxx
+                    - 2 * x_mean * (sxyy - 2 * y_mean * sxy + y_mean ** 2 * sx)
+                    + x_mean ** 2 * (syy - 2 * y_mean * sy + y_mean ** 2 * n))
+        usable = (n > 2) & (x_var > 1e-12 * np.maximum(sxx, 1e-300)) & (y_shift + y_mean > 0)
+        score = np.where(usable, u ** 2 / ((y_shift + y_mean) * x_var), 0.0)
+        robust = np.where(usable & (sandwich > 0), u ** 2 / sandwich, 0.0)
+        correlation = np.where(usable & (y_var > 0), u / np.sqrt(x_var * y_var), 0.0)
+    return {"rows": n.astype(np.int64), "score": score, "robust_score": robust, "correlation": correlation}
+
+
+def chi2_pvalue(statistic):
+    """ Upper tail of the chi-squared distribution with one degree of freedom. """
+    statistic = np.maximum(np.asarray(statistic, dtype=float), 0.0)
+    return np.frompyfunc(math.erfc, 1, 1)(np.sqrt(statistic / 2)).astype(float)
+
+
+def screen(data, y_column, columns, transformations=None, robust=True, max_elements=MAX_BLOCK_ELEMENTS):
+    """ Frame of STATISTICS indexed by (column, transformation) for the numeric columns.
+
+    transformations maps a column to its allowed transformations ("No" for an
+    empty list); by default every column is tried under all of TRANSFORMATIONS.
+    The columns go through in blocks of at most max_elements values, and the
+    p_value is that of the robust score unless robust is False. A Y column
+    that is not numeric raises ValueError.
+    """
+    if not pd.api.types.is_numeric_dtype(data[y_column]):
+        raise ValueError(f"Y column {y_column!r} is not numeric ({data[y_column].dtype})")
+    y = data[y_column].to_numpy(dtype=float, na_value=np.nan)
+    numeric = [column for column in columns if pd.api.types.is_numeric_dtype(data[column])]
+    block_columns = max(1, max_elements // max(len(y), 1))
+    statistic = "robust_score" if robust else "score"
+    frames = []
+    for start in range(0, len(numeric), block_columns):
+        block = numeric[start:start + block_columns]
+        raw = data[block].to_numpy(dtype=float, na_value=np.nan)
+        allowed = [(transformations.get(column) or ["No"]) if transformations is not None else TRANSFORMATIONS
+                   for column in block]
+        for name in TRANSFORMATIONS:
+            positions = [j for j, options in enumerate(allowed) if name in options]
+            if not positions:
+                continue
+            with np.errstate(divide="ignore", invalid="ignore"):
+                values = TRANSFORM_FUNCTIONS[name](raw[:, positions])
+            result = score_statistics(values, y)
+            result["p_value"] = chi2_pvalue(result[statistic])
+            frames.append(pd.DataFrame({"column": [block[j] for j in positions], "transformation": name, **result}))
+    if not frames:
+        return pd.DataFrame(columns=["column", "transformation"] + STATISTICS).set_index(["column", "transformation"])
+    return pd.concat(frames, ignore_index=True).set_index(["column", "transformation"])
+
+
+def rank_columns(scores):
+    """ Best transformation per column, most significant first, with its statistics and a 1-based rank. """
+    if scores.empty:
+        return pd.DataFrame(columns=["transformation"] + STATISTICS + ["rank"])
+    frame = scores.reset_index().sort_values(["p_value", "robust_score"], ascending=[True, False], kind="stable")
+    best = frame.drop_duplicates("column").set_index("column")
+    best["rank"] = np.arange(1, len(best) + 1)
+    return best
+
+
+def screened_rows(rows, ranking, alpha=SCREEN_ALPHA):
+    """ Decision rows with Levels 2-6 off for the columns ranked above alpha, and the names of those columns.
+
+    Columns that were not screened, such as text columns, keep their levels.
+    """
+    weak = set(ranking.index[ranking["p_value"] > alpha])
+    levels_off = [True] + [False] * (len(LEVEL_COLUMNS) - 1)
+    result = [(row[0], *levels_off, *row[7:]) if row[0] in weak else tuple(row) for row in rows]
+    return result, [row[0] for row in rows if row[0] in weak]
+
+
+def format_ranking(ranking, top=20):
+    lines = [f"{'rank':>5} {'column':<30} {'transformation':<14} {'score':>10} {'robust':>10} {'corr':>7} {'p':>10}"]
+    for column, row in ranking.head(top).iterrows():
+        lines.append(f"{row['rank']:>5} {str(column)[:30]:<30} {row['transformation']:<14} {row['score']:>10.4g} "
+                     f"{row['robust_score']:>10.4g} {row['correlation']:>7.3f} {row['p_value']:>10.3g}")
+    return "\n".join(lines)
+
+
+def load_frame(file_path, use_cache=True):
+    cached = DatasetCache().load(file_path) if use_cache else None
+    if cached is not None and cached[0] is not None:
+        return cached[0]
+    return pd.read_csv(file_path, encoding="utf-8", on_bad_lines="warn")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Rank candidate columns by a Poisson score test against Y.")
+    parser.add_argument("dataset", help="CSV dataset.")
+    parser.add_argument("--y", required=True, help="Y column.")
+    parser.add_argument("--decisions", help="Decisions file whose columns and transformations are screened.")
+    parser.add_argument("--output", help="Decisions file to write with the weak columns' Levels 2-6 turned off.")
+    parser.add_argument("--alpha", type=float, default=SCREEN_ALPHA, help="p-value above which a column is pruned.")
+    parser.add_argument("--model-based", action="store_true", help="Use the Poisson score instead of the robust one.")
+    parser.add_argument("--top", type=int, default=20, help="Rows of the ranking to print.")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read the dataset cache.")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    data = load_frame(args.dataset, not args.no_cache)
+    if args.y not in data:
+        print(f"Y column {args.y!r} is not in {args.dataset}", file=sys.stderr)
+        return 1
+
+    if args.decisions:
+        rows = DecisionStore.load(args.decisions).decisions()
+        columns = [row[0] for row in rows if row[0] in data]
+        transformations = {row[0]: row[8] for row in rows}
+    else:
+        rows = None
+        columns = [column for column in data.columns if column != args.y]
+        transformations = None
+    ranking = rank_columns(screen(data, args.y, columns, transformations, robust=not args.model_based))
+    print(format_ranking(ranking, args.top))
+    print(f"{int((ranking['p_value'] > args.alpha).sum())} of {len(ranking)} columns have p > {args.alpha:g}")
+
+    if args.output:
+        if rows is None:
+            print("--output needs --decisions", file=sys.stderr)
+            return 1
+        rows, pruned = screened_rows(rows, ranking, args.alpha)
+        DecisionStore.from_decisions(rows).save(args.output)
+        print(f"Turned off Levels 2-6 for {len(pruned)} columns in {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
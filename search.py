@@ -0,0 +1,567 @@
+"""Searches the specification space of a decisions file with Simulated Annealing, Differential Evolution or
+Harmony Search.
+
+Each solution is an integer gene per column: 0 leaves the column out and g > 0
+includes it as a fixed effect under its g-th allowed transformation. Whole
+populations are kept as (solutions, columns) arrays and scored together by the
+BatchEvaluator. A search stops after MAXTIME seconds or after "Iterations"
+generations without improvement, both read from setup_hyper.csv. Example:
+    python search.py data.csv --y why --algorithm DE
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from batch_evaluation import BatchEvaluator, DesignBank, decision_terms
+from dataset_cache import DatasetCache, fingerprint
+from decisions import DecisionStore, load_algorithm_parameters, load_hyperparameters
+from fitness_cache import FITNESS_CACHE_PATH, FitnessCache, frame_fingerprint, specification_hash
+from lru import LRUCache
+from panel_index import GroupIndex
+from pareto import ParetoArchive
+from profiler import profile_csv
+from splits import SPLIT_NAMES, hyper_fractions, split_indices
+
+ALGORITHMS = ["SA", "DE", "HS"]
+OBJECTIVES = {"BIC": "bic", "AIC": "aic", "RMSE": "rmse", "MAE": "mae"}
+DEFAULT_PARAMETERS = {
+    "SA": {"Initial Solutions": 50, "Temperature": 50, "Cooling Rate": 0.95, "Crossover Rate": 0.3,
+           "Mutation Rate": 0.2, "Steps": 1},
+    "DE": {"Population Size": 20, "Crossover Rate": 0.8, "Mutation Rate": 0.5},
+    "HS": {"Harmony Memory Size": 20, "HMCR": 0.9, "Pitch Adjustment Rate": 0.5, "Pitch Adjustment": 1}
+}
+DEFAULT_MAXTIME = 240000
+DEFAULT_ITERATIONS = 100
+CACHE_SIZE = 100_000
+ARCHIVE_SIZE = 200
+FRAME_CACHE_SIZE = 4
+
+
+class SearchSpace:
+    """ Maps gene arrays onto term masks of a DesignBank.
+
+    A column takes part when Level 2 is allowed and at least one of its
+    transformations is finite on the data; it may be left out only when Level 1
+    is allowed. Random-parameter levels (3-6) are not estimated yet, so columns
+    allowing only those are left out.
+    """
+
+    def __init__(self, bank, decisions):
+        self.bank = bank
+        options = {}
+        optional = {}
+        for row in decisions:
+            terms = [bank.term_index[(row[0], transformation)] for transformation in (row[8] or ["No"])
+                     if row[2] and (row[0], transformation) in bank.term_index]
+            if terms:
+                options[row[0]] = terms
+                optional[row[0]] = bool(row[1])
+        self.columns = list(options)
+        self.lower = np.array([0 if optional[column] else 1 for column in self.columns], dtype=np.int64)
+        self.upper = np.array([len(options[column]) for column in self.columns], dtype=np.int64)
+        # Row c maps gene g > 0 of column c to its term; -1 pads the shorter rows.
+        self.term_table = np.full((len(self.columns), int(self.upper.max(initial=0)) + 1), -1, dtype=np.int64)
+        for c, column in enumerate(self.columns):
+            self.term_table[c, 1:len(options[column]) + 1] = options[column]
+
+    def __len__(self):
+        return len(self.columns)
+
+    def random(self, rng, count):
+        return self.lower + np.floor(rng.random((count, len(self))) * (self.upper - self.lower + 1)).astype(np.int64)
+
+    def clip(self, genes):
+        return np.clip(genes, self.lower, self.upper)
+
+    def wrap(self, genes):
+        return self.lower + np.mod(genes - self.lower, self.upper - self.lower + 1)
+
+    def masks(self, genes):
+        masks = np.zeros((len(genes), len(self.bank) + 1), dtype=bool)
+        terms = self.term_table[np.arange(len(self)), genes]
+        masks[np.arange(len(genes))[:, None], np.where(terms >= 0, terms, len(self.bank))] = True
+        return masks[:, :-1]
+
+    def selection(self, genes):
+        return [self.bank.terms[self.term_table[c, gene]] for c, gene in enumerate(genes) if gene > 0]
+
+    def canonical_terms(self, genes):
+        """ Term indexes of one gene row, in the sorted order the fitness cache stores coefficients in. """
+        return sorted(self.term_table[np.flatnonzero(genes), genes[genes > 0]], key=self.bank.terms.__getitem__)
+
+
+class MetaheuristicSearch:
+    """ Runs one search over a SearchSpace and returns a result dict.
+
+    Scores are the chosen objective of each solution, lower is better; fits that
+    fail or do not converge score inf. Solutions already scored in this run are
+    looked up instead of refitted, and so are those in the FitnessCache, if one
+    is given along with the dataset key and y column. With a test_bank (a
+    held-out part of the space's bank), RMSE and MAE are scored on it. With a
+    secondary objective, every solution scored is also offered to a
+    ParetoArchive of the two objectives; the search itself follows the first.
+    """
+
+    def __init__(self, space, objective="BIC", model="Poisson", maxtime=DEFAULT_MAXTIME,
+                 iterations=DEFAULT_ITERATIONS, seed=0, progress=None, cache=None, dataset_key=None, y_column=None,
+                 test_bank=None, secondary=None, archive_size=ARCHIVE_SIZE):
+        self.space = space
+        self.test_bank = test_bank
+        self.cache = cache if dataset_key is not None else None
+        self.dataset_key = dataset_key
+        self.y_column = y_column
+        self.evaluator = BatchEvaluator(space.bank)
+        self.metric = self._metric_name(objective)
+        self.secondary = self._metric_name(secondary) if secondary else None
+        self.archive = ParetoArchive(archive_size) if self.secondary else None
+        self.model = model
+        self.maxtime = float(maxtime)
+        self.iterations = int(iterations)
+        self.rng = np.random.default_rng(seed)
+        self.progress = progress
+        self.scored = LRUCache(CACHE_SIZE)
+        self.evaluations = 0
+
+    def run(self, algorithm, parameters=None):
+        algorithm = algorithm.upper()
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm {algorithm!r}, expected one of {ALGORITHMS}")
+        parameters = {**DEFAULT_PARAMETERS[algorithm], **(parameters or {})}
+        self.start = time.perf_counter()
+        self.best_genes = None
+        self.best_score = np.inf
+        self.history = []
+        generations = {"SA": self._simulated_annealing, "DE": self._differential_evolution,
+                       "HS": self._harmony_search}[algorithm](parameters)
+
+        stale = 0
+        generation = 0
+        reason = "iterations"
+        for generation, (genes, scores) in enumerate(generations, start=1):
+            best = int(np.argmin(scores))
+            if scores[best] < self.best_score:
+                self.best_score = float(scores[best])
+                self.best_genes = genes[best].copy()
+                stale = 0
+            else:
+                stale += 1
+            self.history.append(self.best_score)
+            if self.progress is not None:
+                self.progress(generation, self.best_score, self.evaluations)
+            if time.perf_counter() - self.start >= self.maxtime:
+                reason = "maxtime"
+                break
+            if stale >= self.iterations:
+                break
+
+        return {
+            "algorithm": algorithm,
+            "objective": self.metric,
+            "secondary": self.secondary,
+            "pareto": [] if self.archive is None else [(first, second, self.space.selection(genes))
+                                                      for first, second, genes in self.archive],
+            "score": self.best_score,
+            "genes": self.best_genes,
+            "selection": [] if self.best_genes is None else self.space.selection(self.best_genes),
+            "generations": generation,
+            "evaluations": self.evaluations,
+            "seconds": time.perf_counter() - self.start,
+            "stopped": reason,
+            "history": self.history
+        }
+
+    def score(self, genes, warm_start=None):
+        """ Objective values and full-width params of each gene row. """
+        keys = [row.tobytes() for row in genes]
+        scores = np.empty(len(genes))
+        params = np.empty((len(genes), len(self.space.bank) + 1))
+        missing = {}
+        for i, key in enumerate(keys):
+            found = self.scored.get(key)
+            if found is None:
+                missing.setdefault(key, []).append(i)
+            else:
+                scores[i], params[i] = found
+        if missing and self.cache is not None:
+            self._from_cache(genes, missing, scores, params)
+        if missing:
+            first = np.array([rows[0] for rows in missing.values()])
+            warm_start = None if warm_start is None else warm_start[first]
+            if self.test_bank is None:
+                results = self.evaluator.evaluate(self.space.masks(genes[first]), warm_start, self.model)
+            else:
+                results = self.evaluator.out_of_sample(self.space.masks(genes[first]), self.test_bank, warm_start,
+                                                       self.model)
+            values = self._values(results, self.metric)
+            self.evaluations += len(first)
+            if self.archive is not None:
+                self.archive.insert_many(values, self._values(results, self.secondary), list(genes[first].copy()))
+            for (key, rows), value, row_params in zip(missing.items(), values, results["params"]):
+                self.scored.put(key, (value, row_params))
+                scores[rows] = value
+                params[rows] = row_params
+            if self.cache is not None:
+                self._to_cache(genes[first], results)
+        return scores, params
+
+    def _metric_name(self, objective):
+        metric = OBJECTIVES[str(objective).upper()]
+        return f"test_{metric}" if self.test_bank is not None and metric in ("rmse", "mae") else metric
+
+    @staticmethod
+    def _values(results, metric):
+        return np.where(results["converged"] & np.isfinite(results[metric]), results[metric], np.inf)
+
+    @staticmethod
+    def _cached_value(metrics, metric):
+        return metrics[metric] if metrics["converged"] and metrics.get(metric) is not None else np.inf
+
+    def _specification(self, genes):
+        return specification_hash(self.space.selection(genes), self.y_column, self.model)
+
+    def _from_cache(self, genes, missing, scores, params):
+        specifications = {key: self._specification(genes[rows[0]]) for key, rows in missing.items()}
+        hits = self.cache.get_many(self.dataset_key, list(specifications.values()))
+        for key, specification in specifications.items():
+            entry = hits.get(specification)
+            if entry is None:
+                continue
+            rows = missing.pop(key)
+            metrics = entry["metrics"]
+            value = self._cached_value(metrics, self.metric)
+            if self.archive is not None:
+                self.archive.insert(value, self._cached_value(metrics, self.secondary), genes[rows[0]].copy())
+            row_params = np.zeros(len(self.space.bank) + 1)
+            if entry["params"] is not None:
+                row_params[[0] + [i + 1 for i in self.space.canonical_terms(genes[rows[0]])]] = entry["params"]
+            self.scored.put(key, (value, row_params))
+            scores[rows] = value
+            params[rows] = row_params
+
+    def _to_cache(self, genes, results):
+        entries = {}
+        for i, row in enumerate(genes):
+            metrics = {name: float(results[name][i]) if np.isfinite(results[name][i]) else None
+                       for name in ["loglik", "test_rmse", "test_mae"] + list(OBJECTIVES.values()) if name in results}
+            metrics["converged"] = bool(results["converged"][i])
+            columns = [0] + [term + 1 for term in self.space.canonical_terms(row)]
+            entries[self._specification(row)] = (metrics, results["params"][i, columns])
+        self.cache.put_many(self.dataset_key, entries)
+
+    def _simulated_annealing(self, parameters):
+        """ Parallel chains: each move resets genes at the mutation rate and copies genes of the best solution
+        at the crossover rate, and is accepted by the Metropolis rule. The temperature starts where an average
+        uphill move is accepted with the initial probability and is multiplied by the cooling rate every
+        Steps generations.
+        """
+        chains = max(int(parameters["Initial Solutions"]), 1)
+        current = self.space.random(self.rng, chains)
+        scores, params = self.score(current)
+        yield current, scores
+
+        moves = self._sa_moves(current, current[np.argmin(scores)], parameters)
+        move_scores, move_params = self.score(moves, params)
+        uphill = move_scores - scores
+        uphill = uphill[np.isfinite(uphill) & (uphill > 0)]
+        acceptance = min(max(float(parameters["Temperature"]) / 100, 0.01), 0.99)
+        temperature = uphill.mean() / -math.log(acceptance) if len(uphill) else 1.0
+        steps = max(int(parameters["Steps"]), 1)
+
+        for generation in range(1, sys.maxsize):
+            with np.errstate(over="ignore", invalid="ignore"):
+                accept = (move_scores <= scores) | (self.rng.random(chains) < np.exp((scores - move_scores) / temperature))
+            current[accept] = moves[accept]
+            scores[accept] = move_scores[accept]
+            params[accept] = move_params[accept]
+            yield current, scores
+            if generation % steps == 0:
+                temperature *= float(parameters["Cooling Rate"])
+            moves = self._sa_moves(current, self.best_genes, parameters)
+            move_scores, move_params = self.score(moves, params)
+
+    def _sa_moves(self, current, best, parameters):
+        shape = current.shape
+        reset = self.rng.random(shape) < float(parameters["Mutation Rate"])
+        reset[np.arange(shape[0]), self.rng.integers(shape[1], size=shape[0])] = True
+        moves = np.where(reset, self.space.random(self.rng, shape[0]), current)
+        copy = ~reset & (self.rng.random(shape) < float(parameters["Crossover Rate"]))
+        return np.where(copy, best, moves)
+
+    def _differential_evolution(self, parameters):
+        """ DE/rand/1/bin on the gene indexes: mutant = r1 + F (r2 - r3), wrapped into each column's range,
+        binomial crossover at the crossover rate and greedy replacement of each target.
+        """
+        size = max(int(parameters["Population Size"]), 4)
+        population = self.space.random(self.rng, size)
+        scores, params = self.score(population)
+        yield population, scores
+
+        while True:
+            # Three distinct partners per target, none of them the target itself.
+            keys = self.rng.random((size, size))
+            np.fill_diagonal(keys, np.inf)
+            r1, r2, r3 = np.argsort(keys, axis=1)[:, :3].T
+            mutants = self.space.wrap(population[r1] + np.rint(
+                float(parameters["Mutation Rate"]) * (population[r2] - population[r3])).astype(np.int64))
+            cross = self.rng.random(population.shape) < float(parameters["Crossover Rate"])
+            cross[np.arange(size), self.rng.integers(len(self.space), size=size)] = True
+            trials = np.where(cross, mutants, population)
+            trial_scores, trial_params = self.score(trials, params)
+            better = trial_scores <= scores
+            population[better] = trials[better]
+            scores[better] = trial_scores[better]
+            params[better] = trial_params[better]
+            yield population, scores
+
+    def _harmony_search(self, parameters):
+        """ Improvises a memory-sized batch of harmonies per generation: each gene comes from a random memory
+        member at the HMCR rate (shifted by up to the pitch adjustment range at the pitch adjustment rate)
+        or at random otherwise. The best distinct solutions of memory and batch form the next memory.
+        """
+        size = max(int(parameters["Harmony Memory Size"]), 1)
+        memory = self.space.random(self.rng, size)
+        scores, params = self.score(memory)
+        yield memory, scores
+
+        bandwidth = max(int(parameters["Pitch Adjustment"]), 1)
+        columns = np.arange(len(self.space))
+        while True:
+            shape = memory.shape
+            from_memory = self.rng.random(shape) < float(parameters["HMCR"])
+            harmonies = memory[self.rng.integers(size, size=shape), columns]
+            adjust = from_memory & (self.rng.random(shape) < float(parameters["Pitch Adjustment Rate"]))
+            shift = self.rng.integers(1, bandwidth + 1, size=shape) * self.rng.choice([-1, 1], size=shape)
+            harmonies = self.space.clip(np.where(adjust, harmonies + shift, harmonies))
+            harmonies = np.where(from_memory, harmonies, self.space.random(self.rng, size))
+            new_scores, new_params = self.score(harmonies, np.repeat(params[[np.argmin(scores)]], size, axis=0))
+
+            pool = np.vstack([memory, harmonies])
+            pool_scores = np.concatenate([scores, new_scores])
+            _, distinct = np.unique(pool, axis=0, return_index=True)
+            keep = distinct[np.argsort(pool_scores[distinct], kind="stable")][:size]
+            memory = pool[keep]
+            scores = pool_scores[keep]
+            params = np.vstack([params, new_params])[keep]
+            yield memory, scores
+
+
+def stopping_rules(hyper_path="setup_hyper.csv"):
+    """ (MAXTIME, Iterations) from the hyperparameter file, with the defaults for missing values. """
+    try:
+        hyperparameters = load_hyperparameters(hyper_path)
+    except OSError:
+        return DEFAULT_MAXTIME, DEFAULT_ITERATIONS
+    maxtime = pd.to_numeric(hyperparameters.get("MAXTIME"), errors="coerce")
+    iterations = pd.to_numeric(hyperparameters.get("Iterations"), errors="coerce")
+    return (DEFAULT_MAXTIME if pd.isna(maxtime) else float(maxtime),
+            DEFAULT_ITERATIONS if pd.isna(iterations) else int(iterations))
+
+
+def objectives_and_model(hyper_path="setup_hyper.csv"):
+    """ (primary objective, secondary objective or None, model type) from the hyperparameter file. """
+    try:
+        hyperparameters = load_hyperparameters(hyper_path)
+    except OSError:
+        return "BIC", None, "Poisson"
+    objective = hyperparameters.get("Primary Objective Metric", hyperparameters.get("Objective Metric"))
+    secondary = hyperparameters.get("Secondary Objective Metric")
+    multi = hyperparameters.get("Objective Type") == "Multi" and isinstance(secondary, str)
+    model_types = hyperparameters.get("Model Types") or ["Poisson"]
+    return (objective if isinstance(objective, str) else "BIC"), (secondary if multi else None), model_types[0]
+
+
+def run_search(data, y_column, decisions, algorithm, parameters=None, hyper_path="setup_hyper.csv", seed=0,
+               maxtime=None, iterations=None, progress=None, cache=None, dataset_key=None, fractions=None,
+               panel_column=None, split_seed=0, objectives=None):
+    """ Builds the bank and space for decisions, and runs algorithm under the setup_hyper.csv stopping rules.
+
+    Models are fitted on the train split from fractions (default: the setup_hyper.csv
+    percentages), keeping whole panels of panel_column together, and RMSE and MAE
+    are scored on the test split. objectives, a (primary, secondary or None)
+    pair, overrides the ones in the file. With a FitnessCache, dataset_key
+    defaults to a hash of data.
+    """
+    decisions = [row for row in decisions if row[0] != y_column]
+    if fractions is None:
+        fractions = default_fractions(hyper_path)
+    terms = decision_terms(decisions)
+    test_bank = None
+    if fractions[0] < 1:
+        groups = GroupIndex.build(data, panel_column) if panel_column not in (None, "", "None") else None
+        parts = split_indices(len(data), fractions, split_seed, groups)
+        _, (bank, _, test_bank) = DesignBank.partitioned(data, y_column, terms, [parts[name] for name in SPLIT_NAMES])
+        if not len(test_bank.y):
+            test_bank = None
+    else:
+        bank = DesignBank(data, y_column, terms)
+    space = SearchSpace(bank, decisions)
+    if not len(space):
+        raise ValueError("No column of the decisions can enter the model as a fixed effect.")
+    default_maxtime, default_iterations = stopping_rules(hyper_path)
+    objective, secondary, model = objectives_and_model(hyper_path)
+    if objectives is not None:
+        objective, secondary = objectives
+    if cache is not None:
+        dataset_key = f"{dataset_key or frame_fingerprint(data)}:split={','.join(f'{f:g}' for f in fractions)}" \
+                      f":seed={split_seed}:panel={panel_column}"
+    search = MetaheuristicSearch(space, objective, model, maxtime or default_maxtime, iterations or default_iterations,
+                                 seed, progress, cache, dataset_key, y_column, test_bank, secondary)
+    return search.run(algorithm, parameters)
+
+
+def default_fractions(hyper_path="setup_hyper.csv"):
+    try:
+        return hyper_fractions(hyper_path)
+    except (OSError, KeyError, ValueError):
+        return 1.0, 0.0, 0.0
+
+
+def parameters_from_row(params):
+    """ Algorithm name and parameters of a set_data.csv row. """
+    algorithm = str(params["algorithm"]).upper()
+    names = {
+        "SA": {"crossover": "Crossover Rate", "temp_scale": "Cooling Rate", "steps": "Steps"},
+        "DE": {"_hms": "Population Size", "crossover": "Crossover Rate"},
+        "HS": {"_hms": "Harmony Memory Size", "_hmcr": "HMCR", "_par": "Pitch Adjustment Rate"}
+    }[algorithm]
+    return algorithm, {name: params[field] for field, name in names.items() if params.get(field)}
+
+
+def problem_paths(params, context):
+    """ The dataset and decisions files of a row's problem_number.
+
+    context["data"] and context["decisions"] may hold a {problem_number}
+    template, such as data_{problem_number}.csv, to give each problem its own
+    files. Without one, context["problem"] names the one problem the files
+    belong to. A row whose problem has no files raises ValueError.
+    """
+    problem = params.get("problem_number")
+    if problem is None or problem == "" or pd.isna(problem):
+        return context["data"], context["decisions"]
+    problem = int(problem)
+    if not any("{problem_number}" in str(context.get(name) or "") for name in ("data", "decisions")):
+        if context.get("problem") is None or int(context["problem"]) != problem:
+            raise ValueError(f"Problem {problem} is not configured: give the data or decisions path a "
+                             f"{{problem_number}} template, or name problem {problem} as the one they belong to")
+        return context["data"], context["decisions"]
+    paths = tuple(str(context[name]).format(problem_number=problem) for name in ("data", "decisions"))
+    for path in paths:
+        if not os.path.exists(path):
+            raise ValueError(f"Problem {problem} is not configured: {path} does not exist")
+    return paths
+
+
+# Frames this process has loaded, by dataset fingerprint, so the run-table rows of a dataset share one read.
+_frames = LRUCache(FRAME_CACHE_SIZE)
+
+
+def load_dataset(file_path, cache_dir=None):
+    """ The frame of a CSV, read once per process and, with cache_dir, through a DatasetCache the workers share. """
+    key = fingerprint(file_path)
+    data = _frames.get(key)
+    if data is None:
+        cache = DatasetCache(cache_dir) if cache_dir else None
+        result = cache.load(file_path) if cache is not None else None
+        if result is None or result[0] is None:
+            result = profile_csv(file_path)
+            if cache is not None:
+                cache.store(file_path, *result)
+        data = result[0]
+        _frames.put(key, data)
+    return data
+
+
+def search_backend(params, context):
+    """ Runner backend: one search per run-table row, with the row's _max_time, _max_imp and
+    test_percentage when set.
+
+    The row's problem_number picks its dataset and decisions through problem_paths,
+    and each dataset is loaded once per worker through load_dataset.
+    Fits are shared with other rows of the same problem through the fitness cache
+    at context["fitness_cache"], if set.
+    """
+    algorithm, parameters = parameters_from_row(params)
+    data_path, decisions_path = problem_paths(params, context)
+    test = float(params.get("test_percentage") or 0)
+    objectives = None
+    if params.get("_obj_1"):
+        objectives = (params["_obj_1"], params.get("_obj_2") if params.get("is_multi") else None)
+    data = load_dataset(data_path, context.get("dataset_cache"))
+    decisions = DecisionStore.load(decisions_path).decisions()
+    cache = FitnessCache(context["fitness_cache"]) if context.get("fitness_cache") else None
+    dataset_key = f"{fingerprint(data_path)}:problem={params.get('problem_number')}" if cache is not None else None
+    try:
+        result = run_search(data, context["y_column"], decisions, algorithm, parameters, context["hyper"],
+                            int(params.get("_random_seed", 0)), params.get("_max_time") or None,
+                            params.get("_max_imp") or None, cache=cache,
+                            dataset_key=dataset_key, fractions=(1 - test, 0.0, test) if test else None,
+                            panel_column=context.get("panel"), objectives=objectives)
+    finally:
+        if cache is not None:
+            cache.close()
+    return {"obj_1": result["score"], "objective": result["objective"], "evaluations": result["evaluations"],
+            "generations": result["generations"], "stopped": result["stopped"],
+            "selection": [f"{column} ({transformation})" for column, transformation in result["selection"]],
+            "pareto": [{"obj_1": first, "obj_2": second,
+                        "selection": [f"{column} ({transformation})" for column, transformation in selection]}
+                       for first, second, selection in result["pareto"]]}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Search the specifications allowed by a decisions file.")
+    parser.add_argument("data", help="CSV dataset.")
+    parser.add_argument("--y", required=True, help="Y column.")
+    parser.add_argument("--algorithm", choices=ALGORITHMS, help="Defaults to the one in the algorithm file.")
+    parser.add_argument("--decisions", default="setup_data.csv", help="Decisions file (.csv or .npy).")
+    parser.add_argument("--hyper", default="setup_hyper.csv", help="Hyperparameter file with MAXTIME and Iterations.")
+    parser.add_argument("--algorithm-file", default="setup_algorithm.csv", help="Saved algorithm parameters.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    parser.add_argument("--panel", help="Panel column kept whole within a split.")
+    parser.add_argument("--fitness-cache", default=FITNESS_CACHE_PATH, help="Fitness cache database.")
+    parser.add_argument("--no-cache", action="store_true", help="Refit every specification.")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        parameters = load_algorithm_parameters(args.algorithm_file)
+    except OSError:
+        parameters = {}
+    saved = parameters.pop("Algorithm", None)
+    algorithm = args.algorithm or saved or "SA"
+    if saved is not None and saved != algorithm:
+        parameters = {}
+
+    def report(generation, score, evaluations):
+        print(f"generation {generation}: best {score:.6g} after {evaluations} fits", flush=True)
+
+    data = pd.read_csv(args.data)
+    decisions = DecisionStore.load(args.decisions).decisions()
+    cache = None if args.no_cache else FitnessCache(args.fitness_cache)
+    try:
+        result = run_search(data, args.y, decisions, algorithm, parameters, args.hyper, args.seed, progress=report,
+                            cache=cache, dataset_key=fingerprint(args.data) if cache is not None else None,
+                            panel_column=args.panel)
+    finally:
+        if cache is not None:
+            cache.close()
+    print(f"{result['algorithm']} stopped on {result['stopped']} after {result['generations']} generations, "
+          f"{result['evaluations']} fits in {result['seconds']:.1f}s")
+    print(f"Best {result['objective'].upper()}: {result['score']:.6g}")
+    for column, transformation in result["selection"]:
+        print(f"  {column} ({transformation})")
+    if result["pareto"]:
+        print(f"Pareto front ({result['objective'].upper()}, {result['secondary'].upper()}):")
+        for first, second, selection in result["pareto"]:
+            print(f"  {first:.6g}, {second:.6g}: {', '.join(f'{column} ({t})' for column, t in selection)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
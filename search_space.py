@@ -0,0 +1,101 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from decisions import LEVEL_COLUMNS, load_hyperparameters
+from estimation import estimate
+
+DEFAULT_MAXTIME = 240000
+RANDOM_LEVELS = [2, 3, 4, 5]  # Levels 3-6 as indexes, each needs a distribution.
+
+
+def column_option_counts(decisions, grouped=True):
+    """ Number of specification choices each column adds to the search.
+
+    A column is either Off (Level 1), a fixed effect (Level 2) under any of its
+    transformations, or one of the random-parameter levels (3-6) under any
+    transformation and distribution. An empty transformation list means the raw
+    column. Level 5 only counts when a grouped column is set.
+    """
+    levels = np.array([row[1:1 + len(LEVEL_COLUMNS)] for row in decisions], dtype=bool).reshape(-1, len(LEVEL_COLUMNS))
+    if not grouped:
+        levels[:, 4] = False
+    distributions = np.array([len(row[7]) for row in decisions], dtype=float)
+    transformations = np.maximum([len(row[8]) for row in decisions], 1).astype(float)
+    counts = levels[:, 0] + transformations * (levels[:, 1] + distributions * levels[:, RANDOM_LEVELS].sum(axis=1))
+    return np.maximum(counts, 1)
+
+
+def search_space_size(decisions, grouped=True):
+    """ Returns (log10 of the total number of specifications, per-column breakdown frame). """
+    counts = column_option_counts(decisions, grouped)
+    log_counts = np.log10(counts)
+    total = float(log_counts.sum())
+    breakdown = pd.DataFrame({
+        "Column": [row[0] for row in decisions],
+        "Options": counts.astype(np.int64),
+        "Log10 Options": log_counts,
+        "Share": log_counts / total if total > 0 else 0.0
+    }).sort_values("Log10 Options", ascending=False, ignore_index=True)
+    return total, breakdown
+
+
+def sample_fit_seconds(data, y_column, columns, samples=5, model_size=10, seed=0, model="Poisson"):
+    """ Median wall time of a fit on random subsets of the numeric columns. """
+    numeric = [col for col in columns if col in data and pd.api.types.is_numeric_dtype(data[col])]
+    if not numeric or y_column not in data or not pd.api.types.is_numeric_dtype(data[y_column]):
+        return None
+    rng = np.random.default_rng(seed)
+    timings = []
+    for _ in range(samples):
+        chosen = rng.choice(numeric, size=min(model_size, len(numeric)), replace=False)
+        start = time.perf_counter()
+        estimate(data, y_column, [(col, "No") for col in chosen], model)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def estimate_run(decisions, data=None, y_column=None, maxtime=DEFAULT_MAXTIME, grouped=True, samples=5,
+                 model="Poisson"):
+    log_size, breakdown = search_space_size(decisions, grouped)
+    seconds = None
+    error = None
+    if data is not None and y_column is not None:
+        try:
+            seconds = sample_fit_seconds(data, y_column, [row[0] for row in decisions], samples, model=model)
+        except ValueError as e:
+            # Such as a Negative Binomial model on a Y that is not counts: the size estimate still stands.
+            error = str(e)
+
+    result = {"log10_size": log_size, "breakdown": breakdown, "seconds_per_fit": seconds, "maxtime": maxtime,
+              "timing_error": error}
+    if seconds:
+        evaluations = maxtime / seconds
+        result["evaluations"] = evaluations
+        result["log10_coverage"] = min(np.log10(evaluations) - log_size, 0.0)
+    return result
+
+
+def format_estimate(estimate, top=20):
+    lines = [f"Search space: about 10^{estimate['log10_size']:.2f} specifications"]
+    if estimate.get("timing_error"):
+        lines.append(f"Cost per fit: unavailable ({estimate['timing_error']})")
+    elif estimate["seconds_per_fit"] is None:
+        lines.append("Cost per fit: unavailable (load the data and set a numeric Y column)")
+    else:
+        lines.append(f"Cost per fit: {estimate['seconds_per_fit'] * 1000:.2f} ms")
+        lines.append(f"Fits within MAXTIME ({estimate['maxtime']:g} s): about {estimate['evaluations']:.3g}")
+        lines.append(f"Share of the space reachable: about 10^{estimate['log10_coverage']:.2f}")
+    lines.append("")
+    lines.append(f"Largest contributors (top {top}):")
+    for row in estimate["breakdown"].head(top).itertuples(index=False):
+        lines.append(f"  {row.Column}: {row.Options} options, {row.Share:.1%} of log size")
+    return "\n".join(lines)
+
+
+def read_maxtime(file_path="setup_hyper.csv"):
+    try:
+        return float(load_hyperparameters(file_path)["MAXTIME"])
+    except (OSError, KeyError, IndexError, ValueError, SyntaxError):
+        return DEFAULT_MAXTIME
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+from decisions import load_hyperparameters
+
+SPLIT_NAMES = ["train", "validation", "test"]
+
+
+def split_fractions(train, validation=0, test=None):
+    """ (train, validation, test) fractions from the percentages saved in setup_hyper.csv.
+
+    Percentages that add up to 100 are used as they are. Otherwise train is a
+    share of all rows and the rest is divided between validation and test in
+    proportion, which covers the saved "80, 0, 100" meaning an 80/20 train/test
+    split.
+    """
+    train, validation = float(train), float(validation or 0)
+    test = 100 - train - validation if test is None or pd.isna(test) else float(test)
+    if not 0 <= train <= 100 or validation < 0 or test < 0:
+        raise ValueError(f"Invalid split percentages {train}, {validation}, {test}")
+    if abs(train + validation + test - 100) > 1e-9:
+        rest = 100 - train
+        total = validation + test
+        validation, test = (rest * validation / total, rest * test / total) if total else (0.0, rest)
+    return train / 100, validation / 100, test / 100
+
+
+def hyper_fractions(hyper_path="setup_hyper.csv"):
+    hyperparameters = load_hyperparameters(hyper_path)
+    return split_fractions(hyperparameters["Train Split"], hyperparameters.get("Validation Split", 0),
+                           hyperparameters.get("Test Split"))
+
+
+def _units(n_rows, groups):
+    """ Unit number of each row: its group code, or a unit of its own when it has no group. """
+    if groups is None:
+        return np.arange(n_rows), n_rows
+    codes = np.asarray(groups.codes if hasattr(groups, "codes") else groups, dtype=np.int64)
+    units = codes.copy()
+    missing = np.flatnonzero(codes < 0)
+    count = int(codes.max(initial=-1)) + 1
+    units[missing] = count + np.arange(len(missing))
+    return units, count + len(missing)
+
+
+def _assign(n_rows, groups, seed, edges):
+    # Shuffle the units, then cut the running row count at the edges, so a unit (panel) lands in one part only.
+    units, count = _units(n_rows, groups)
+    rng = np.random.default_rng(seed)
+    shuffled = rng.permutation(count)
+    sizes = np.bincount(units, minlength=count)[shuffled]
+    before = np.cumsum(sizes) - sizes
+    part = np.empty(count, dtype=np.int64)
+    part[shuffled] = np.searchsorted(np.asarray(edges) * n_rows, before, side="right") - 1
+    return part[units]
+
+
+def split_indices(n_rows, fractions, seed=0, groups=None):
+    """ Sorted row-index arrays for "train", "validation" and "test".
+
+    groups is a GroupIndex or an array of group codes (-1 for none); all rows of
+    a group go to the same split, so a panel never straddles two.
+    """
+    edges = np.concatenate([[0.0], np.cumsum(fractions)[:-1]])
+    labels = _assign(n_rows, groups, seed, edges)
+    return {name: np.flatnonzero(labels == i) for i, name in enumerate(SPLIT_NAMES)}
+
+
+def kfold_indices(n_rows, k, seed=0, groups=None):
+    """ k (train, test) pairs of row-index arrays with whole groups in each fold. """
+    labels = _assign(n_rows, groups, seed, np.arange(k) / k)
+    return [(np.flatnonzero(labels != fold), np.flatnonzero(labels == fold)) for fold in range(k)]
+
+
+def part_order(parts):
+    """ The row order that puts each part in one contiguous block, and the block offsets. """
+    order = np.concatenate([np.asarray(part, dtype=np.int64) for part in parts]) if parts else np.empty(0, np.int64)
+    offsets = np.concatenate([[0], np.cumsum([len(part) for part in parts])]).astype(np.int64)
+    return order, offsets
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+from decisions import TRANSFORMATIONS
+from lru import LRUCache
+
+BLOCK_COLUMNS = 256
+SUMMARY_FIELDS = ["invalid", "nan", "inf", "mean", "std", "min", "max"]
+
+
+def _moments(x, finite):
+    if finite.all():
+        count = np.full(x.shape[1], x.shape[0])
+        return count, x.mean(axis=0), x.std(axis=0)
+    count = finite.sum(axis=0)
+    values = np.where(finite, x, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = values.sum(axis=0) / count
+        centered = np.where(finite, x - mean, 0.0)
+        std = np.sqrt((centered * centered).sum(axis=0) / count)
+    return count, mean, std
+
+
+def _masked(x, keep, fill):
+    return x if keep.all() else np.where(keep, x, fill)
+
+
+def _normalize(x):
+    _, mean, std = _moments(x, ~np.isnan(x))
+    return (x - mean) / np.where(std > 0, std, np.nan)
+
+
+TRANSFORM_FUNCTIONS = {
+    "No": lambda x: x,
+    "Sqrt": np.sqrt,
+    "Normalize": _normalize,
+    "Log": np.log,
+    "Arcsinh": np.arcsinh
+}
+
+
+def invalid_counts(x):
+    """ Rows outside each transformation's domain, per column of a 2-D float block. """
+    observed = ~np.isnan(x)
+    count, _, std = _moments(x, observed)
+    return {
+        "No": np.zeros(x.shape[1], dtype=np.int64),
+        "Sqrt": (x < 0).sum(axis=0),
+        "Normalize": np.where(std > 0, 0, count),
+        "Log": (x <= 0).sum(axis=0),
+        "Arcsinh": np.zeros(x.shape[1], dtype=np.int64)
+    }
+
+
+def summarize_block(x, columns):
+    """ Applies every transformation to a (rows, columns) float block and summarizes each result.
+
+    Returns a frame indexed by (column, transformation) with the SUMMARY_FIELDS.
+    """
+    frames = []
+    missing = np.isnan(x)
+    invalid = invalid_counts(x)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for name in TRANSFORMATIONS:
+            y = TRANSFORM_FUNCTIONS[name](x)
+            finite = np.isfinite(y)
+            infinite = np.isinf(y)
+            count, mean, std = _moments(y, finite)
+            empty = count == 0
+            frames.append(pd.DataFrame({
+                "column": columns,
+                "transformation": name,
+                "invalid": invalid[name],
+                "nan": (~finite & ~infinite & ~missing).sum(axis=0),
+                "inf": infinite.sum(axis=0),
+                "mean": mean,
+                "std": std,
+                "min": np.where(empty, np.nan, _masked(y, finite, np.inf).min(axis=0)),
+                "max": np.where(empty, np.nan, _masked(y, finite, -np.inf).max(axis=0))
+            }))
+    summary = pd.concat(frames, ignore_index=True).set_index(["column", "transformation"])
+    summary["valid"] = (summary["invalid"] == 0) & (summary["inf"] == 0) & (summary["nan"] == 0)
+    return summary
+
+
+class TransformationEngine:
+    """ Per-column transformation summaries of a frame, computed in column blocks and kept in an LRU cache. """
+
+    def __init__(self, data, maxsize=1024, block_columns=BLOCK_COLUMNS):
+        self.data = data
+        self.block_columns = block_columns
+        self.cache = LRUCache(maxsize)
+
+    def is_numeric(self, column):
+        return pd.api.types.is_numeric_dtype(self.data[column]) and not pd.api.types.is_bool_dtype(self.data[column])
+
+    def summary(self, column):
+        """ Frame indexed by transformation for one column, or None for a non-numeric column. """
+        return self.summaries([column]).get(column)
+
+    def summaries(self, columns):
+        result = {}
+        missing = []
+        for col in columns:
+            cached = self.cache.get(col)
+            if cached is not None:
+                result[col] = cached
+            elif self.is_numeric(col):
+                missing.append(col)
+
+        for start in range(0, len(missing), self.block_columns):
+            block = missing[start:start + self.block_columns]
+            summary = summarize_block(self.data[block].to_numpy(dtype=float, na_value=np.nan), block)
+            for col in block:
+                result[col] = summary.loc[col]
+                self.cache.put(col, result[col])
+        return result
+
+    def invalid_transformations(self, columns):
+        """ Maps each numeric column to the transformations that produce NaN or inf on its data. """
+        return {col: summary.index[~summary["valid"]].tolist() for col, summary in self.summaries(columns).items()}
+
+
+def format_summary(summary):
+    if summary is None:
+        return "Transformations: not available for non-numeric columns"
+    lines = []
+    for name, row in summary.iterrows():
+        status = "ok" if row["valid"] else f"{int(row['invalid'])} invalid, {int(row['nan'])} NaN, {int(row['inf'])} inf"
+        lines.append(f"{name}: {status}, mean {row['mean']:.4g}, std {row['std']:.4g}, "
+                     f"range [{row['min']:.4g}, {row['max']:.4g}]")
+    return "\n".join(lines)